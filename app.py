@@ -4,13 +4,14 @@ Ana uygulama dosyası
 """
 
 import streamlit as st
-import json
 from pathlib import Path
 import sys
 
 # src klasörünü path'e ekle
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
+from record_stream import dataset_path, iter_records
+
 st.set_page_config(
     page_title="CDP Demo - Dashboard",
     page_icon="📊",
@@ -52,17 +53,13 @@ def load_data():
     """Veri dosyalarını yükle"""
     data_dir = Path("data")
 
-    if not data_dir.exists() or not (data_dir / "customers.json").exists():
+    if not data_dir.exists() or not dataset_path(data_dir, "customers").exists():
         return None, None, None
 
-    with open(data_dir / "customers.json", "r", encoding="utf-8") as f:
-        customers = json.load(f)
-
-    with open(data_dir / "transactions.json", "r", encoding="utf-8") as f:
-        transactions = json.load(f)
-
-    with open(data_dir / "events.json", "r", encoding="utf-8") as f:
-        events = json.load(f)
+    # JSON veya JSON Lines (bkz. record_stream)
+    customers = list(iter_records(dataset_path(data_dir, "customers")))
+    transactions = list(iter_records(dataset_path(data_dir, "transactions")))
+    events = list(iter_records(dataset_path(data_dir, "events")))
 
     return customers, transactions, events
 
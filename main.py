@@ -5,7 +5,10 @@ Basit CDP sistemi demonstrasyonu
 
 Kullanım:
   python main.py generate    # Mock veri oluştur
+  python main.py generate --jsonl  # JSON Lines olarak kaydet
+  python main.py partition   # İşlem/eventleri gün dosyalarına böl
   python main.py segments    # Segmentleri listele ve çalıştır
+  python main.py segments --revenue  # Gelir istatistikleri (tüm işlem geçmişi okunur)
   python main.py export      # Tüm segmentleri platformlara export et
   python main.py export premium_fuel_lovers  # Tek segment export
   python main.py upload meta premium_fuel_lovers  # API ile yükle
@@ -22,7 +25,10 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from generate_mock_data import generate_customers, generate_transactions, generate_digital_events, save_data
+from partitioned_store import partition_data, GRANULARITIES, DEFAULT_GRANULARITY
+from record_stream import dataset_path
 from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
+from columnar_store import HAS_NUMPY
 from platform_export import PlatformExporter
 from config import CDPConfig, setup_logging
 from api_clients import MetaClient, GoogleClient, TikTokClient
@@ -35,8 +41,8 @@ def print_header(title: str):
     print("=" * 70)
 
 
-def cmd_generate():
-    """Mock veri oluştur"""
+def cmd_generate(data_format: str = "json"):
+    """Mock veri oluştur (data_format: json veya jsonl)"""
     print_header("📊 MOCK VERİ OLUŞTURUCU")
     
     print("\n🔄 Müşteri verileri oluşturuluyor...")
@@ -49,7 +55,12 @@ def cmd_generate():
     events = generate_digital_events(customers, days=90)
     
     print("💾 Veriler kaydediliyor...")
-    save_data(customers, transactions, events, "data")
+    save_data(customers, transactions, events, "data", data_format)
+    
+    # Kolon deposu snapshot'ı: columnar backend sonraki açılışlarda JSON okumaz
+    if HAS_NUMPY:
+        print("💾 Snapshot yazılıyor...")
+        SegmentEngine("data", backend="columnar").close()
     
     # Özet
     print("\n✅ Veri oluşturma tamamlandı!")
@@ -63,36 +74,63 @@ def cmd_generate():
     print(f"   • App kullanıcı: {len([c for c in customers if c['has_app']])} (%{len([c for c in customers if c['has_app']])/10:.0f})")
 
 
-def cmd_segments():
-    """Segmentleri listele ve çalıştır"""
+def cmd_partition(granularity: str = DEFAULT_GRANULARITY):
+    """İşlem ve eventleri tarih bölümlerine ayır"""
+    print_header("🗂️  VERİ BÖLÜMLEME")
+    
+    if not dataset_path("data", "transactions").exists():
+        print("\n⚠️  Veri bulunamadı. Önce 'python main.py generate' çalıştırın.")
+        return
+    
+    if granularity not in GRANULARITIES:
+        print(f"\n❌ Bilinmeyen bölümleme: {granularity}")
+        print(f"   Desteklenen: {', '.join(GRANULARITIES)}")
+        return
+    
+    manifests = partition_data("data", granularity)
+    for table, manifest in manifests.items():
+        print(f"\n✅ {table}: {manifest['rows']} kayıt → {len(manifest['partitions'])} dosya (data/{table}/)")
+    
+    print("\n💡 SegmentEngine.for_segments(...) sadece segmentlerin gün penceresine giren dosyaları okur.")
+
+
+def cmd_segments(revenue: bool = False):
+    """Segmentleri listele ve çalıştır
+
+    Sadece segmentlerin gün penceresi okunur (bölümlü veride); gelir
+    istatistikleri tüm işlem geçmişini gerektirdiğinden bölümlü veride
+    sadece revenue ile hesaplanır.
+    """
     print_header("🎯 SEGMENT ANALİZİ")
     
     # Veri var mı kontrol et
-    if not Path("data/customers.json").exists():
+    if not dataset_path("data", "customers").exists():
         print("\n⚠️  Veri bulunamadı. Önce 'python main.py generate' çalıştırın.")
         return
     
-    engine = SegmentEngine("data")
-    
-    print(f"\n📊 Yüklenen veri:")
-    print(f"   • {len(engine.customers)} müşteri")
-    print(f"   • {len(engine.transactions)} işlem")
-    print(f"   • {len(engine.events)} event")
+    engine = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, "data")
     
     print("\n" + "-" * 70)
     print("📋 Tanımlı Segmentler:")
     print("-" * 70)
     
+    # Tüm segmentler tek geçişte (ortak agregasyonlar bir kez hesaplanır)
+    all_results = engine.run_segments(PREDEFINED_SEGMENTS)
+    with_revenue = revenue or engine.history_complete
+    if not with_revenue:
+        print("\n💡 Sadece segment penceresi yüklendi; gelir için 'python main.py segments --revenue'")
+    
     for i, (key, segment) in enumerate(PREDEFINED_SEGMENTS.items(), 1):
-        results = engine.run_segment(segment)
-        stats = engine.get_segment_stats(results)
+        results = all_results[key]
+        stats = engine.get_segment_stats(results, transactions=with_revenue)
         
         print(f"\n{i}. {segment.name} [{key}]")
         print(f"   📝 {segment.description}")
         print(f"   👥 Müşteri: {stats['count']} ({stats.get('percentage', 0)}%)")
         
         if stats['count'] > 0:
-            print(f"   💰 Toplam Gelir: {stats.get('total_revenue', 0):,.0f} TL")
+            if "total_revenue" in stats:
+                print(f"   💰 Toplam Gelir: {stats['total_revenue']:,.0f} TL")
             print(f"   📱 App Kullanım: %{stats.get('has_app_pct', 0)}")
             
             # Şehir dağılımı (ilk 3)
@@ -101,6 +139,16 @@ def cmd_segments():
             if top_cities:
                 city_str = ", ".join([f"{c}: {n}" for c, n in top_cities])
                 print(f"   🏙️  Şehirler: {city_str}")
+    
+    # İşlem/eventler tembel yüklenir: sadece segmentlerin okuttuğu veri setleri
+    print("\n" + "-" * 70)
+    print(f"📊 Yüklenen veri:")
+    print(f"   • {len(engine.customers)} müşteri")
+    for dataset, label in (("transactions", "işlem"), ("events", "event")):
+        if engine.is_loaded(dataset):
+            print(f"   • {len(getattr(engine, dataset))} {label}")
+    for stats in engine.load_stats.values():
+        print(f"   ⏱️  {stats.describe()}")
 
 
 def cmd_export(segment_key: str = None):
@@ -108,7 +156,7 @@ def cmd_export(segment_key: str = None):
     print_header("📤 PLATFORM EXPORT")
     
     # Veri var mı kontrol et
-    if not Path("data/customers.json").exists():
+    if not dataset_path("data", "customers").exists():
         print("\n⚠️  Veri bulunamadı. Önce 'python main.py generate' çalıştırın.")
         return
     
@@ -200,7 +248,7 @@ def cmd_upload(platform: str, segment_key: str, dry_run: bool = False):
     print_header(f"📤 API UPLOAD - {platform.upper()}")
 
     # Veri var mı kontrol et
-    if not Path("data/customers.json").exists():
+    if not dataset_path("data", "customers").exists():
         print("\n⚠️  Veri bulunamadı. Önce 'python main.py generate' çalıştırın.")
         return
 
@@ -340,8 +388,9 @@ Kullanım:
   python main.py <komut> [argümanlar]
 
 Veri Komutları:
-  generate              Mock veri oluştur (1000 müşteri, 90 günlük işlem)
-  segments              Tüm segmentleri listele ve analiz et
+  generate [--jsonl]    Mock veri oluştur (1000 müşteri, 90 günlük işlem)
+  segments [--revenue]  Tüm segmentleri listele ve analiz et (--revenue: gelir için tüm geçmiş)
+  partition [day|month] İşlem/eventleri tarih bölümlerine ayır (varsayılan: day)
 
 Export Komutları (CSV dosyası):
   export [segment]      Segment(ler)i CSV olarak export et
@@ -391,9 +440,11 @@ def main():
     command = sys.argv[1].lower()
 
     if command == "generate":
-        cmd_generate()
+        cmd_generate("jsonl" if "--jsonl" in sys.argv else "json")
+    elif command == "partition":
+        cmd_partition(sys.argv[2].lower() if len(sys.argv) > 2 else DEFAULT_GRANULARITY)
     elif command == "segments":
-        cmd_segments()
+        cmd_segments("--revenue" in sys.argv)
     elif command == "export":
         segment_key = sys.argv[2] if len(sys.argv) > 2 else None
         cmd_export(segment_key)
@@ -4,11 +4,16 @@ Demografik ve davranışsal müşteri analizi
 """
 
 import streamlit as st
-import json
 from pathlib import Path
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import sys
+
+# src klasörünü path'e ekle
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from record_stream import dataset_path, iter_records
 
 st.set_page_config(
     page_title="Müşteri Analizi - CDP Demo",
@@ -21,17 +26,13 @@ def load_data():
     """Veri dosyalarını yükle"""
     data_dir = Path("data")
 
-    if not data_dir.exists() or not (data_dir / "customers.json").exists():
+    if not data_dir.exists() or not dataset_path(data_dir, "customers").exists():
         return None, None, None
 
-    with open(data_dir / "customers.json", "r", encoding="utf-8") as f:
-        customers = json.load(f)
-
-    with open(data_dir / "transactions.json", "r", encoding="utf-8") as f:
-        transactions = json.load(f)
-
-    with open(data_dir / "events.json", "r", encoding="utf-8") as f:
-        events = json.load(f)
+    # JSON veya JSON Lines (bkz. record_stream)
+    customers = list(iter_records(dataset_path(data_dir, "customers")))
+    transactions = list(iter_records(dataset_path(data_dir, "transactions")))
+    events = list(iter_records(dataset_path(data_dir, "events")))
 
     return customers, transactions, events
 
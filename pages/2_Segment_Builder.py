@@ -14,6 +14,8 @@ import sys
 # src klasörünü path'e ekle
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from aggregates import parse_aggregate, filter_predicates
+from record_stream import dataset_path
 from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS, SegmentDefinition
 
 st.set_page_config(
@@ -23,14 +25,29 @@ st.set_page_config(
 )
 
 
+# Koşul alanları: profil + agregasyonlar (tx_<işlem>_<kolon>, bkz. aggregates.py)
+CONDITION_FIELDS = [
+    "city", "segment", "has_app", "email_opted_in",
+    "tx_count", "tx_total_amount", "tx_sum_fuel_liters", "tx_distinct_station_id", "tx_last_fuel_type",
+    "event_count", "event_distinct_event_type",
+]
+
+
 def load_data():
     """Veri dosyalarını yükle"""
     data_dir = Path("data")
 
-    if not data_dir.exists() or not (data_dir / "customers.json").exists():
+    if not data_dir.exists() or not dataset_path(data_dir, "customers").exists():
         return None
 
-    return SegmentEngine("data")
+    # Sadece hazır segmentlerin gün penceresi okunur (bölümlü veride); daha geniş
+    # pencereli özel segmentler ve gelir istatistikleri geçmişi ilk ihtiyaçta genişletir
+    return SegmentEngine.for_segments(PREDEFINED_SEGMENTS, "data")
+
+
+def format_revenue(stats):
+    """Toplam gelir metni (gelir hesaplanmadıysa —)"""
+    return f"₺{stats['total_revenue']:,.0f}" if "total_revenue" in stats else "—"
 
 
 def main():
@@ -44,6 +61,12 @@ def main():
         st.warning("⚠️ Veri bulunamadı. Ana sayfadan veri oluşturun.")
         return
 
+    with_revenue = st.sidebar.checkbox(
+        "💰 Gelir istatistikleri",
+        value=False,
+        help="Toplam gelir tüm işlem geçmişinden hesaplanır; bölümlü veride tüm işlem dosyaları okunur"
+    )
+
     # Tab yapısı
     tab1, tab2, tab3 = st.tabs(["📋 Hazır Segmentler", "🔧 Özel Segment", "📊 Karşılaştırma"])
 
@@ -64,7 +87,9 @@ def main():
         if selected_segment:
             segment_def = PREDEFINED_SEGMENTS[selected_segment]
             results = engine.run_segment(segment_def)
-            stats = engine.get_segment_stats(results)
+            stats = engine.get_segment_stats(
+                results, approximate=True, transactions=with_revenue or engine.history_complete
+            )
 
             # Segment bilgisi
             col1, col2 = st.columns([1, 2])
@@ -80,7 +105,9 @@ def main():
                     val = cond["value"]
                     days = cond.get("days", "")
                     days_str = f" (son {days} gün)" if days else ""
-                    st.code(f"{i}. {field} {op} {val}{days_str}")
+                    filters = filter_predicates(cond.get("filter"))
+                    filter_str = " [" + " AND ".join(f"{p['field']} {p['operator']} {p['value']}" for p in filters) + "]" if filters else ""
+                    st.code(f"{i}. {field} {op} {val}{days_str}{filter_str}")
 
                 st.markdown(f"**Mantık:** `{segment_def.logic}`")
 
@@ -97,11 +124,20 @@ def main():
                     st.metric("Oran", f"%{stats.get('percentage', 0)}")
 
                 with m3:
-                    st.metric("Toplam Gelir", f"₺{stats.get('total_revenue', 0):,.0f}")
+                    st.metric("Toplam Gelir", format_revenue(stats))
 
                 with m4:
                     st.metric("App Kullanım", f"%{stats.get('has_app_pct', 0):.1f}")
 
+                if stats.get("approximate"):
+                    bounds = stats["error_bounds"]
+                    revenue_bound = f"gelir ±₺{bounds['total_revenue']:,.0f}, " if "total_revenue" in bounds else ""
+                    st.caption(
+                        f"≈ {stats['sample_size']:,} müşterilik örneklemden tahmin (%95 güven): "
+                        f"{revenue_bound}app ±%{bounds['has_app_pct']:.1f}, "
+                        f"yaş ±{bounds['avg_age']:.1f}"
+                    )
+
             st.divider()
 
             if stats["count"] > 0:
@@ -173,7 +209,7 @@ def main():
             with c1_col1:
                 c1_field = st.selectbox(
                     "Alan",
-                    options=["city", "segment", "has_app", "email_opted_in", "tx_count", "tx_total_amount"],
+                    options=CONDITION_FIELDS,
                     key="c1_field"
                 )
             with c1_col2:
@@ -194,7 +230,7 @@ def main():
             with c2_col1:
                 c2_field = st.selectbox(
                     "Alan",
-                    options=["", "city", "segment", "has_app", "email_opted_in", "tx_count", "tx_total_amount"],
+                    options=[""] + CONDITION_FIELDS,
                     key="c2_field"
                 )
             with c2_col2:
@@ -209,10 +245,15 @@ def main():
                 c2_days = st.number_input("Gün (opsiyonel)", min_value=0, value=0, key="c2_days")
 
             logic = st.radio("Mantık", options=["AND", "OR"], horizontal=True)
+            profiled = st.checkbox("⏱️ Koşul profili", help="Koşul başına süre ve elenen müşteri sayılarını göster")
 
-            submitted = st.form_submit_button("🔍 Segmenti Çalıştır", type="primary")
+            b1, b2 = st.columns(2)
+            with b1:
+                estimated = st.form_submit_button("⚡ Hızlı Tahmin")
+            with b2:
+                submitted = st.form_submit_button("🔍 Segmenti Çalıştır", type="primary")
 
-        if submitted and segment_name and c1_value:
+        if (submitted or estimated) and segment_name and c1_value:
             # Koşulları oluştur
             conditions = []
 
@@ -220,7 +261,8 @@ def main():
             def parse_value(val, field):
                 if field in ["has_app", "email_opted_in"]:
                     return val.lower() in ["true", "1", "evet", "yes"]
-                if field in ["tx_count", "tx_total_amount"]:
+                spec = parse_aggregate(field)
+                if spec is not None and spec.operation not in ("first", "last"):
                     try:
                         return float(val)
                     except:
@@ -254,41 +296,100 @@ def main():
                 logic=logic
             )
 
-            results = engine.run_segment(custom_segment)
-            stats = engine.get_segment_stats(results)
-
-            st.success(f"✅ Segment oluşturuldu: **{stats['count']}** müşteri bulundu ({stats.get('percentage', 0)}%)")
-
-            if stats["count"] > 0:
-                # Metrikler
-                m1, m2, m3, m4 = st.columns(4)
-
-                with m1:
-                    st.metric("Müşteri", f"{stats['count']:,}")
-                with m2:
-                    st.metric("Gelir", f"₺{stats.get('total_revenue', 0):,.0f}")
-                with m3:
-                    st.metric("App", f"%{stats.get('has_app_pct', 0):.1f}")
-                with m4:
-                    st.metric("Ort. Yaş", f"{stats.get('avg_age', 0):.1f}")
-
-                # Liste
-                df_results = pd.DataFrame(results)
-                st.dataframe(
-                    df_results[["customer_id", "first_name", "last_name", "city", "segment"]].head(50),
-                    use_container_width=True,
-                    hide_index=True
+            # Hızlı tahmin: örneklemden başla, aralık ±%1'e inene kadar iyileştir
+            if estimated and not submitted:
+                placeholder = st.empty()
+                estimate = engine.estimate_segment(custom_segment)
+                while True:
+                    placeholder.info(
+                        f"⚡ Tahmini büyüklük: **{estimate.count:,}** müşteri (%{estimate.percentage}) · "
+                        f"%95 aralık: {estimate.lower:,} – {estimate.upper:,} · "
+                        f"örneklem: {estimate.sample_size:,}/{estimate.population:,}"
+                    )
+                    if estimate.exact or estimate.margin <= 0.01:
+                        break
+                    estimate = engine.refine_estimate(estimate)
+            else:
+                if profiled:
+                    results, profile = engine.profile_segment(custom_segment)
+                else:
+                    results = engine.run_segment(custom_segment)
+                stats = engine.get_segment_stats(
+                    results, approximate=True, transactions=with_revenue or engine.history_complete
                 )
 
+                st.success(f"✅ Segment oluşturuldu: **{stats['count']}** müşteri bulundu ({stats.get('percentage', 0)}%)")
+
+                if stats["count"] > 0:
+                    # Metrikler
+                    m1, m2, m3, m4 = st.columns(4)
+
+                    with m1:
+                        st.metric("Müşteri", f"{stats['count']:,}")
+                    with m2:
+                        st.metric("Gelir", format_revenue(stats))
+                    with m3:
+                        st.metric("App", f"%{stats.get('has_app_pct', 0):.1f}")
+                    with m4:
+                        st.metric("Ort. Yaş", f"{stats.get('avg_age', 0):.1f}")
+
+                    # Liste
+                    df_results = pd.DataFrame(results)
+                    st.dataframe(
+                        df_results[["customer_id", "first_name", "last_name", "city", "segment"]].head(50),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
+                if profiled:
+                    st.markdown("#### ⏱️ Koşul Profili")
+                    st.caption(
+                        f"{profile.backend} / {profile.method} · toplam {profile.seconds * 1000:.1f} ms · "
+                        f"{profile.matched:,} müşteri"
+                    )
+                    df_profile = pd.DataFrame([
+                        {
+                            "Sıra": cond.position + 1,
+                            "Koşul": cond.label(),
+                            "Süre (ms)": cond.seconds * 1000,
+                            "İncelenen": cond.rows_examined,
+                            "Geçen": cond.rows_passed,
+                            "Geçme (%)": cond.pass_rate * 100,
+                            "Paylaşım": cond.cache_hits,
+                        }
+                        for cond in profile.conditions
+                    ])
+                    st.dataframe(
+                        df_profile,
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            "Süre (ms)": st.column_config.NumberColumn(format="%.2f"),
+                            "Geçme (%)": st.column_config.NumberColumn(format="%.1f%%"),
+                        }
+                    )
+
+                    with st.expander("Yükleme ve index süreleri"):
+                        timings = [
+                            {"Adım": f"okuma: {name}", "Kayıt": load.rows, "Süre (ms)": load.seconds * 1000}
+                            for name, load in profile.load.items()
+                        ] + [
+                            {"Adım": f"index: {name}", "Kayıt": None, "Süre (ms)": seconds * 1000}
+                            for name, seconds in profile.index_seconds.items()
+                        ]
+                        st.dataframe(pd.DataFrame(timings), use_container_width=True, hide_index=True)
+
     with tab3:
         st.markdown("### Segment Karşılaştırması")
         st.markdown("Tüm segmentleri yan yana karşılaştırın")
 
         # Tüm segmentleri çalıştır
         segment_data = []
+        all_results = engine.run_segments(PREDEFINED_SEGMENTS)
+        has_revenue = with_revenue or engine.history_complete
         for key, segment_def in PREDEFINED_SEGMENTS.items():
-            results = engine.run_segment(segment_def)
-            stats = engine.get_segment_stats(results)
+            results = all_results[key]
+            stats = engine.get_segment_stats(results, approximate=True, transactions=has_revenue)
             segment_data.append({
                 "Segment": segment_def.name,
                 "Müşteri": stats["count"],
@@ -299,6 +400,8 @@ def main():
             })
 
         df_segments = pd.DataFrame(segment_data)
+        if not has_revenue:
+            df_segments = df_segments.drop(columns=["Gelir (₺)"])
 
         # Tablo
         st.dataframe(
@@ -332,29 +435,31 @@ def main():
 
         with col2:
             st.markdown("#### Toplam Gelir")
-            fig = px.bar(
-                df_segments,
-                x="Segment",
-                y="Gelir (₺)",
-                color="Gelir (₺)",
-                color_continuous_scale="Greens"
-            )
-            fig.update_layout(height=350, showlegend=False, coloraxis_showscale=False)
-            fig.update_xaxes(tickangle=45)
-            st.plotly_chart(fig, use_container_width=True)
+            if has_revenue:
+                fig = px.bar(
+                    df_segments,
+                    x="Segment",
+                    y="Gelir (₺)",
+                    color="Gelir (₺)",
+                    color_continuous_scale="Greens"
+                )
+                fig.update_layout(height=350, showlegend=False, coloraxis_showscale=False)
+                fig.update_xaxes(tickangle=45)
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.info("Gelir için kenar çubuğundan 💰 Gelir istatistikleri seçeneğini açın.")
 
         # Radar chart
         st.markdown("#### Segment Özellikleri Karşılaştırması")
 
         # Normalize edilmiş değerler
         df_norm = df_segments.copy()
-        for col in ["Müşteri", "Gelir (₺)", "App (%)", "Ort. Yaş"]:
+        categories = [col for col in ["Müşteri", "Gelir (₺)", "App (%)", "Ort. Yaş"] if col in df_norm]
+        for col in categories:
             max_val = df_norm[col].max()
             if max_val > 0:
                 df_norm[col] = df_norm[col] / max_val * 100
 
-        categories = ["Müşteri", "Gelir (₺)", "App (%)", "Ort. Yaş"]
-
         fig = go.Figure()
 
         for _, row in df_norm.iterrows():
@@ -13,6 +13,7 @@ from datetime import datetime
 # src klasörünü path'e ekle
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from record_stream import dataset_path
 from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
 from platform_export import PlatformExporter
 
@@ -27,10 +28,10 @@ def load_data():
     """Veri dosyalarını yükle"""
     data_dir = Path("data")
 
-    if not data_dir.exists() or not (data_dir / "customers.json").exists():
+    if not data_dir.exists() or not dataset_path(data_dir, "customers").exists():
         return None, None
 
-    engine = SegmentEngine("data")
+    engine = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, "data")
     exporter = PlatformExporter("data", "exports")
 
     return engine, exporter
@@ -115,10 +116,9 @@ def main():
             if selected_segment:
                 segment_def = PREDEFINED_SEGMENTS[selected_segment]
                 results = engine.run_segment(segment_def)
-                stats = engine.get_segment_stats(results)
 
                 st.markdown("#### Segment Özeti")
-                st.metric("Müşteri Sayısı", f"{stats['count']:,}")
+                st.metric("Müşteri Sayısı", f"{len(results):,}")
                 st.metric("Email Opt-in", f"%{sum(1 for c in results if c.get('email_opted_in', False)) / max(len(results), 1) * 100:.1f}")
 
         st.divider()
@@ -173,13 +173,13 @@ def main():
         st.markdown("#### Export Edilecek Segmentler")
 
         segment_preview = []
+        all_results = engine.run_segments(PREDEFINED_SEGMENTS)
         for key, seg in PREDEFINED_SEGMENTS.items():
-            results = engine.run_segment(seg)
-            stats = engine.get_segment_stats(results)
+            results = all_results[key]
             segment_preview.append({
                 "Segment": seg.name,
                 "Key": key,
-                "Müşteri": stats["count"],
+                "Müşteri": len(results),
                 "Tahmini Export": sum(1 for c in results if c.get("email_opted_in", False))
             })
 
@@ -0,0 +1,155 @@
+"""
+CDP Demo - Agregasyon Alanları
+tx_<işlem>_<kolon> / event_<işlem>_<kolon> alanlarının tanımı ve satır bazlı hesabı
+"""
+
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
+
+# Alan öneki -> tablo
+AGGREGATE_SOURCES = {"tx": "transactions", "event": "events"}
+
+# count kolonsuzdur (tx_count, event_count); diğerleri bir kolon üzerinde çalışır
+AGGREGATE_OPERATIONS = ("count", "sum", "avg", "min", "max", "distinct", "first", "last")
+
+# Sadece sayısal değerleri (int, float, bool) kullanan işlemler; diğer değerler atlanır
+NUMERIC_OPERATIONS = ("sum", "avg", "min", "max")
+
+# Eski isimli alanlar
+AGGREGATE_ALIASES = {
+    "tx_total_amount": ("tx", "sum", "total_amount"),
+    "tx_avg_amount": ("tx", "avg", "total_amount"),
+}
+
+# Kendi hesabı olan alanlar (tx_last_days: son işlemden bu yana gün)
+SPECIAL_FIELDS = {"tx_last_days"}
+
+# Operatörü verilmeyen filtre koşulu eşitliktir
+DEFAULT_FILTER_OPERATOR = "=="
+
+
+@dataclass(frozen=True)
+class AggregateField:
+    """Ayrıştırılmış agregasyon alanı (örn. tx_sum_fuel_liters -> tx, sum, fuel_liters)"""
+    source: str
+    operation: str
+    column: Optional[str] = None
+
+    @property
+    def table(self) -> str:
+        return AGGREGATE_SOURCES[self.source]
+
+
+def parse_aggregate(field: str) -> Optional[AggregateField]:
+    """Alan adını ayrıştır (agregasyon değilse None)"""
+    if field in SPECIAL_FIELDS:
+        return None
+    if field in AGGREGATE_ALIASES:
+        return AggregateField(*AGGREGATE_ALIASES[field])
+
+    source, _, rest = field.partition("_")
+    if source not in AGGREGATE_SOURCES:
+        return None
+    operation, _, column = rest.partition("_")
+    if operation not in AGGREGATE_OPERATIONS:
+        return None
+    if operation == "count":
+        return AggregateField(source, operation) if not column else None
+    return AggregateField(source, operation, column) if column else None
+
+
+def filter_predicates(record_filter: Any) -> List[Dict]:
+    """Koşulun filter tanımı -> [{"field", "operator", "value"}, ...] (hepsi sağlanmalı)
+
+    Tek koşul ({"field": "is_premium_fuel", "value": True}) veya koşul listesi
+    kabul edilir; operatörler profil koşullarıyla aynıdır (>, in, contains, ...).
+    Kayıtta olmayan alanın değeri None sayılır.
+    """
+    if not record_filter:
+        return []
+    if isinstance(record_filter, dict):
+        record_filter = [record_filter]
+
+    predicates = []
+    for predicate in record_filter:
+        if not isinstance(predicate, dict) or "field" not in predicate or "value" not in predicate:
+            raise ValueError(f"Geçersiz filtre koşulu: {predicate!r} (field ve value gerekli)")
+        predicates.append({
+            "field": predicate["field"],
+            "operator": predicate.get("operator", DEFAULT_FILTER_OPERATOR),
+            "value": predicate["value"],
+        })
+    return predicates
+
+
+def is_numeric(value: Any) -> bool:
+    """sum/avg/min/max'a giren değer"""
+    return isinstance(value, (int, float))
+
+
+def distinct_key(value: Any) -> Any:
+    """distinct sayımında değerin anahtarı (listeler eleman sırasıyla karşılaştırılır)"""
+    if isinstance(value, list):
+        return tuple(distinct_key(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, distinct_key(v)) for k, v in value.items()))
+    return value
+
+
+def to_kurus(amount: float) -> int:
+    """Tutar -> tam sayı kuruş; kuruşa tam inmeyen tutarda ValueError
+
+    Float toplamlar sıraya bağlı yuvarlama hatası bırakır (kümülatif toplamların
+    farkında 1226.53 + 3773.47 = 4999.999999999999 çıkar); kuruş toplamları kesindir.
+    """
+    try:
+        kurus = round(amount * 100)
+    except (ValueError, OverflowError):  # NaN / sonsuz
+        raise ValueError(f"Tutar kuruşa tam inmiyor: {amount!r}")
+    if kurus / 100 != amount:
+        raise ValueError(f"Tutar kuruşa tam inmiyor: {amount!r}")
+    return kurus
+
+
+def exact_sum(values: List[Any], count: int = 1) -> float:
+    """Sayısal değerlerin toplamı / count
+
+    Değerlerin hepsi tam kuruşsa kuruş toplamından tek bölmeyle (kesin,
+    toplama sırasından bağımsız), değilse sırayla float toplamından. Satır
+    bazlı, vektörel ve SQL yolları aynı kuralı uygular.
+    """
+    try:
+        return sum(to_kurus(v) for v in values) / (count * 100)
+    except ValueError:
+        return sum(values) / count
+
+
+def aggregate_records(spec: AggregateField, records: List[Dict]) -> Any:
+    """Zamana göre sıralı kayıtlar üzerinde agregasyon (None: değer yok, koşul sağlanamaz)
+
+    Boş kümede count/sum/distinct 0, diğerleri None'dır. sum/avg tam kuruş
+    değerlerde kesindir (bkz. exact_sum). first/last
+    penceredeki en eski/en yeni kaydın değeridir (aynı saniyede dosya sırası).
+    """
+    operation = spec.operation
+    if operation == "count":
+        return len(records)
+
+    column = spec.column
+    if operation in ("first", "last"):
+        if not records:
+            return None
+        return records[0 if operation == "first" else -1].get(column)
+
+    values = [record.get(column) for record in records]
+    if operation == "distinct":
+        return len({distinct_key(v) for v in values if v is not None})
+
+    values = [v for v in values if is_numeric(v)]
+    if operation == "sum":
+        return exact_sum(values)
+    if not values:
+        return None
+    if operation == "avg":
+        return exact_sum(values, len(values))
+    return min(values) if operation == "min" else max(values)
@@ -0,0 +1,104 @@
+"""
+CDP Demo - Bitmap Index
+Düşük kardinaliteli profil alanlarında değer başına müşteri bitmap'i
+"""
+
+from typing import List, Dict, Any, Callable, Iterable, Optional
+
+from columnar_store import ColumnarTable, HAS_NUMPY
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+# Bitmap tutulan profil alanları
+BITMAP_FIELDS = ("city", "segment", "email_opted_in", "has_app", "gender", "loyalty_card")
+
+# Bitmap'lerle cevaplanan operatörler
+BITMAP_OPERATORS = {"eq", "==", "ne", "!=", "in"}
+
+_MISSING = object()
+
+
+def bitmap_rows(bitmap: int, size: int) -> List[int]:
+    """Bitmap'teki 1 bitlerinin satır numaraları (artan sırada)"""
+    data = bitmap.to_bytes((size + 7) // 8, "little")
+    if HAS_NUMPY:
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder="little")
+        return np.flatnonzero(bits[:size]).tolist()
+
+    rows = []
+    for byte_index, byte in enumerate(data):
+        if byte:
+            base = byte_index * 8
+            rows.extend(base + bit for bit in range(8) if byte >> bit & 1)
+    return rows
+
+
+class BitmapIndex:
+    """Alan -> değer -> müşteri bitmap'i (Python int, bit i = i. müşteri)"""
+
+    def __init__(self, size: int, bitmaps: Dict[str, Dict[Any, int]]):
+        self.size = size
+        self.bitmaps = bitmaps
+        self.all_rows = (1 << size) - 1
+
+    @classmethod
+    def build(cls, customers: Iterable[Dict], fields: Iterable[str] = BITMAP_FIELDS) -> "BitmapIndex":
+        """Müşteri listesinden (veya kolon tablosundan) index oluştur"""
+        if isinstance(customers, ColumnarTable):
+            size = len(customers)
+            columns = {f: customers.decode_column(f) for f in fields if f in customers}
+        else:
+            customers = list(customers)
+            size = len(customers)
+            columns = {f: [c.get(f, _MISSING) for c in customers] for f in fields}
+
+        bitmaps = {}
+        for field, values in columns.items():
+            positions = {}
+            try:
+                for row, value in enumerate(values):
+                    if value is not _MISSING:
+                        positions.setdefault(value, []).append(row)
+            except TypeError:
+                continue  # Hash'lenemeyen değerler (liste vb.) indexlenmez
+            if positions:
+                bitmaps[field] = {value: cls._from_rows(rows, size) for value, rows in positions.items()}
+
+        return cls(size, bitmaps)
+
+    @staticmethod
+    def _from_rows(rows: List[int], size: int) -> int:
+        """Satır numaralarından bitmap"""
+        data = bytearray((size + 7) // 8)
+        for row in rows:
+            data[row >> 3] |= 1 << (row & 7)
+        return int.from_bytes(data, "little")
+
+    def can_answer(self, condition: Dict) -> bool:
+        """Koşul sadece bitmap'lerle cevaplanabilir mi"""
+        return condition["field"] in self.bitmaps and condition["operator"] in BITMAP_OPERATORS
+
+    def resolve(self, condition: Dict, compare: Callable[[Any, str, Any], bool]) -> int:
+        """Koşulu sağlayan değerlerin bitmap'lerini OR'la"""
+        result = 0
+        for value, bitmap in self.bitmaps[condition["field"]].items():
+            if compare(value, condition["operator"], condition["value"]):
+                result |= bitmap
+        return result
+
+    def resolve_segment(self, segment, compare: Callable[[Any, str, Any], bool]) -> Optional[int]:
+        """Tüm koşullar bitmap'le cevaplanabiliyorsa segment bitmap'i, değilse None"""
+        if not all(self.can_answer(cond) for cond in segment.conditions):
+            return None
+
+        if segment.logic == "AND":
+            result = self.all_rows
+            for cond in segment.conditions:
+                result &= self.resolve(cond, compare)
+        else:  # OR
+            result = 0
+            for cond in segment.conditions:
+                result |= self.resolve(cond, compare)
+        return result
@@ -0,0 +1,334 @@
+"""
+CDP Demo - Kolon Bazlı Veri Deposu
+Müşteri, işlem ve event verisini alan başına tipli NumPy dizilerinde tutar
+"""
+
+from collections.abc import Sequence
+from typing import List, Dict, Any, Callable, Iterable, Optional
+
+from customer_keys import CustomerKeys
+
+# NumPy (opsiyonel - sadece kolon bazlı backend için gerekli)
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+
+# Her zaman sözlük kodlanan alanlar
+CATEGORICAL_FIELDS = {"city", "segment", "fuel_type"}
+
+# Epoch saniyesi (int64) olarak tutulan alanlar
+TIMESTAMP_FIELDS = {"timestamp"}
+
+# Bu orandan az farklı değeri olan string kolonlar da otomatik kodlanır
+AUTO_CATEGORICAL_RATIO = 0.05
+AUTO_CATEGORICAL_MAX = 256
+
+# Ertelenmiş depoda ilk erişimde kurulan tablo ve müşteri kodları, veri setine göre
+TABLE_ATTRIBUTES = {
+    "transactions": ("transactions", "tx_customer"),
+    "events": ("events", "ev_customer"),
+}
+
+
+def _smallest_int_dtype(max_value: int):
+    """Kod dizisi için en küçük işaretli tamsayı tipi"""
+    if max_value < 2 ** 7:
+        return np.int8
+    if max_value < 2 ** 15:
+        return np.int16
+    return np.int32
+
+
+class CategoricalColumn:
+    """Sözlük kodlu kategorik kolon (kodlar + kategori listesi)"""
+
+    __slots__ = ("codes", "categories")
+
+    def __init__(self, codes, categories: List[Any]):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def encode(cls, values: List[Any]) -> "CategoricalColumn":
+        """Değer listesini sözlük kodla"""
+        index = {}
+        codes = [index.setdefault(v, len(index)) for v in values]
+        dtype = _smallest_int_dtype(max(len(index) - 1, 0))
+        return cls(np.array(codes, dtype=dtype), list(index))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def lookup(self, table) -> "np.ndarray":
+        """Kategori başına hesaplanmış değerleri satırlara yay"""
+        return np.asarray(table)[self.codes]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+
+class ColumnarTable:
+    """Kolon bazlı tablo; satırlar istendiğinde dict olarak üretilir"""
+
+    def __init__(self, columns: Dict[str, Any], kinds: Dict[str, str], length: int):
+        self.columns = columns
+        self.kinds = kinds
+        self.length = length
+
+    @classmethod
+    def from_records(cls, records: List[Dict], categorical: Iterable[str] = ()) -> "ColumnarTable":
+        """Dict listesinden tablo oluştur"""
+        categorical = set(categorical) | CATEGORICAL_FIELDS
+        field_names = []
+        for record in records[:1]:
+            field_names.extend(record.keys())
+        for record in records:
+            if len(record) != len(field_names):
+                for key in record:
+                    if key not in field_names:
+                        field_names.append(key)
+
+        columns = {}
+        kinds = {}
+        for name in field_names:
+            values = [r.get(name) for r in records]
+            kinds[name], columns[name] = cls._build_column(name, values, categorical)
+
+        return cls(columns, kinds, len(records))
+
+    @staticmethod
+    def _build_column(name: str, values: List[Any], categorical: set):
+        """Değer tiplerine göre kolon türünü seç ve diziyi oluştur"""
+        types = {type(v) for v in values}
+
+        if name in TIMESTAMP_FIELDS and types == {str}:
+            return "timestamp", np.array(values, dtype="datetime64[s]").astype(np.int64)
+
+        if types == {bool}:
+            return "bool", np.array(values, dtype=np.bool_)
+
+        if types == {int}:
+            arr = np.array(values, dtype=np.int64)
+            if len(arr) and arr.min() >= -2 ** 31 and arr.max() < 2 ** 31:
+                arr = arr.astype(np.int32)
+            return "int", arr
+
+        if types and types <= {int, float}:
+            return "float", np.array(values, dtype=np.float64)
+
+        if types == {str}:
+            distinct = len(set(values))
+            if name in categorical or distinct <= max(AUTO_CATEGORICAL_MAX, len(values) * AUTO_CATEGORICAL_RATIO):
+                return "categorical", CategoricalColumn.encode(values)
+            encoded = [v.encode("utf-8") for v in values]
+            width = max((len(v) for v in encoded), default=1) or 1
+            return "bytes", np.array(encoded, dtype=f"S{width}")
+
+        # Karışık tipler, liste alanlar (market_items) ve None içeren kolonlar
+        arr = np.empty(len(values), dtype=object)
+        arr[:] = values
+        return "object", arr
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        batch = 4096
+        for start in range(0, self.length, batch):
+            yield from self.rows(range(start, min(start + batch, self.length)))
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return self.rows([index])[0]
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.columns
+
+    def decode_column(self, name: str, indices=None) -> List[Any]:
+        """Kolonu (veya bir kısmını) Python değerlerine çevir"""
+        column = self.columns[name]
+        if self.kinds[name] == "categorical":
+            codes = column.codes if indices is None else column.codes[indices]
+            categories = column.categories
+            return [categories[c] for c in codes.tolist()]
+        return self.decode_values(name, column if indices is None else column[indices])
+
+    def decode_values(self, name: str, values) -> List[Any]:
+        """Kolonun ham dizi değerlerini Python değerlerine çevir"""
+        kind = self.kinds[name]
+        if kind == "categorical":
+            categories = self.columns[name].categories
+            return [categories[c] for c in values.tolist()]
+        if kind == "timestamp":
+            strings = np.datetime_as_string(values.astype("datetime64[s]"), unit="s")
+            return [s.replace("T", " ") for s in strings.tolist()]
+        if kind == "bytes":
+            return [v.decode("utf-8") for v in values.tolist()]
+        return values.tolist()
+
+    def slice(self, start: int, stop: int) -> "ColumnarTable":
+        """Ardışık satır aralığı (kolonlar kopyalanmaz, görünüm olarak paylaşılır)"""
+        columns = {}
+        for name, column in self.columns.items():
+            if self.kinds[name] == "categorical":
+                columns[name] = CategoricalColumn(column.codes[start:stop], column.categories)
+            else:
+                columns[name] = column[start:stop]
+        return ColumnarTable(columns, dict(self.kinds), max(min(stop, self.length) - start, 0))
+
+    def take(self, indices) -> "ColumnarTable":
+        """Verilen satırlardan yeni tablo (kolonlar kopyalanır)"""
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {}
+        for name, column in self.columns.items():
+            if self.kinds[name] == "categorical":
+                columns[name] = CategoricalColumn(column.codes[indices], column.categories)
+            else:
+                columns[name] = column[indices]
+        return ColumnarTable(columns, dict(self.kinds), len(indices))
+
+    def rows(self, indices) -> List[Dict]:
+        """Verilen satırları dict olarak üret"""
+        indices = np.asarray(indices, dtype=np.int64)
+        names = list(self.columns)
+        decoded = [self.decode_column(name, indices) for name in names]
+        return [dict(zip(names, values)) for values in zip(*decoded)]
+
+    @property
+    def nbytes(self) -> int:
+        """Kolonların yaklaşık bellek kullanımı (byte)"""
+        total = 0
+        for name, column in self.columns.items():
+            total += column.nbytes
+            if self.kinds[name] == "object":
+                total += sum(len(v) * 8 + 56 for v in column if isinstance(v, list))
+        return total
+
+
+class ColumnarRows(Sequence):
+    """Tablonun verilen satırlarına liste gibi erişim; satırlar erişildikçe dict'e çevrilir, tutulmaz
+
+    Satır bazlı motorun müşteri indexinde kayıt listesi yerine kullanılır:
+    dilimler satır dizisinin görünümüdür, kopyalanmaz.
+    """
+
+    __slots__ = ("table", "indices")
+
+    def __init__(self, table: ColumnarTable, indices: "np.ndarray"):
+        self.table = table
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ColumnarRows(self.table, self.indices[index])
+        if index < 0:
+            index += len(self.indices)
+        if not 0 <= index < len(self.indices):
+            raise IndexError(index)
+        return self.table.rows(self.indices[index:index + 1])[0]
+
+    def __iter__(self):
+        return iter(self.table.rows(self.indices))
+
+
+class ColumnarStore:
+    """Müşteri, işlem ve event tabloları + müşteri kodları"""
+
+    def __init__(self, customers: List[Dict], transactions: List[Dict], events: List[Dict]):
+        if not HAS_NUMPY:
+            raise ImportError("Kolon bazlı backend için numpy gerekli: pip install numpy")
+
+        self.customers = ColumnarTable.from_records(customers)
+        self.transactions = ColumnarTable.from_records(transactions)
+        self.events = ColumnarTable.from_records(events)
+
+        self.customer_keys: Optional[CustomerKeys] = None
+        self.customer_index: Dict[str, int] = {}
+        self.tx_customer: Optional["np.ndarray"] = None
+        self.ev_customer: Optional["np.ndarray"] = None
+
+    @classmethod
+    def from_tables(cls, customers: ColumnarTable, transactions: ColumnarTable, events: ColumnarTable,
+                    tx_customer: "np.ndarray", ev_customer: "np.ndarray") -> "ColumnarStore":
+        """Hazır tablolar ve müşteri kodlarından depo (örn. paralel çalıştırmada shard)"""
+        store = cls.__new__(cls)
+        store.customers = customers
+        store.transactions = transactions
+        store.events = events
+        store.customer_keys = None
+        store.customer_index = {}
+        store.tx_customer = tx_customer
+        store.ev_customer = ev_customer
+        return store
+
+    @classmethod
+    def deferred(cls, customers: List[Dict], load: Callable[[str], Iterable[Dict]]) -> "ColumnarStore":
+        """İşlem/event tabloları ilk erişimde load(veri seti) kayıtlarından kurulan depo
+
+        memory ve compact backend'in vektörel yolu için: sadece profil veya
+        işlem alanı kullanan segmentler event verisini okutmaz.
+        """
+        store = cls.__new__(cls)
+        store.customers = ColumnarTable.from_records(customers)
+        store.customer_keys = None
+        store.customer_index = {}
+        store._load = load
+        return store
+
+    def __getattr__(self, name: str) -> Any:
+        """Ertelenmiş depo: tablo ve müşteri kodları ilk erişimde kurulur (bkz. TABLE_ATTRIBUTES)"""
+        load = self.__dict__.get("_load")
+        for dataset, (table_name, codes_name) in TABLE_ATTRIBUTES.items():
+            if load is not None and name in (table_name, codes_name):
+                table = self.__dict__[table_name] = ColumnarTable.from_records(load(dataset))
+                self.__dict__[codes_name] = self._customer_codes(table) if self.customer_keys is not None else None
+                return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def build_indexes(self):
+        """İşlem ve eventleri müşteri satır numarasına bağla (-1: bilinmeyen müşteri; kurulmamış tablolar atlanır)"""
+        self.customer_keys = CustomerKeys(self.customers.decode_column("customer_id"))
+        self.customer_index = self.customer_keys.index
+        for table_name, codes_name in TABLE_ATTRIBUTES.values():
+            if table_name in self.__dict__:
+                setattr(self, codes_name, self._customer_codes(self.__dict__[table_name]))
+
+    def _customer_codes(self, table: ColumnarTable) -> "np.ndarray":
+        """Tablodaki customer_id değerlerini müşteri satır numarasına çevir"""
+        if "customer_id" not in table:
+            return np.full(len(table), -1, dtype=np.int32)
+
+        column = table.columns["customer_id"]
+        if table.kinds["customer_id"] == "categorical":
+            mapping = np.array(
+                [self.customer_index.get(c, -1) for c in column.categories] or [-1],
+                dtype=np.int32,
+            )
+            return mapping[column.codes]
+
+        return np.array(
+            [self.customer_index.get(c, -1) for c in table.decode_column("customer_id")],
+            dtype=np.int32,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        total = self.customers.nbytes
+        for table_name, codes_name in TABLE_ATTRIBUTES.values():
+            if table_name in self.__dict__:
+                total += self.__dict__[table_name].nbytes
+            codes = self.__dict__.get(codes_name)
+            if codes is not None:
+                total += codes.nbytes
+        return total
@@ -0,0 +1,196 @@
+"""
+CDP Demo - Kompakt Kayıtlar
+İşlem/event kayıtlarını dict yerine alan başına array'lerde (struct-of-arrays) tutar
+"""
+
+from array import array
+from collections.abc import Mapping
+from typing import List, Dict, Any, Iterable, Optional
+
+# Kaydında olmayan alan (dict'te anahtar yok)
+_MISSING = object()
+
+# Sözlük kodlanan string alanlar: farklı değer sayısı bu oranı aşarsa liste olarak tutulur
+CODED_MAX_RATIO = 0.5
+
+
+class _Column:
+    """Tek bir alanın değerleri"""
+
+    __slots__ = ("kind", "values", "categories", "offsets")
+
+    def __init__(self, kind: str, values, categories: Optional[List[Any]] = None, offsets: Optional[array] = None):
+        self.kind = kind
+        self.values = values
+        self.categories = categories
+        self.offsets = offsets
+
+    def get(self, row: int) -> Any:
+        kind = self.kind
+        if kind == "coded":
+            return self.categories[self.values[row]]
+        if kind == "bool":
+            return self.values[row] == 1
+        if kind == "list":
+            start, stop = self.offsets[row], self.offsets[row + 1]
+            categories = self.categories
+            return [categories[code] for code in self.values[start:stop]]
+        return self.values[row]
+
+    @property
+    def nbytes(self) -> int:
+        """Dizilerin yaklaşık bellek kullanımı (byte; kategori listeleri hariç)"""
+        if isinstance(self.values, list):
+            return len(self.values) * 8
+        total = self.values.itemsize * len(self.values) if isinstance(self.values, array) else len(self.values)
+        if self.offsets is not None:
+            total += self.offsets.itemsize * len(self.offsets)
+        return total
+
+
+def _build_column(values: List[Any]) -> _Column:
+    """Değer tiplerine göre en küçük gösterimi seç"""
+    types = {type(v) for v in values}
+
+    if types == {bool}:
+        return _Column("bool", array("b", [1 if v else 0 for v in values]))
+
+    if types == {int}:
+        try:
+            return _Column("value", array("q", values))
+        except OverflowError:
+            pass
+
+    if types == {float}:
+        return _Column("value", array("d", values))
+
+    if types == {str}:
+        index = {}
+        codes = [index.setdefault(v, len(index)) for v in values]
+        if len(index) <= max(len(values) * CODED_MAX_RATIO, 1):
+            return _Column("coded", array("i", codes), list(index))
+        return _Column("value", values)
+
+    if types == {list} and all(isinstance(item, str) for v in values for item in v):
+        # market_items: offsets + değerler (ürün adları sözlük kodlu)
+        index = {}
+        offsets = array("i", [0])
+        codes = array("i")
+        for items in values:
+            codes.extend(index.setdefault(item, len(index)) for item in items)
+            offsets.append(len(codes))
+        return _Column("list", codes, list(index), offsets)
+
+    # Karışık tipler, None ve eksik alanlar
+    return _Column("object", values)
+
+
+class RecordView(Mapping):
+    """Tablonun bir satırına dict gibi erişim (tx["total_amount"], tx.get(...), dict(tx))"""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "RecordTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, field: str) -> Any:
+        column = self._table.columns.get(field)
+        if column is None:
+            raise KeyError(field)
+        value = column.get(self._row)
+        if value is _MISSING:
+            raise KeyError(field)
+        return value
+
+    def get(self, field: str, default: Any = None) -> Any:
+        column = self._table.columns.get(field)
+        if column is None:
+            return default
+        value = column.get(self._row)
+        return default if value is _MISSING else value
+
+    def __contains__(self, field: object) -> bool:
+        column = self._table.columns.get(field)
+        return column is not None and (column.kind != "object" or column.values[self._row] is not _MISSING)
+
+    def __iter__(self):
+        return (field for field in self._table.columns if field in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"RecordView({dict(self)!r})"
+
+
+class RecordTable:
+    """Kayıt listesinin kompakt hali; liste gibi indekslenir ve RecordView üretir
+
+    Sayılar array('q'/'d'), bool'lar array('b'), tekrar eden string'ler
+    sözlük kodlu array('i'), string listeleri (market_items) offsets +
+    kodlu değerler olarak tutulur.
+    """
+
+    def __init__(self, columns: Dict[str, _Column], length: int):
+        self.columns = columns
+        self.length = length
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "RecordTable":
+        """Kayıtlardan tablo oluştur (alan sırası: ilk kayıt + sonradan görülen alanlar)
+
+        records bir akış olabilir: değerler okundukça alan listelerine
+        eklenir, kayıt dict'leri tutulmaz.
+        """
+        values: Dict[str, List[Any]] = {}
+        length = 0
+        for record in records:
+            for name, value in record.items():
+                column = values.get(name)
+                if column is None:
+                    column = values[name] = [_MISSING] * length
+                column.append(value)
+            length += 1
+            if len(record) != len(values):
+                for column in values.values():
+                    if len(column) < length:
+                        column.append(_MISSING)
+
+        columns = {}
+        for name in list(values):
+            columns[name] = _build_column(values.pop(name))
+        return cls(columns, length)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RecordView(self, i) for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return RecordView(self, index)
+
+    def __iter__(self):
+        for row in range(self.length):
+            yield RecordView(self, row)
+
+    def column(self, field: str) -> List[Any]:
+        """Alanın tüm değerleri (eksik kayıtlarda None)"""
+        column = self.columns.get(field)
+        if column is None:
+            return [None] * self.length
+        values = [column.get(row) for row in range(self.length)]
+        return [None if v is _MISSING else v for v in values]
+
+    def rows(self, indices: Iterable[int]) -> List[Dict]:
+        """Verilen satırları dict olarak üret"""
+        return [dict(RecordView(self, i)) for i in indices]
+
+    @property
+    def nbytes(self) -> int:
+        """Kolon dizilerinin yaklaşık bellek kullanımı (byte)"""
+        return sum(column.nbytes for column in self.columns.values())
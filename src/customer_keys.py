@@ -0,0 +1,61 @@
+"""
+CDP Demo - Müşteri Anahtarları
+customer_id string'lerini yoğun int32 anahtarlara (müşteri satır numarası) çevirir
+"""
+
+from array import array
+from typing import List, Dict, Iterable
+
+# Müşteri tablosunda olmayan ID'ler
+UNKNOWN_KEY = -1
+
+
+def duplicate_id_error(customer_id: str) -> ValueError:
+    """Müşteri tablosunda tekrarlanan ID hatası"""
+    return ValueError(f"Tekrarlanan customer_id: {customer_id!r} (müşteri ID'leri tekil olmalı)")
+
+
+class CustomerKeys:
+    """customer_id <-> int32 anahtar eşlemesi
+
+    Anahtar müşterinin satır numarasıdır; ID'ler tekil olmalıdır (tekrarlanan
+    ID'de ValueError: işlemler birden çok müşteri satırına bağlanamaz).
+    İşlem/event indexleri ve segment sonuçları string yerine bu anahtarları tutar.
+    """
+
+    __slots__ = ("ids", "index")
+
+    def __init__(self, ids: List[str]):
+        self.ids = ids
+        self.index: Dict[str, int] = {cid: key for key, cid in enumerate(ids)}
+        if len(self.index) != len(ids):
+            raise duplicate_id_error(next(cid for key, cid in enumerate(ids) if self.index[cid] != key))
+
+    @classmethod
+    def from_records(cls, customers: Iterable[Dict]) -> "CustomerKeys":
+        return cls([c["customer_id"] for c in customers])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def key(self, customer_id: str) -> int:
+        """ID'nin anahtarı (bilinmiyorsa -1)"""
+        return self.index.get(customer_id, UNKNOWN_KEY)
+
+    def encode(self, customer_ids: Iterable[str]) -> array:
+        """ID'leri int32 anahtar dizisine çevir"""
+        get = self.index.get
+        return array("i", [get(cid, UNKNOWN_KEY) for cid in customer_ids])
+
+    def decode(self, keys: Iterable[int]) -> List[str]:
+        """Anahtarlardan ID'ler"""
+        ids = self.ids
+        return [ids[key] for key in keys]
+
+    def mask(self, keys: Iterable[int]) -> bytearray:
+        """Anahtar kümesinin üyelik maskesi (mask[key] == 1)"""
+        member = bytearray(len(self.ids))
+        for key in keys:
+            if key >= 0:
+                member[key] = 1
+        return member
@@ -0,0 +1,152 @@
+"""
+CDP Demo - Günlük İşlem Özetleri
+Müşteri başına gün bazlı işlem sayısı/tutarı (kuruş), kümülatif diziler olarak
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Iterable, Optional
+
+from aggregates import filter_predicates, is_numeric, to_kurus
+
+SECONDS_PER_DAY = 86_400
+
+# Günlük özetlerden (prefix-sum) cevaplanan işlem alanları
+ROLLUP_FIELDS = ("tx_count", "tx_total_amount", "tx_avg_amount")
+
+# Filtresiz pencere ve market alışverişi (market_amount > 0) kanalları
+ALL_CHANNEL = "all"
+MARKET_CHANNEL = "market"
+
+# Eşitlik filtreleri için kanal üretilen işlem alanları (premium / standart yakıt)
+ROLLUP_FILTER_FIELDS = ("is_premium_fuel",)
+MAX_CHANNEL_VALUES = 16
+
+
+def discover_channels(transactions: Iterable[Dict]) -> set:
+    """İşlem verisinden özet kanallarını belirle"""
+    values = {field: set() for field in ROLLUP_FILTER_FIELDS}
+    for tx in transactions:
+        for field, seen in values.items():
+            if field in tx and len(seen) <= MAX_CHANNEL_VALUES:
+                seen.add(tx[field])
+
+    channels = {ALL_CHANNEL, MARKET_CHANNEL}
+    for field, seen in values.items():
+        if len(seen) <= MAX_CHANNEL_VALUES:
+            channels.update((field, value) for value in seen)
+    return channels
+
+
+def channel_for_filter(filter_def: Any) -> Any:
+    """Koşul filtresine karşılık gelen kanal anahtarı (yoksa None)
+
+    Tek eşitlik koşulu (field, value) kanalına, market_amount > 0 market
+    kanalına karşılık gelir; diğer filtreler işlemler üzerinden hesaplanır.
+    """
+    predicates = filter_predicates(filter_def)
+    if not predicates:
+        return ALL_CHANNEL
+    if len(predicates) > 1:
+        return None
+    predicate = predicates[0]
+    if predicate["field"] == "market_amount" and predicate["operator"] in ("gt", ">") \
+            and predicate["value"] == 0:
+        return MARKET_CHANNEL
+    if predicate["operator"] not in ("eq", "=="):
+        return None
+    key = (predicate["field"], predicate["value"])
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def is_market(tx: Dict) -> bool:
+    """market_amount > 0 (olmayan, None veya sayı olmayan değer satır bazlı motordaki gibi eşleşmez)"""
+    amount = tx.get("market_amount")
+    return is_numeric(amount) and amount > 0
+
+
+def transaction_channels(tx: Dict, channels: set) -> List[Any]:
+    """İşlemin katkı yaptığı kanallar"""
+    matched = [ALL_CHANNEL]
+    if is_market(tx):
+        matched.append(MARKET_CHANNEL)
+    for field in ROLLUP_FILTER_FIELDS:
+        key = (field, tx.get(field))
+        if key in channels:
+            matched.append(key)
+    return matched
+
+
+def matches_channel(tx: Dict, channel: Any) -> bool:
+    """İşlem verilen kanala giriyor mu"""
+    if channel == ALL_CHANNEL:
+        return True
+    if channel == MARKET_CHANNEL:
+        return is_market(tx)
+    field, value = channel
+    return tx.get(field) == value
+
+
+class DailyRollup:
+    """Bir müşterinin gün bazlı kümülatif işlem sayısı ve tutarı
+
+    Her kanal için (days, counts, amounts) tutulur: counts[k] / amounts[k]
+    days[:k] günlerinin toplamıdır (ilk eleman 0, tutarlar tam sayı kuruş).
+    Bir pencere iki dizi okumasıyla bulunur; pencerenin başladığı gün kısmi
+    olduğundan o günün işlemleri ayrıca eklenir.
+    """
+
+    __slots__ = ("channels",)
+
+    def __init__(self, channels: Dict[Any, tuple]):
+        self.channels = channels
+
+    @classmethod
+    def build(cls, transactions: List[Dict], times: array, channels: set) -> "DailyRollup":
+        """Zamana göre sıralı işlemlerden özet oluştur (kuruşa tam inmeyen tutarda ValueError)"""
+        built = {}
+        for tx, ts in zip(transactions, times):
+            day = ts // SECONDS_PER_DAY
+            amount = to_kurus(tx["total_amount"])
+            for ch in transaction_channels(tx, channels):
+                series = built.get(ch)
+                if series is None:
+                    series = built[ch] = (array("q"), array("q", [0]), array("q", [0]))
+                days, counts, amounts = series
+                if not days or days[-1] != day:
+                    days.append(day)
+                    counts.append(counts[-1])
+                    amounts.append(amounts[-1])
+                counts[-1] += 1
+                amounts[-1] += amount
+
+        return cls(built)
+
+    def window(self, channel: Any, cutoff: Optional[int], transactions: List[Dict], times: array) -> tuple:
+        """cutoff (epoch saniyesi) ve sonrası için (işlem sayısı, kuruş cinsinden toplam tutar)"""
+        series = self.channels.get(channel)
+        if series is None:
+            return 0, 0
+        days, counts, amounts = series
+        if cutoff is None:
+            return counts[-1], amounts[-1]
+
+        cutoff_day = cutoff // SECONDS_PER_DAY
+        first_full = bisect_right(days, cutoff_day)
+        count = counts[-1] - counts[first_full]
+        total = amounts[-1] - amounts[first_full]
+
+        # Pencerenin başladığı gün: sadece cutoff sonrası işlemler
+        if first_full > 0 and days[first_full - 1] == cutoff_day:
+            start = bisect_left(times, cutoff)
+            end = bisect_left(times, (cutoff_day + 1) * SECONDS_PER_DAY)
+            for tx in transactions[start:end]:
+                if matches_channel(tx, channel):
+                    count += 1
+                    total += to_kurus(tx["total_amount"])
+
+        return count, total
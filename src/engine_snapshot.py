@@ -0,0 +1,164 @@
+"""
+CDP Demo - Motor Snapshot'ı
+Kolon deposunu ve hazır indexleri .npy blokları + manifest olarak yazar; memory-map ile açar
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from bitmap_index import BitmapIndex
+from columnar_store import ColumnarStore, ColumnarTable, CategoricalColumn, HAS_NUMPY
+from customer_keys import CustomerKeys
+
+if HAS_NUMPY:
+    import numpy as np
+
+SNAPSHOT_DIRNAME = "snapshot"
+MANIFEST_FILENAME = "manifest.json"
+
+# Dosya düzeni değişirse artırılır (eski snapshot'lar yeniden yazılır)
+SNAPSHOT_FORMAT = 1
+
+TABLES = ("customers", "transactions", "events")
+CUSTOMER_CODES = ("tx_customer", "ev_customer")
+
+
+def snapshot_dir(data_dir: Path) -> Path:
+    return Path(data_dir) / SNAPSHOT_DIRNAME
+
+
+def write_snapshot(store: ColumnarStore, bitmap_index: Optional[BitmapIndex], data_dir: Path,
+                   source_version: str) -> Path:
+    """Depoyu data_dir/snapshot/ altına yaz (geçici klasöre yazılır, sonra yer değiştirir)
+
+    Sayısal, bytes ve tarih kolonları ile kategorik kodlar ayrı .npy
+    dosyalarıdır; kategori listeleri manifest'te, object kolonlar
+    (market_items vb.) JSON olarak tutulur.
+    """
+    target = snapshot_dir(data_dir)
+    tmp = target.with_name(target.name + ".tmp")
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    def save(name: str, values: "np.ndarray") -> str:
+        filename = f"{name}.npy"
+        np.save(tmp / filename, np.ascontiguousarray(values), allow_pickle=False)
+        return filename
+
+    tables = {}
+    for table_name in TABLES:
+        table = getattr(store, table_name)
+        columns = {}
+        for position, (name, column) in enumerate(table.columns.items()):
+            kind = table.kinds[name]
+            stem = f"{table_name}.{position}"  # alan adları dosya adına uygun olmayabilir
+            if kind == "categorical":
+                columns[name] = {"kind": kind, "file": save(stem, column.codes), "categories": column.categories}
+            elif kind == "object":
+                filename = f"{stem}.json"
+                with open(tmp / filename, "w", encoding="utf-8") as f:
+                    json.dump(column.tolist(), f, ensure_ascii=False)
+                columns[name] = {"kind": kind, "file": filename}
+            else:
+                columns[name] = {"kind": kind, "file": save(stem, column)}
+        tables[table_name] = {"length": len(table), "columns": columns}
+
+    bitmaps = {}
+    if bitmap_index is not None:
+        width = (bitmap_index.size + 7) // 8
+        for position, (field, by_value) in enumerate(bitmap_index.bitmaps.items()):
+            values = list(by_value)
+            matrix = np.zeros((len(values), width), dtype=np.uint8)
+            for row, value in enumerate(values):
+                matrix[row] = np.frombuffer(by_value[value].to_bytes(width, "little"), dtype=np.uint8)
+            bitmaps[field] = {"values": values, "file": save(f"bitmap.{position}", matrix)}
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "source_version": source_version,
+        "tables": tables,
+        "customer_codes": {name: save(name, getattr(store, name)) for name in CUSTOMER_CODES},
+        "bitmaps": {"size": bitmap_index.size, "fields": bitmaps} if bitmap_index is not None else None,
+    }
+    # Manifest en son yazılır: yarım kalan snapshot hiç açılmaz
+    with open(tmp / MANIFEST_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+
+    if target.exists():
+        shutil.rmtree(target)
+    tmp.rename(target)
+    return target
+
+
+def load_manifest(data_dir: Path) -> Optional[Dict[str, Any]]:
+    """Snapshot manifesti (yoksa veya okunamıyorsa None)"""
+    path = snapshot_dir(data_dir) / MANIFEST_FILENAME
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshot(data_dir: Path, source_version: str) -> Optional[Tuple[ColumnarStore, Optional[BitmapIndex]]]:
+    """Geçerli snapshot'ı aç -> (depo, bitmap index); yoksa, eskiyse veya kaynak değiştiyse None
+
+    Diziler kopyalanmadan dosyadan memory-map edilir (salt okunur); sadece
+    object kolonlar ve bitmap'ler belleğe okunur.
+    """
+    if not HAS_NUMPY:
+        return None
+    manifest = load_manifest(data_dir)
+    if manifest is None or manifest.get("format") != SNAPSHOT_FORMAT \
+            or manifest.get("source_version") != source_version:
+        return None
+
+    directory = snapshot_dir(data_dir)
+
+    def load(filename: str) -> "np.ndarray":
+        return np.asarray(np.load(directory / filename, mmap_mode="r", allow_pickle=False))
+
+    try:
+        tables = {}
+        for table_name in TABLES:
+            spec = manifest["tables"][table_name]
+            columns = {}
+            kinds = {}
+            for name, column in spec["columns"].items():
+                kind = kinds[name] = column["kind"]
+                if kind == "categorical":
+                    columns[name] = CategoricalColumn(load(column["file"]), column["categories"])
+                elif kind == "object":
+                    with open(directory / column["file"], "r", encoding="utf-8") as f:
+                        values = json.load(f)
+                    columns[name] = np.empty(len(values), dtype=object)
+                    columns[name][:] = values
+                else:
+                    columns[name] = load(column["file"])
+            tables[table_name] = ColumnarTable(columns, kinds, spec["length"])
+
+        codes = {name: load(filename) for name, filename in manifest["customer_codes"].items()}
+
+        bitmap_index = None
+        if manifest["bitmaps"] is not None:
+            size = manifest["bitmaps"]["size"]
+            bitmaps = {}
+            for field, spec in manifest["bitmaps"]["fields"].items():
+                matrix = load(spec["file"])
+                bitmaps[field] = {
+                    value: int.from_bytes(matrix[row].tobytes(), "little")
+                    for row, value in enumerate(spec["values"])
+                }
+            bitmap_index = BitmapIndex(size, bitmaps)
+    except (OSError, ValueError, KeyError):
+        return None  # Eksik / bozuk dosya: kaynak veriden yeniden kurulur
+
+    store = ColumnarStore.from_tables(
+        tables["customers"], tables["transactions"], tables["events"], codes["tx_customer"], codes["ev_customer"]
+    )
+    store.customer_keys = CustomerKeys(store.customers.decode_column("customer_id"))
+    store.customer_index = store.customer_keys.index
+    return store, bitmap_index
@@ -6,10 +6,13 @@ Petrol Ofisi benzeri senaryo için gerçekçi müşteri ve işlem verisi
 import random
 import hashlib
 import json
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
 import csv
 
+from record_stream import DATA_FORMATS, dataset_paths, write_jsonl
+
 # Türk isimleri
 FIRST_NAMES = [
     "Ahmet", "Mehmet", "Mustafa", "Ali", "Hüseyin", "Hasan", "İbrahim", "Ömer", "Osman", "Yusuf",
@@ -243,20 +246,25 @@ def generate_digital_events(customers, days=90):
     return sorted(events, key=lambda x: x["timestamp"])
 
 
-def save_data(customers, transactions, events, output_dir="data"):
-    """Veriyi JSON ve CSV olarak kaydet"""
+def save_data(customers, transactions, events, output_dir="data", data_format="json"):
+    """Veriyi JSON (veya JSON Lines) ve CSV olarak kaydet"""
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"Bilinmeyen veri formatı: {data_format} (desteklenen: {', '.join(DATA_FORMATS)})")
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
     
-    # JSON
-    with open(output_path / "customers.json", "w", encoding="utf-8") as f:
-        json.dump(customers, f, ensure_ascii=False, indent=2)
-    
-    with open(output_path / "transactions.json", "w", encoding="utf-8") as f:
-        json.dump(transactions, f, ensure_ascii=False, indent=2)
-    
-    with open(output_path / "events.json", "w", encoding="utf-8") as f:
-        json.dump(events, f, ensure_ascii=False, indent=2)
+    for name, records in (("customers", customers), ("transactions", transactions), ("events", events)):
+        # Diğer formattaki eski dosya kalırsa okuyucu onu seçebilir (.jsonl önceliklidir)
+        for stale in dataset_paths(output_path, name):
+            if stale.exists():
+                stale.unlink()
+        
+        if data_format == "jsonl":
+            # JSON Lines: satır başına bir kayıt, okurken akış halinde indexlenir
+            write_jsonl(records, output_path / f"{name}.jsonl")
+        else:
+            with open(output_path / f"{name}.json", "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
     
     # CSV
     if customers:
@@ -299,8 +307,8 @@ if __name__ == "__main__":
     transactions = generate_transactions(customers, days=90)
     events = generate_digital_events(customers, days=90)
     
-    # Kaydet
-    save_data(customers, transactions, events, "data")
+    # Kaydet (--jsonl: JSON Lines)
+    save_data(customers, transactions, events, "data", "jsonl" if "--jsonl" in sys.argv else "json")
     
     # Özet istatistikler
     print("\n📊 Özet İstatistikler:")
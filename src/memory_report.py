@@ -0,0 +1,170 @@
+"""
+CDP Demo - Bellek Raporu
+Motorun veri setleri ve indexleri için derin boyut tahmini + yükleme sırasındaki tepe bellek (tracemalloc)
+"""
+
+import mmap
+import os
+import sys
+import tracemalloc
+import types
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Gezilmeyen nesneler: kod, modül, sınıf ve fonksiyonlar (bağlı metodlar motora geri götürür)
+_OPAQUE_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    types.CodeType, types.FrameType,
+)
+
+
+def configured_trace_memory(trace_memory: Optional[bool] = None) -> bool:
+    """Yükleme tepe ölçümü: parametre, yoksa CDP_TRACE_MEMORY (varsayılan kapalı)"""
+    if trace_memory is None:
+        return os.getenv("CDP_TRACE_MEMORY", "false").lower() == "true"
+    return trace_memory
+
+
+def deep_size(obj: Any, seen: Optional[set] = None) -> Tuple[int, int]:
+    """Nesnenin ve ulaşılabilen tüm nesnelerin boyutu -> (heap byte, dosyadan eşlenen byte)
+
+    list/dict/tuple/set elemanları, __dict__ / __slots__ alanları ve NumPy
+    dizileri (object dizilerde elemanlar da) sayılır. Görünümler ana diziyi
+    bir kez sayar; snapshot'tan memory-map edilen diziler heap'e değil
+    eşlenen byte'a yazılır. seen'deki nesneler tekrar sayılmaz: aynı seen
+    ile sırayla ölçülen yapılarda ortak nesneler ilk ölçülene yazılır.
+    """
+    if seen is None:
+        seen = set()
+    heap = 0
+    mapped = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, _OPAQUE_TYPES):
+            continue
+
+        if HAS_NUMPY and isinstance(obj, np.ndarray):
+            base = obj
+            while isinstance(base, np.ndarray) and base.base is not None:
+                base = base.base
+            if isinstance(base, mmap.mmap):
+                mapped += obj.nbytes
+            elif base is obj or id(base) not in seen:
+                seen.add(id(base))
+                heap += base.nbytes if isinstance(base, np.ndarray) else obj.nbytes
+            if obj.dtype == object:
+                stack.extend(obj.ravel().tolist())
+            continue
+
+        heap += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, (str, bytes, bytearray, int, float, bool)):
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for cls in type(obj).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    value = getattr(obj, slot, None)
+                    if value is not None:
+                        stack.append(value)
+    return heap, mapped
+
+
+@dataclass
+class MemoryEntry:
+    """Bir yapının bellek kullanımı"""
+    name: str
+    kind: str  # data, index, cache
+    bytes: int  # Python heap + NumPy tamponları
+    mapped_bytes: int = 0  # Snapshot dosyasından memory-map (sadece okunan sayfalar RAM'e girer)
+
+
+@dataclass
+class MemoryReport:
+    """Motorun veri setleri, indexleri ve önbelleklerinin bellek raporu"""
+    backend: str
+    entries: List[MemoryEntry] = field(default_factory=list)
+    peaks: Dict[str, int] = field(default_factory=dict)  # Aşama -> tracemalloc tepe artışı (byte)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.bytes for entry in self.entries)
+
+    @property
+    def mapped_bytes(self) -> int:
+        return sum(entry.mapped_bytes for entry in self.entries)
+
+    def by_kind(self) -> Dict[str, int]:
+        """Tür -> toplam byte"""
+        totals: Dict[str, int] = {}
+        for entry in self.entries:
+            totals[entry.kind] = totals.get(entry.kind, 0) + entry.bytes
+        return totals
+
+    def describe(self) -> str:
+        """Raporu okunabilir metin olarak döndür"""
+        mb = 1024 * 1024
+        lines = [f"Bellek: {self.backend} backend, {self.total_bytes / mb:,.1f} MB"
+                 + (f" (+{self.mapped_bytes / mb:,.1f} MB memory-map)" if self.mapped_bytes else "")]
+        for entry in self.entries:
+            mapped = f" +{entry.mapped_bytes / mb:,.1f} MB mmap" if entry.mapped_bytes else ""
+            lines.append(f"  {entry.kind:<5} {entry.name:<28} {entry.bytes / mb:>9,.2f} MB{mapped}")
+        for phase, peak in self.peaks.items():
+            lines.append(f"  tepe  {phase:<28} {peak / mb:>9,.2f} MB")
+        return "\n".join(lines)
+
+
+class MemoryTracer:
+    """Aşama başına tracemalloc tepe ölçümü (kapalıyken maliyetsiz)
+
+    tracemalloc açık değilse ilk aşamada başlatılır, en dıştaki aşama
+    bitince durdurulur. İç içe aşamalarda dış aşamanın tepesi iç
+    aşamalarınkini de kapsar. tracemalloc bellek ayırmalarını yavaşlattığı
+    için varsayılan kapalıdır (CDP_TRACE_MEMORY=true).
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.peaks: Dict[str, int] = {}
+        self._frames: List[list] = []  # [başlangıç, önceki tepe] yığını
+        self._started = False
+
+    @contextmanager
+    def phase(self, name: str):
+        """Blok süresince ayrılan belleğin tepe artışını peaks[name]'e yaz"""
+        if not self.enabled:
+            yield
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._frames:
+            # reset_peak dış aşamanın o ana kadarki tepesini siler: sakla
+            self._frames[-1][1] = max(self._frames[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, 0]
+        self._frames.append(frame)
+        try:
+            yield
+        finally:
+            self._frames.pop()
+            peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+            self.peaks[name] = peak - frame[0]
+            if not self._frames and self._started:
+                tracemalloc.stop()
+                self._started = False
@@ -0,0 +1,208 @@
+"""
+CDP Demo - Paralel Segment Çalıştırıcı
+Müşterileri shard'lara bölüp vektörel derleyiciyi süreç havuzunda çalıştırır
+"""
+
+import os
+import weakref
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Callable, Optional
+
+from columnar_store import ColumnarStore, ColumnarTable, CategoricalColumn, HAS_NUMPY
+from segment_compiler import SegmentCompiler
+from time_utils import EvaluationClock
+
+if HAS_NUMPY:
+    import numpy as np
+
+DEFAULT_WORKERS = 1
+
+# Workerlara gönderilen segment (SegmentDefinition'ın derleyicinin kullandığı alanları)
+ShardSegment = namedtuple("ShardSegment", ["name", "conditions", "logic"])
+
+
+def configured_workers(workers: Optional[int] = None) -> int:
+    """Worker sayısı: parametre, yoksa CDP_WORKERS (0 = CPU sayısı)"""
+    if workers is None:
+        workers = int(os.getenv("CDP_WORKERS", DEFAULT_WORKERS))
+    if workers < 0:
+        raise ValueError(f"Geçersiz worker sayısı: {workers}")
+    return workers or os.cpu_count() or 1
+
+
+class SharedColumns:
+    """Kolon deposunun shared memory kopyası
+
+    İşlemler ve eventler müşteri satır numarasına göre (stabil) sıralanır;
+    böylece her shard müşteri, işlem ve event tablolarında ardışık birer
+    aralıktır ve worker kopyalamadan dilimler. Sayısal/bytes kolonlar ve
+    kategorik kodlar shared memory'dedir; kategori listeleri ve object
+    kolonlar (market_items vb.) worker başına bir kez pickle ile gönderilir.
+    """
+
+    def __init__(self, store: ColumnarStore):
+        self.blocks: List[shared_memory.SharedMemory] = []
+
+        tx_order = self._owner_order(store.tx_customer)
+        ev_order = self._owner_order(store.ev_customer)
+        self.layout = {
+            "customers": self._share_table(store.customers),
+            "transactions": self._share_table(store.transactions, tx_order),
+            "events": self._share_table(store.events, ev_order),
+            "tx_customer": self._share_array(store.tx_customer[tx_order]),
+            "ev_customer": self._share_array(store.ev_customer[ev_order]),
+        }
+        self.tx_owners = store.tx_customer[tx_order]
+        self.ev_owners = store.ev_customer[ev_order]
+
+    @staticmethod
+    def _owner_order(owners: "np.ndarray") -> "np.ndarray":
+        """Bilinen müşteriye ait satırlar, müşteriye göre stabil sıralı (müşteri içi sıra korunur)"""
+        known = np.flatnonzero(owners >= 0)
+        return known[np.argsort(owners[known], kind="stable")]
+
+    def _share_array(self, values: "np.ndarray") -> tuple:
+        """Diziyi shared memory bloğuna kopyala -> (blok adı, dtype, boyut)"""
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self.blocks.append(block)
+        np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+        return block.name, values.dtype.str, values.shape
+
+    def _share_table(self, table: ColumnarTable, order: Optional["np.ndarray"] = None) -> Dict:
+        """Tablonun kolonlarını paylaş (order: satır sırası)"""
+        columns = {}
+        for name, column in table.columns.items():
+            kind = table.kinds[name]
+            if kind == "categorical":
+                codes = column.codes if order is None else column.codes[order]
+                columns[name] = ("categorical", self._share_array(codes), column.categories)
+            elif kind == "object":
+                columns[name] = ("object", column if order is None else column[order])
+            else:
+                columns[name] = ("shared", self._share_array(column if order is None else column[order]))
+        length = len(table) if order is None else len(order)
+        return {"kinds": dict(table.kinds), "length": length, "columns": columns}
+
+    def shards(self, size: int, count: int) -> List[tuple]:
+        """Müşteri aralıklarına göre shard sınırları (müşteri, işlem, event)"""
+        bounds = [size * i // count for i in range(count + 1)]
+        tx_bounds = np.searchsorted(self.tx_owners, bounds).tolist()
+        ev_bounds = np.searchsorted(self.ev_owners, bounds).tolist()
+        return [
+            (bounds[i], bounds[i + 1], tx_bounds[i], tx_bounds[i + 1], ev_bounds[i], ev_bounds[i + 1])
+            for i in range(count)
+            if bounds[i] < bounds[i + 1]
+        ]
+
+
+def _release_blocks(blocks: List[shared_memory.SharedMemory]):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+# --- Worker tarafı ---
+
+_worker: Dict[str, Any] = {}
+
+
+def _attach_worker(layout: Dict, compare: Callable[[Any, str, Any], bool]):
+    """Worker başlangıcı: shared memory bloklarına bağlan, tabloları kur"""
+    blocks = []
+
+    def attach(spec: tuple) -> "np.ndarray":
+        name, dtype, shape = spec
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    tables = {}
+    for table_name in ("customers", "transactions", "events"):
+        shared = layout[table_name]
+        columns = {}
+        for name, spec in shared["columns"].items():
+            if spec[0] == "categorical":
+                columns[name] = CategoricalColumn(attach(spec[1]), spec[2])
+            elif spec[0] == "object":
+                columns[name] = spec[1]
+            else:
+                columns[name] = attach(spec[1])
+        tables[table_name] = ColumnarTable(columns, shared["kinds"], shared["length"])
+
+    _worker.update(
+        tables=tables,
+        tx_customer=attach(layout["tx_customer"]),
+        ev_customer=attach(layout["ev_customer"]),
+        compare=compare,
+        blocks=blocks,
+    )
+
+
+def _evaluate_shard(shard: tuple, segments: List[ShardSegment], now: datetime) -> List["np.ndarray"]:
+    """Bir shard için segment üyeleri (global müşteri satır numaraları)"""
+    c_lo, c_hi, t_lo, t_hi, e_lo, e_hi = shard
+    tables = _worker["tables"]
+    store = ColumnarStore.from_tables(
+        tables["customers"].slice(c_lo, c_hi),
+        tables["transactions"].slice(t_lo, t_hi),
+        tables["events"].slice(e_lo, e_hi),
+        _worker["tx_customer"][t_lo:t_hi] - c_lo,
+        _worker["ev_customer"][e_lo:e_hi] - c_lo,
+    )
+    masks = SegmentCompiler(store, _worker["compare"]).evaluate_many(segments, EvaluationClock(now))
+    return [np.flatnonzero(mask) + c_lo for mask in masks]
+
+
+class ShardedExecutor:
+    """Segmentleri müşteri shard'ları üzerinde paralel değerlendirir
+
+    Her shard aynı değerlendirme anıyla (now) çalışır; shard sonuçları
+    müşteri sırasıyla birleştirildiğinden sonuç seri çalıştırmayla aynıdır.
+    """
+
+    def __init__(self, store: ColumnarStore, compare: Callable[[Any, str, Any], bool], workers: int):
+        self.store = store
+        self.compare = compare
+        self.workers = workers
+        self._columns: Optional[SharedColumns] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._finalizer = None
+
+    def _start(self):
+        """Shared memory kopyasını ve süreç havuzunu ilk ihtiyaçta kur"""
+        self._columns = SharedColumns(self.store)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_attach_worker,
+            initargs=(self._columns.layout, self.compare),
+        )
+        self._finalizer = weakref.finalize(self, _shutdown, self._pool, self._columns.blocks)
+
+    def evaluate_many(self, segments: List[Any], now: Optional[datetime] = None) -> List["np.ndarray"]:
+        """Segment başına eşleşen müşteri satır numaraları"""
+        if self._pool is None:
+            self._start()
+        now = now or datetime.now()
+        payload = [ShardSegment(s.name, s.conditions, s.logic) for s in segments]
+        shards = self._columns.shards(len(self.store.customers), self.workers)
+
+        futures = [self._pool.submit(_evaluate_shard, shard, payload, now) for shard in shards]
+        partials = [future.result() for future in futures]
+
+        empty = np.zeros(0, dtype=np.int64)
+        return [np.concatenate([p[i] for p in partials] or [empty]) for i in range(len(segments))]
+
+    def close(self):
+        """Havuzu kapat ve shared memory'yi serbest bırak"""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._pool = None
+        self._columns = None
+
+
+def _shutdown(pool: ProcessPoolExecutor, blocks: List[shared_memory.SharedMemory]):
+    pool.shutdown(wait=True)
+    _release_blocks(blocks)
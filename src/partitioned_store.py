@@ -0,0 +1,183 @@
+"""
+CDP Demo - Tarih Bölümlü Veri Düzeni
+İşlem ve eventleri gün/ay dosyalarına böler; sadece gereken pencerenin dosyalarını okur
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from record_stream import dataset_path, dataset_paths, iter_records, write_jsonl
+from segment_cache import data_version
+from time_utils import parse_timestamp
+
+PARTITIONED_TABLES = ("transactions", "events")
+MANIFEST_FILENAME = "_manifest.json"
+
+# Bölüm anahtarı = zaman damgasının ilk N karakteri ('YYYY-MM-DD HH:MM:SS')
+GRANULARITIES = {"day": 10, "month": 7}
+DEFAULT_GRANULARITY = "day"
+
+# Zaman damgası okunamayan kayıtlar: her yüklemede okunur
+UNDATED_PARTITION = "undated"
+
+
+# Pencereyle sınırlanabilen tx_last_days karşılaştırmaları
+LAST_DAYS_OPERATORS = {"eq", "==", "ne", "!=", "gt", ">", "gte", ">=", "lt", "<", "lte", "<=", "in"}
+
+
+def last_days_window(condition: Dict) -> Optional[int]:
+    """tx_last_days koşulu için yeterli gün penceresi (None: tüm geçmiş)
+
+    Son işlemi N günlük pencerenin dışında kalan müşterinin değeri tam
+    geçmişte >= N, pencereli yüklemede >= N veya 9999'dur (işlem yok);
+    N koşuldaki her sayıdan büyükse karşılaştırma sonucu değişmez.
+    """
+    if condition["operator"] not in LAST_DAYS_OPERATORS:
+        return None
+    values = condition["value"] if condition["operator"] == "in" else [condition["value"]]
+    if not isinstance(values, (list, tuple, set)) or not values:
+        return None
+    if any(isinstance(v, bool) or not isinstance(v, (int, float)) or not 0 <= v < 9998 for v in values):
+        return None  # Sayı olmayan veya "işlem yok" değerine (9999) uzanan karşılaştırmalar
+    return int(max(values)) + 1
+
+
+def history_window(segments: Iterable[Any]) -> Optional[float]:
+    """Segmentlerin ihtiyaç duyduğu en geniş gün penceresi (None: tüm geçmiş, 0: işlem/event gerekmez)"""
+    window = 0
+    for segment in segments:
+        for condition in segment.conditions:
+            field = condition["field"]
+            if not field.startswith(("tx_", "event_")):
+                continue
+            if "days" in condition:
+                window = max(window, condition["days"])
+                continue
+            days = last_days_window(condition) if field == "tx_last_days" else None
+            if days is None:
+                return None  # Zaman sınırı yok: tüm geçmiş
+            window = max(window, days)
+    return window
+
+
+def write_partitions(records: Iterable[Dict], output_dir: Path, table: str,
+                     granularity: str = DEFAULT_GRANULARITY, source_version: Optional[str] = None) -> Dict:
+    """Kayıtları table/<bölüm>.jsonl dosyalarına yaz (bölüm içi sıra dosya sırasıdır) + manifest"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Bilinmeyen bölümleme: {granularity} (desteklenen: {', '.join(GRANULARITIES)})")
+    width = GRANULARITIES[granularity]
+
+    partitions: Dict[str, List[Dict]] = {}
+    total = 0
+    for record in records:
+        timestamp = record.get("timestamp")
+        key = timestamp[:width] if isinstance(timestamp, str) else UNDATED_PARTITION
+        partitions.setdefault(key, []).append(record)
+        total += 1
+
+    directory = Path(output_dir) / table
+    directory.mkdir(parents=True, exist_ok=True)
+    for pattern in ("*.json", "*.jsonl"):
+        for stale in directory.glob(pattern):
+            stale.unlink()
+
+    entries = []
+    for key in sorted(partitions):
+        rows = partitions[key]
+        write_jsonl(rows, directory / f"{key}.jsonl")
+        entry = {"key": key, "file": f"{key}.jsonl", "rows": len(rows), "start": None, "end": None}
+        if key != UNDATED_PARTITION:
+            times = [parse_timestamp(r["timestamp"]) for r in rows]
+            entry["start"], entry["end"] = min(times), max(times)
+        entries.append(entry)
+
+    manifest = {
+        "table": table,
+        "granularity": granularity,
+        "source_version": source_version,
+        "rows": total,
+        "partitions": entries,
+    }
+    with open(directory / MANIFEST_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def partition_data(data_dir: str = "data", granularity: str = DEFAULT_GRANULARITY) -> Dict[str, Dict]:
+    """data_dir/transactions ve events dosyalarını bölümlere ayır -> tablo -> manifest"""
+    data_dir = Path(data_dir)
+    manifests = {}
+    for table in PARTITIONED_TABLES:
+        source = dataset_path(data_dir, table)
+        manifests[table] = write_partitions(iter_records(source), data_dir, table, granularity, data_version([source]))
+    return manifests
+
+
+def load_manifest(data_dir: Path, table: str) -> Optional[Dict]:
+    """Tablonun bölüm manifesti (yoksa None)"""
+    path = Path(data_dir) / table / MANIFEST_FILENAME
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def source_paths(data_dir: Path) -> List[Path]:
+    """Veri versiyonuna giren dosyalar (tek dosyalar + bölüm manifestleri)"""
+    data_dir = Path(data_dir)
+    paths = [path for name in ("customers", *PARTITIONED_TABLES) for path in dataset_paths(data_dir, name)]
+    paths.extend(data_dir / table / MANIFEST_FILENAME for table in PARTITIONED_TABLES)
+    return paths
+
+
+def reads_complete(data_dir: Path, table: str, since: Optional[int] = None) -> bool:
+    """open_table(data_dir, table, since) tablonun tamamını okur mu (kayıt okumadan, manifestten)"""
+    data_dir = Path(data_dir)
+    source = dataset_path(data_dir, table)
+    manifest = load_manifest(data_dir, table)
+    if manifest is None or since is None:
+        return True
+    if source.exists() and manifest["source_version"] != data_version([source]):
+        return True  # Bölümler yeniden yazılır ve tamamı okunur
+    return all(entry["end"] is None or entry["end"] >= since for entry in manifest["partitions"])
+
+
+def open_table(data_dir: Path, table: str, since: Optional[int] = None) -> Tuple[Iterator[Dict], bool]:
+    """(kayıt akışı, tamamı okunuyor mu); bölümlüyse sadece since (epoch saniyesi) sonrasına uzanan bölümler okunur
+
+    Tek dosya bölümlemeden sonra değiştiyse bölümler yeniden yazılır; bölüm
+    yoksa tek dosya okunur (since yok sayılır). Kayıtlar dosyadan okundukça
+    üretilir.
+    """
+    data_dir = Path(data_dir)
+    source = dataset_path(data_dir, table)
+    manifest = load_manifest(data_dir, table)
+
+    if manifest is not None and source.exists() and manifest["source_version"] != data_version([source]):
+        manifest = write_partitions(iter_records(source), data_dir, table, manifest["granularity"], data_version([source]))
+        since = None
+
+    if manifest is None:
+        return iter_records(source), True
+
+    files = []
+    complete = True
+    for entry in manifest["partitions"]:
+        if since is not None and entry["end"] is not None and entry["end"] < since:
+            complete = False
+            continue
+        files.append(data_dir / table / entry["file"])
+    return (record for path in files for record in iter_records(path)), complete
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "data"
+    granularity = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_GRANULARITY
+    started = datetime.now()
+    for table, manifest in partition_data(source, granularity).items():
+        print(f"✅ {table}: {manifest['rows']} kayıt, {len(manifest['partitions'])} bölüm ({granularity})")
+    print(f"   Süre: {(datetime.now() - started).total_seconds():.1f}s")
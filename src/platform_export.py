@@ -56,7 +56,7 @@ class PlatformExporter:
         self.data_dir = Path(data_dir)
         self.export_dir = Path(export_dir)
         self.export_dir.mkdir(exist_ok=True)
-        self.engine = SegmentEngine(data_dir)
+        self.engine = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, data_dir)
     
     def _hash_value(self, value: str, algorithm: str = "sha256") -> str:
         """Değeri hash'le"""
@@ -197,8 +197,8 @@ class PlatformExporter:
         
         return str(filepath)
     
-    def export_segment(self, segment_key: str, platforms: List[str] = None) -> Dict[str, str]:
-        """Bir segmenti belirtilen platformlara export et"""
+    def export_segment(self, segment_key: str, platforms: List[str] = None, results: Optional[List[Dict]] = None) -> Dict[str, str]:
+        """Bir segmenti belirtilen platformlara export et (results: önceden çalıştırılmış segment)"""
         if platforms is None:
             platforms = ["meta", "google", "tiktok"]
         
@@ -206,7 +206,8 @@ class PlatformExporter:
             raise ValueError(f"Bilinmeyen segment: {segment_key}")
         
         segment = PREDEFINED_SEGMENTS[segment_key]
-        results = self.engine.run_segment(segment)
+        if results is None:
+            results = self.engine.run_segment(segment)
         
         if not results:
             print(f"⚠️  Segment '{segment.name}' boş, export yapılmadı.")
@@ -227,10 +228,11 @@ class PlatformExporter:
     def export_all_segments(self, platforms: List[str] = None) -> Dict[str, Dict[str, str]]:
         """Tüm hazır segmentleri export et"""
         all_exports = {}
+        all_results = self.engine.run_segments(PREDEFINED_SEGMENTS)
         
         for segment_key in PREDEFINED_SEGMENTS:
             try:
-                exports = self.export_segment(segment_key, platforms)
+                exports = self.export_segment(segment_key, platforms, all_results[segment_key])
                 if exports:
                     all_exports[segment_key] = exports
             except Exception as e:
@@ -248,14 +250,15 @@ class PlatformExporter:
             ""
         ]
         
+        all_results = self.engine.run_segments({key: PREDEFINED_SEGMENTS[key] for key in exports})
+        
         for segment_key, platforms in exports.items():
             segment = PREDEFINED_SEGMENTS[segment_key]
-            results = self.engine.run_segment(segment)
-            stats = self.engine.get_segment_stats(results)
+            results = all_results[segment_key]
             
             report_lines.append(f"📊 {segment.name}")
             report_lines.append(f"   Açıklama: {segment.description}")
-            report_lines.append(f"   Müşteri Sayısı: {stats['count']}")
+            report_lines.append(f"   Müşteri Sayısı: {len(results)}")
             report_lines.append(f"   Export Dosyaları:")
             
             for platform, filepath in platforms.items():
@@ -0,0 +1,140 @@
+"""
+CDP Demo - Sorgu Planlayıcı
+Satır bazlı motor için koşul sırasını maliyet ve seçiciliğe göre belirler
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Any
+
+from aggregates import parse_aggregate
+from daily_rollup import ROLLUP_FIELDS, channel_for_filter
+
+# Seçicilik tahmini için örneklenen müşteri sayısı
+PLANNER_SAMPLE_SIZE = 200
+
+# Göreli maliyetler (bir profil alanı okuması = 1)
+PROFILE_COST = 1.0
+ROLLUP_COST = 3.0
+LOOKUP_COST = 2.0
+
+
+@dataclass
+class PlannedCondition:
+    """Plandaki bir koşul"""
+    condition: Dict[str, Any]
+    position: int  # Segment tanımındaki sırası
+    cost: float  # Müşteri başına tahmini göreli maliyet
+    selectivity: float  # Koşulu sağlayan müşteri oranı (0-1)
+    source: str  # Seçicilik kaynağı: bitmap, sample, constant
+
+
+@dataclass
+class QueryPlan:
+    """Segment için seçilen değerlendirme sırası"""
+    segment_name: str
+    logic: str
+    steps: List[PlannedCondition] = field(default_factory=list)
+
+    @property
+    def conditions(self) -> List[Dict[str, Any]]:
+        return [step.condition for step in self.steps]
+
+    def describe(self) -> str:
+        """Planı okunabilir metin olarak döndür"""
+        lines = [f"Plan: {self.segment_name} ({self.logic})"]
+        for i, step in enumerate(self.steps, 1):
+            cond = step.condition
+            lines.append(
+                f"  {i}. [{step.position + 1}] {cond['field']} {cond['operator']} {cond['value']}"
+                f" | maliyet={step.cost:.1f} seçicilik={step.selectivity:.1%} ({step.source})"
+            )
+        return "\n".join(lines)
+
+
+class QueryPlanner:
+    """Kolon istatistiklerinden koşul maliyeti/seçiciliği tahmin eder
+
+    AND için en ucuz ve en çok eleyen koşul (maliyet / (1 - seçicilik)),
+    OR için en ucuz ve en çok eşleşen koşul (maliyet / seçicilik) önce gelir.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        customers = engine.customers
+        n = len(customers)
+        step = max(n // PLANNER_SAMPLE_SIZE, 1)
+        self.sample = [customers[i] for i in range(0, n, step)][:PLANNER_SAMPLE_SIZE]
+
+        self.size = n
+        self._averages: Dict[str, float] = {}
+
+    @property
+    def avg_transactions(self) -> float:
+        """Müşteri başına ortalama işlem (tarama maliyeti)"""
+        return self._average("transactions")
+
+    @property
+    def avg_events(self) -> float:
+        """Müşteri başına ortalama event (tarama maliyeti)"""
+        return self._average("events")
+
+    def _average(self, dataset: str) -> float:
+        """Veri seti ilk işlem/event koşulunda okunur (sadece profil koşullarında yüklenmez)"""
+        if dataset not in self._averages:
+            size = len(getattr(self.engine, dataset))
+            self._averages[dataset] = size / self.size if self.size else 0.0
+        return self._averages[dataset]
+
+    def plan(self, segment) -> QueryPlan:
+        """Segment koşullarını değerlendirme sırasına diz"""
+        steps = [self._estimate(cond, i) for i, cond in enumerate(segment.conditions)]
+
+        if segment.logic == "AND":
+            rank = lambda s: s.cost / max(1.0 - s.selectivity, 1e-6)
+        else:  # OR
+            rank = lambda s: s.cost / max(s.selectivity, 1e-6)
+
+        steps.sort(key=lambda s: (rank(s), s.position))
+        return QueryPlan(segment.name, segment.logic, steps)
+
+    def _estimate(self, condition: Dict, position: int) -> PlannedCondition:
+        """Tek koşul için maliyet ve seçicilik tahmini"""
+        cost = self._cost(condition)
+
+        # Bilinmeyen alan: her zaman False
+        if cost == 0:
+            return PlannedCondition(condition, position, 0.0, 0.0, "constant")
+
+        # Bitmap'li alan: seçicilik kesin
+        bitmap_index = self.engine.bitmap_index
+        if bitmap_index.size and bitmap_index.can_answer(condition):
+            matched = bin(bitmap_index.resolve(condition, self.engine._compare)).count("1")
+            return PlannedCondition(condition, position, cost, matched / bitmap_index.size, "bitmap")
+
+        # Diğerleri: sabit örneklem üzerinde değerlendir (Laplace düzeltmeli)
+        passed = sum(1 for c in self.sample if self.engine._evaluate_condition(c, condition))
+        selectivity = (passed + 0.5) / (len(self.sample) + 1)
+        return PlannedCondition(condition, position, cost, selectivity, "sample")
+
+    def _cost(self, condition: Dict) -> float:
+        """Müşteri başına göreli değerlendirme maliyeti"""
+        field_name = condition["field"]
+
+        if self.sample and field_name in self.sample[0]:
+            return PROFILE_COST
+
+        if field_name.startswith("tx_"):
+            if field_name in ROLLUP_FIELDS and channel_for_filter(condition.get("filter")) in self.engine.rollup_channels:
+                return ROLLUP_COST
+            if field_name in ROLLUP_FIELDS or field_name == "tx_last_days":
+                scan = self.avg_transactions if "filter" in condition else 0.0
+                return LOOKUP_COST + scan
+
+        spec = parse_aggregate(field_name)
+        if spec is None:
+            return 0.0
+        # Filtresiz count/first/last tek okuma; diğerleri penceredeki kayıtları tarar
+        filtered = "filter" in condition or (spec.source == "event" and "event_type" in condition)
+        scans = filtered or spec.operation not in ("count", "first", "last")
+        average = self.avg_transactions if spec.source == "tx" else self.avg_events
+        return LOOKUP_COST + (average if scans else 0.0)
@@ -0,0 +1,87 @@
+"""
+CDP Demo - Kayıt Akışı
+JSON / JSON Lines veri dosyalarını kayıt kayıt okur ve yazar, okuma hızını ölçer
+"""
+
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Iterable, Iterator
+
+JSON_SUFFIX = ".json"
+JSONL_SUFFIX = ".jsonl"
+DATA_FORMATS = ("json", "jsonl")
+
+logger = logging.getLogger("cdp.ingest")
+
+
+def dataset_path(data_dir: Path, name: str) -> Path:
+    """Veri setinin dosyası: name.jsonl varsa o, yoksa name.json"""
+    data_dir = Path(data_dir)
+    jsonl = data_dir / f"{name}{JSONL_SUFFIX}"
+    return jsonl if jsonl.exists() else data_dir / f"{name}{JSON_SUFFIX}"
+
+
+def dataset_paths(data_dir: Path, name: str) -> List[Path]:
+    """Veri setinin olası tüm dosyaları (versiyon hesabı için)"""
+    data_dir = Path(data_dir)
+    return [data_dir / f"{name}{JSON_SUFFIX}", data_dir / f"{name}{JSONL_SUFFIX}"]
+
+
+def iter_records(path: Path) -> Iterator[Dict]:
+    """Dosyadaki kayıtlar; JSON Lines satır satır okunur (ham metin bellekte tutulmaz)"""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix != JSONL_SUFFIX:
+            yield from json.load(f)
+            return
+        # Her satır ayrı çözüldüğünden alan adları kayıtlar arasında paylaşılmaz;
+        # tek kopya kullanılır (json.load belge içinde aynısını yapar)
+        names: Dict[str, str] = {}
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Geçersiz JSON satırı: {path}:{line_number}: {e.msg}") from e
+            yield {names.setdefault(name, name): value for name, value in record.items()}
+
+
+def write_jsonl(records: Iterable[Dict], path: Path) -> int:
+    """Kayıtları satır başına bir JSON nesnesi olarak yaz -> kayıt sayısı"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+@dataclass
+class LoadStats:
+    """Bir veri setinin okunma özeti"""
+    dataset: str
+    rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def describe(self) -> str:
+        return f"{self.dataset}: {self.rows:,} kayıt, {self.seconds:.2f}s ({self.rows_per_second:,.0f} kayıt/s)"
+
+
+def metered(records: Iterable[Dict], stats: LoadStats) -> Iterator[Dict]:
+    """Kayıtları geçirirken sayar; akış bitince süre ve hız stats'a yazılır ve loglanır"""
+    started = time.perf_counter()
+    for record in records:
+        stats.rows += 1
+        yield record
+    stats.seconds = time.perf_counter() - started
+    logger.info("Yüklendi: %s", stats.describe())
@@ -0,0 +1,148 @@
+"""
+CDP Demo - Segment Sonuç Önbelleği
+Segment tanımı parmak izi + veri versiyonu anahtarlı, bellek bütçeli LRU önbellek
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_CACHE_MB = 64
+
+# Zaman penceresine bağlı segmentlerin (days, tx_last_days) sonuç ömrü
+DEFAULT_TTL_SECONDS = 300
+
+
+def segment_fingerprint(segment) -> str:
+    """Segmentin sonucunu belirleyen alanların (koşullar + mantık) kanonik hash'i"""
+    canonical = json.dumps(
+        {"conditions": segment.conditions, "logic": segment.logic},
+        sort_keys=True, ensure_ascii=False, default=repr,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def data_version(paths: Iterable[Path]) -> str:
+    """Veri dosyalarının (yol, mtime, boyut) bilgisinden versiyon"""
+    parts = []
+    for path in paths:
+        path = Path(path)
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{path.resolve()}:{stat.st_mtime_ns}:{stat.st_size}")
+        else:
+            parts.append(f"{path}:missing")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def is_time_dependent(segment) -> bool:
+    """Sonuç değerlendirme anına bağlı mı"""
+    return any("days" in cond or cond["field"] == "tx_last_days" for cond in segment.conditions)
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Nesnenin ve içerdiği list/dict/tuple/set elemanlarının yaklaşık boyutu (byte)"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, "nbytes") and not isinstance(obj, (str, bytes)):
+        size += int(obj.nbytes)
+    return size
+
+
+class SegmentCache:
+    """LRU önbellek; toplam tahmini boyut max_bytes'ı aşınca en eski kayıtlar atılır
+
+    max_bytes verilmezse CDP_SEGMENT_CACHE_MB ortam değişkeni (varsayılan 64 MB)
+    kullanılır; max_bytes=0 önbelleği kapatır.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("CDP_SEGMENT_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, key: Tuple) -> Any:
+        """Kayıt varsa döndür (None: yok / süresi dolmuş)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, size, expires_at = entry
+            if expires_at is None or time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: Tuple, value: Any, size: int, expires: bool = False):
+        """Kaydı ekle; bütçe aşılırsa en az kullanılanları at"""
+        if not self.enabled or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = time.monotonic() + self.ttl_seconds if expires else None
+        self._entries[key] = (value, size, expires_at)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Tuple):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def clear(self):
+        """Tüm kayıtları sil (sayaçlar korunur)"""
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """İsabet / kaçırma sayaçları ve doluluk"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_shared_cache: Optional[SegmentCache] = None
+
+
+def shared_cache() -> SegmentCache:
+    """Süreç genelinde paylaşılan önbellek (Streamlit yeniden çalıştırmaları arasında korunur)"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SegmentCache()
+    return _shared_cache
@@ -0,0 +1,447 @@
+"""
+CDP Demo - Vektörel Segment Derleyici
+SegmentDefinition koşullarını tüm müşteriler üzerinde NumPy boolean maskelerine çevirir
+"""
+
+import json
+import time
+from operator import eq, ne, gt, ge, lt, le
+from typing import List, Dict, Any, Callable, Optional
+
+from aggregates import AggregateField, parse_aggregate, filter_predicates, is_numeric, distinct_key, NUMERIC_OPERATIONS
+from columnar_store import ColumnarStore, ColumnarTable, CategoricalColumn, HAS_NUMPY
+from segment_profile import ConditionProfile, SegmentProfile
+from time_utils import EvaluationClock, US_PER_SECOND, US_PER_DAY
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+# Dizi üzerinde doğrudan uygulanabilen karşılaştırmalar
+ARRAY_OPERATORS = {
+    "eq": eq, "==": eq,
+    "ne": ne, "!=": ne,
+    "gt": gt, ">": gt,
+    "gte": ge, ">=": ge,
+    "lt": lt, "<": lt,
+    "lte": le, "<=": le,
+}
+
+
+def canonical_json(value: Any) -> str:
+    """Koşul/filtre için sıralı anahtarlı JSON (paylaşım anahtarı)"""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+def combine_masks(masks: List["np.ndarray"], logic: str, size: int) -> "np.ndarray":
+    """Koşul maskelerini AND/OR ile birleştir"""
+    if logic == "AND":
+        return np.logical_and.reduce(masks) if masks else np.ones(size, dtype=bool)
+    # OR
+    return np.logical_or.reduce(masks) if masks else np.zeros(size, dtype=bool)
+
+
+class CompiledCondition:
+    """Derlenmiş koşul: paylaşılabilir agregasyon + karşılaştırma
+
+    aggregate_key aynı olan koşullar (örn. "son 90 gün tx_count") aynı
+    müşteri bazlı değer dizisini kullanır; memo bir değerlendirme anı için
+    agregasyonları ve maskeleri tutar.
+    """
+
+    def __init__(self, mask_key: str, aggregate_key: Optional[tuple],
+                 aggregate: Optional[Callable[[EvaluationClock], tuple]],
+                 predicate: Callable[[Optional[tuple]], "np.ndarray"]):
+        self.mask_key = mask_key
+        self.aggregate_key = aggregate_key
+        self.aggregate = aggregate
+        self.predicate = predicate
+
+    def mask(self, clock: EvaluationClock, memo: Optional[Dict] = None) -> "np.ndarray":
+        """Müşteri başına koşul maskesi"""
+        if memo is None:
+            memo = {}
+        key = ("mask", self.mask_key)
+        if key not in memo:
+            values = None
+            if self.aggregate_key is not None:
+                if self.aggregate_key not in memo:
+                    memo[self.aggregate_key] = self.aggregate(clock)
+                values = memo[self.aggregate_key]
+            memo[key] = self.predicate(values)
+        return memo[key]
+
+
+class CompiledSegment:
+    """Derlenmiş segment: koşul maskeleri + AND/OR birleşimi"""
+
+    def __init__(self, name: str, conditions: List[CompiledCondition], logic: str, size: int):
+        self.name = name
+        self.conditions = conditions
+        self.logic = logic
+        self.size = size
+
+    def evaluate(self, clock: Optional[EvaluationClock] = None, memo: Optional[Dict] = None) -> "np.ndarray":
+        """Tüm müşteriler için eşleşme maskesi (memo: segmentler arası paylaşım)"""
+        clock = clock or EvaluationClock()
+        memo = {} if memo is None else memo
+        return combine_masks([cond.mask(clock, memo) for cond in self.conditions], self.logic, self.size)
+
+    def member_rows(self, clock: Optional[EvaluationClock] = None, memo: Optional[Dict] = None) -> "np.ndarray":
+        """Eşleşen müşterilerin satır numaraları"""
+        return np.flatnonzero(self.evaluate(clock, memo))
+
+
+class SegmentCompiler:
+    """Koşulları kolon bazlı maske fonksiyonlarına derler
+
+    compare: satır bazlı motorun karşılaştırma fonksiyonu; dizi üzerinde
+    doğrudan uygulanamayan operatörler (in, contains, tip uyumsuzlukları)
+    tekil değerler üzerinden bu fonksiyonla değerlendirilir, böylece iki
+    motor aynı sonucu verir.
+    """
+
+    def __init__(self, store: ColumnarStore, compare: Callable[[Any, str, Any], bool]):
+        self.store = store
+        self.compare = compare
+        self.size = len(store.customers)
+        self._row_filters: Dict[str, "np.ndarray"] = {}
+        # (tablo, kolon) -> sayısal değerler / sözlük kodları (agregasyonlar arasında paylaşılır)
+        self._numeric: Dict[tuple, tuple] = {}
+        self._kurus: Dict[tuple, tuple] = {}
+        self._factorized: Dict[tuple, tuple] = {}
+
+    def compile(self, segment) -> CompiledSegment:
+        """SegmentDefinition -> CompiledSegment"""
+        conditions = [self.compile_condition(cond) for cond in segment.conditions]
+        return CompiledSegment(segment.name, conditions, segment.logic, self.size)
+
+    def evaluate_many(self, segments: List[Any], clock: Optional[EvaluationClock] = None,
+                      profiles: Optional[List[SegmentProfile]] = None) -> List["np.ndarray"]:
+        """Birden çok segmenti tek geçişte değerlendir; ortak agregasyonlar bir kez hesaplanır
+
+        profiles: verilirse segment başına koşul ölçümleri (derleme dahil) yazılır.
+        """
+        clock = clock or EvaluationClock()
+        memo = {}
+        if profiles is None:
+            return [self.compile(segment).evaluate(clock, memo) for segment in segments]
+        return [self._evaluate_profiled(segment, clock, memo, profile) for segment, profile in zip(segments, profiles)]
+
+    def _evaluate_profiled(self, segment, clock: EvaluationClock, memo: Dict, profile: SegmentProfile) -> "np.ndarray":
+        """Segmenti koşul koşul ölçerek değerlendir"""
+        masks = []
+        for position, condition in enumerate(segment.conditions):
+            started = time.perf_counter()
+            compiled = self.compile_condition(condition)
+            # Aynı koşul ya da aynı agregasyon bu çalıştırmada zaten hesaplandı mı
+            shared = ("mask", compiled.mask_key) in memo or \
+                (compiled.aggregate_key is not None and compiled.aggregate_key in memo)
+            mask = compiled.mask(clock, memo)
+            profile.conditions.append(ConditionProfile(
+                condition, position, "vectorized", time.perf_counter() - started,
+                rows_examined=self.size, rows_passed=int(np.count_nonzero(mask)), cache_hits=int(shared),
+            ))
+            masks.append(mask)
+        return combine_masks(masks, segment.logic, self.size)
+
+    def compile_condition(self, condition: Dict) -> CompiledCondition:
+        """Tek bir koşulu derle"""
+        field = condition["field"]
+        operator = condition["operator"]
+        value = condition["value"]
+        mask_key = canonical_json(condition)
+
+        # Profil alanları: zamandan bağımsız, derleme anında bir kez hesaplanır
+        if field in self.store.customers:
+            mask = self.compare_column(self.store.customers, field, operator, value)
+            return CompiledCondition(mask_key, None, None, lambda values: mask)
+
+        spec = parse_aggregate(field)
+        if field == "tx_last_days" or (spec is not None and spec.source == "tx"):
+            aggregate_key = ("tx", field, condition.get("days"), canonical_json(filter_predicates(condition.get("filter"))))
+            aggregate = self._compile_aggregate(
+                self._tx_last_days if spec is None else self._aggregate(spec), self.store.transactions,
+                self.store.tx_customer, self._transaction_filter(condition), condition,
+            )
+        elif spec is not None:
+            aggregate_key = ("event", field, condition.get("days"), canonical_json(condition.get("event_type")),
+                             canonical_json(filter_predicates(condition.get("filter"))))
+            aggregate = self._compile_aggregate(
+                self._aggregate(spec), self.store.events, self.store.ev_customer,
+                self._event_filter(condition), condition,
+            )
+        else:
+            # Bilinmeyen alan (veya desteklenmeyen tx_/event_ agregasyonu)
+            empty = np.zeros(self.size, dtype=bool)
+            return CompiledCondition(mask_key, None, None, lambda values: empty)
+
+        def predicate(aggregated: tuple) -> "np.ndarray":
+            values, defined = aggregated
+            if isinstance(values, CategoricalColumn):
+                # first/last: müşteri başına kod; her farklı değer bir kez karşılaştırılır
+                result = values.lookup([self.compare(c, operator, value) for c in values.categories] or [False])
+            else:
+                result = self.compare_array(values, operator, value)
+            return result if defined is None else result & defined
+
+        return CompiledCondition(mask_key, aggregate_key, aggregate, predicate)
+
+    def _compile_aggregate(self, aggregate, table: ColumnarTable, owners: "np.ndarray",
+                           row_filter: "np.ndarray", condition: Dict) -> Callable[[EvaluationClock], tuple]:
+        """Pencere + filtre -> müşteri bazlı (değer, tanımlı mı) dizileri"""
+        days = condition.get("days")
+        timestamps = table.columns.get("timestamp")
+
+        def compute(clock: EvaluationClock) -> tuple:
+            rows = row_filter
+            if days is not None:
+                rows = rows & (timestamps >= clock.cutoff(days))
+            return aggregate(table, owners[rows], rows, clock)
+
+        return compute
+
+    def _transaction_filter(self, condition: Dict) -> "np.ndarray":
+        """Bilinen müşteriye ait ve (varsa) tüm filtre koşullarına uyan işlemler"""
+        predicates = filter_predicates(condition.get("filter"))
+        key = ("tx", canonical_json(predicates))
+        if key in self._row_filters:
+            return self._row_filters[key]
+
+        rows = self.store.tx_customer >= 0
+        # Ek filtre (örn: sadece premium yakıt, market_amount > 0) - koşul başına bir kolon maskesi
+        for predicate in predicates:
+            rows &= self._filter_mask(self.store.transactions, predicate)
+
+        self._row_filters[key] = rows
+        return rows
+
+    def _filter_mask(self, table: ColumnarTable, predicate: Dict) -> "np.ndarray":
+        """Filtre koşulunun satır maskesi (olmayan alan / None değer satır bazlı motordaki gibi None)"""
+        field = predicate["field"]
+        operator = predicate["operator"]
+        value = predicate["value"]
+        if field not in table:
+            return np.full(len(table), self.compare(None, operator, value), dtype=bool)
+        if table.kinds[field] == "object":
+            # Liste / karışık kolonlar (market_items): her farklı değer bir kez karşılaştırılır;
+            # kod -1 (None) son elemana düşer
+            codes, categories = self._factorize(table, field)
+            matches = [self.compare(c, operator, value) for c in categories] + [self.compare(None, operator, value)]
+            return np.array(matches, dtype=bool)[codes]
+        return self.compare_column(table, field, operator, value)
+
+    def _event_filter(self, condition: Dict) -> "np.ndarray":
+        """Bilinen müşteriye ait ve (varsa) event tipine ve tüm filtre koşullarına uyan eventler"""
+        predicates = filter_predicates(condition.get("filter"))
+        key = ("event", canonical_json(condition.get("event_type")), canonical_json(predicates))
+        if key in self._row_filters:
+            return self._row_filters[key]
+
+        rows = self.store.ev_customer >= 0
+        if "event_type" in condition:
+            rows &= self.compare_column(self.store.events, "event_type", "==", condition["event_type"])
+        for predicate in predicates:
+            rows &= self._filter_mask(self.store.events, predicate)
+
+        self._row_filters[key] = rows
+        return rows
+
+    # --- Agregasyonlar: (müşteri başına değer, değer tanımlı mı maskesi) ---
+
+    def _aggregate(self, spec: AggregateField) -> Callable:
+        """count/sum/avg/min/max/distinct/first/last -> müşteri anahtarına göre gruplu NumPy indirgemesi
+
+        Satır bazlı aggregate_records ile aynı sonucu verir: sayısal işlemler
+        sadece sayısal değerleri kullanır, distinct None'ı saymaz, first/last
+        penceredeki en eski/en yeni kaydın değeridir.
+        """
+        operation = spec.operation
+        column = spec.column
+
+        def compute(table, owners, rows, clock):
+            if operation == "count":
+                return np.bincount(owners, minlength=self.size), None
+            if operation in NUMERIC_OPERATIONS:
+                return self._numeric_aggregate(operation, table, column, owners, rows)
+            if operation == "distinct":
+                codes, categories = self._factorize(table, column)
+                return self._distinct_count(owners, codes[rows], len(categories)), None
+            return self._edge_value(operation, table, column, owners, rows)
+
+        return compute
+
+    def _numeric_aggregate(self, operation: str, table: ColumnarTable, column: str, owners, rows) -> tuple:
+        values, valid = self._numeric_values(table, column)
+        if valid is not None:
+            owners = owners[valid[rows]]
+            rows = rows & valid
+
+        if operation == "sum":
+            totals, scale = self._exact_sums(table, column, owners, rows)
+            return totals / scale, None
+
+        counts = np.bincount(owners, minlength=self.size)
+        defined = counts > 0  # Sayısal değeri olmayan müşteri koşulu sağlamaz
+        if operation == "avg":
+            totals, scale = self._exact_sums(table, column, owners, rows)
+            result = np.zeros(self.size, dtype=np.float64)
+            result[defined] = totals[defined] / (counts[defined] * scale[defined])
+            return result, defined
+        values = values[rows]
+
+        reduce = np.minimum if operation == "min" else np.maximum
+        result = np.full(self.size, np.inf if operation == "min" else -np.inf, dtype=np.float64)
+        reduce.at(result, owners, values)
+        result[~defined] = 0
+        return result, defined
+
+    def _exact_sums(self, table: ColumnarTable, column: str, owners, rows) -> tuple:
+        """Müşteri başına (toplam, ölçek); değer = toplam / ölçek (ortalama: toplam / (sayı * ölçek))
+
+        aggregate_records / exact_sum ile aynı kural: penceredeki değerlerin
+        hepsi tam kuruşsa kuruş toplamı ve 100 (kesin), değilse sırayla float
+        toplamı ve 1.
+        """
+        values, _ = self._numeric_values(table, column)
+        kurus, exact = self._kurus_values(table, column)
+        totals = np.bincount(owners, weights=kurus[rows], minlength=self.size)
+        scale = np.full(self.size, 100.0)
+        inexact = np.bincount(owners[~exact[rows]], minlength=self.size) > 0
+        if inexact.any():
+            floats = np.bincount(owners, weights=values[rows], minlength=self.size)
+            totals[inexact] = floats[inexact]
+            scale[inexact] = 1.0
+        return totals, scale
+
+    def _kurus_values(self, table: ColumnarTable, column: str) -> tuple:
+        """Kolonun kuruş değerleri (float64 tam sayılar) + tam kuruş mu maskesi (to_kurus ile aynı)"""
+        key = (id(table), column)
+        if key not in self._kurus:
+            values, _ = self._numeric_values(table, column)
+            kurus = np.round(values * 100)
+            with np.errstate(invalid="ignore"):
+                exact = np.isfinite(kurus) & (kurus / 100 == values)
+            self._kurus[key] = (np.where(exact, kurus, 0.0), exact)
+        return self._kurus[key]
+
+    def _numeric_values(self, table: ColumnarTable, column: str) -> tuple:
+        """Kolonun float64 değerleri + sayısal mı maskesi (None: hepsi sayısal)"""
+        key = (id(table), column)
+        if key not in self._numeric:
+            kind = table.kinds.get(column)
+            if kind in ("int", "float", "bool"):
+                self._numeric[key] = (table.columns[column].astype(np.float64), None)
+            elif kind == "object":
+                raw = table.columns[column]
+                valid = np.array([is_numeric(v) for v in raw], dtype=bool)
+                values = np.zeros(len(raw), dtype=np.float64)
+                values[valid] = [float(v) for v, ok in zip(raw, valid) if ok]
+                self._numeric[key] = (values, valid)
+            else:
+                # Kolon yok veya sayısal değil (kategorik, string, zaman damgası)
+                self._numeric[key] = (np.zeros(len(table), dtype=np.float64), np.zeros(len(table), dtype=bool))
+        return self._numeric[key]
+
+    def _factorize(self, table: ColumnarTable, column: str) -> tuple:
+        """Kolonun satır başına değer kodu (-1: None / alan yok) + kod -> değer listesi"""
+        key = (id(table), column)
+        if key not in self._factorized:
+            kind = table.kinds.get(column)
+            if kind is None:
+                codes, categories = np.full(len(table), -1, dtype=np.int64), []
+            elif kind == "categorical":
+                categorical = table.columns[column]
+                codes, categories = categorical.codes.astype(np.int64), list(categorical.categories)
+            elif kind == "object":
+                index = {}
+                categories = []
+                codes = np.full(len(table), -1, dtype=np.int64)
+                for row, value in enumerate(table.columns[column]):
+                    if value is None:
+                        continue
+                    value_key = distinct_key(value)
+                    if value_key not in index:
+                        index[value_key] = len(categories)
+                        categories.append(value)
+                    codes[row] = index[value_key]
+            else:
+                uniques, inverse = np.unique(table.columns[column], return_inverse=True)
+                codes, categories = inverse.reshape(-1).astype(np.int64), table.decode_values(column, uniques)
+            self._factorized[key] = (codes, categories)
+        return self._factorized[key]
+
+    def _distinct_count(self, owners, codes, width: int) -> "np.ndarray":
+        """Müşteri başına farklı kod sayısı ((müşteri, kod) çiftleri tekilleştirilir)"""
+        known = codes >= 0
+        if not width or not known.any():
+            return np.zeros(self.size, dtype=np.int64)
+        pairs = np.unique(owners[known].astype(np.int64) * width + codes[known])
+        return np.bincount(pairs // width, minlength=self.size)
+
+    def _edge_value(self, operation: str, table: ColumnarTable, column: str, owners, rows) -> tuple:
+        """first/last: müşterinin penceredeki en eski/en yeni kaydının değeri"""
+        selected = np.flatnonzero(rows)
+        order = np.lexsort((selected, table.columns["timestamp"][selected], owners))
+        ordered = owners[order]
+        boundary = ordered[1:] != ordered[:-1]
+        if operation == "first":
+            picks = order[np.concatenate(([True], boundary))] if len(order) else order
+        else:
+            picks = order[np.concatenate((boundary, [True]))] if len(order) else order
+        picked_owners = owners[picks]
+        picked_rows = selected[picks]
+
+        defined = np.zeros(self.size, dtype=bool)
+        kind = table.kinds.get(column)
+        if kind in ("int", "float", "bool"):
+            source = table.columns[column]
+            values = np.zeros(self.size, dtype=source.dtype)
+            values[picked_owners] = source[picked_rows]
+            defined[picked_owners] = True
+            return values, defined
+
+        codes, categories = self._factorize(table, column)
+        picked_codes = codes[picked_rows]
+        values = np.zeros(self.size, dtype=np.int64)
+        values[picked_owners] = np.maximum(picked_codes, 0)
+        defined[picked_owners] = picked_codes >= 0  # Değeri None olan kayıt koşulu sağlamaz
+        return CategoricalColumn(values, categories), defined
+
+    def _tx_last_days(self, table, owners, rows, clock):
+        last = np.full(self.size, np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(last, owners, table.columns["timestamp"][rows])
+        days_since = np.full(self.size, 9999, dtype=np.int64)  # Hiç işlem yoksa çok eski say
+        has_tx = last != np.iinfo(np.int64).min
+        days_since[has_tx] = (clock.now_us - last[has_tx] * US_PER_SECOND) // US_PER_DAY
+        return days_since, None
+
+    # --- Karşılaştırmalar ---
+
+    def compare_column(self, table: ColumnarTable, field: str, operator: str, expected: Any) -> "np.ndarray":
+        """Tablo kolonunu satır bazlı karşılaştırma semantiğiyle değerlendir"""
+        kind = table.kinds[field]
+        column = table.columns[field]
+
+        # Kategorik: her kategori için bir kez karşılaştır, kodlara yay
+        if kind == "categorical":
+            return column.lookup([self.compare(c, operator, expected) for c in column.categories] or [False])
+
+        if kind in ("bool", "int", "float"):
+            return self.compare_array(column, operator, expected)
+
+        if kind == "object":
+            return np.array([self.compare(v, operator, expected) for v in column], dtype=bool)
+
+        # bytes / timestamp: tekil değerler üzerinden karşılaştır
+        uniques, inverse = np.unique(column, return_inverse=True)
+        values = table.decode_values(field, uniques)
+        return np.array([self.compare(v, operator, expected) for v in values] or [False], dtype=bool)[inverse]
+
+    def compare_array(self, actual: "np.ndarray", operator: str, expected: Any) -> "np.ndarray":
+        """Sayısal dizi karşılaştırması; diğer durumlarda tekil değerlere düş"""
+        if isinstance(expected, (bool, int, float)) and operator in ARRAY_OPERATORS:
+            return ARRAY_OPERATORS[operator](actual, expected)
+        uniques, inverse = np.unique(actual, return_inverse=True)
+        table = [self.compare(v, operator, expected) for v in uniques.tolist()]
+        return np.array(table or [False], dtype=bool)[inverse.reshape(-1)]
@@ -3,12 +3,74 @@ CDP Demo - Segmentasyon Motoru
 Müşteri verisi üzerinde segment tanımlama ve çalıştırma
 """
 
-import json
-from datetime import datetime, timedelta
+import copy
+import hashlib
+import logging
+import os
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Callable
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from dataclasses import dataclass
 
+from columnar_store import ColumnarStore, ColumnarTable, ColumnarRows, HAS_NUMPY
+from compact_records import RecordTable
+from aggregates import parse_aggregate, aggregate_records, filter_predicates
+from customer_keys import CustomerKeys, UNKNOWN_KEY
+from engine_snapshot import load_snapshot, write_snapshot, snapshot_dir
+from segment_compiler import SegmentCompiler, CompiledSegment, canonical_json
+from bitmap_index import BitmapIndex, bitmap_rows
+from query_planner import QueryPlanner, QueryPlan
+from segment_stats import SegmentStatsIndex, approximate_segment_stats, APPROX_SAMPLE_SIZE
+from segment_estimator import SegmentEstimator, SegmentEstimate, ESTIMATE_SAMPLE_SIZE
+from segment_profile import ConditionProfile, SegmentProfile
+from memory_report import MemoryReport, MemoryEntry, MemoryTracer, deep_size, configured_trace_memory
+from parallel_executor import ShardedExecutor, configured_workers
+from sqlite_store import SQLiteStore
+from sql_compiler import SQLCompiler
+from partitioned_store import open_table, reads_complete, history_window, source_paths
+from record_stream import LoadStats, dataset_path, iter_records, metered
+from segment_cache import (
+    SegmentCache, shared_cache, segment_fingerprint, data_version, is_time_dependent, deep_sizeof,
+)
+from daily_rollup import DailyRollup, ROLLUP_FIELDS, discover_channels, channel_for_filter
+from time_utils import parse_timestamp, cutoff_epoch, EvaluationClock
+
+if HAS_NUMPY:
+    import numpy as np
+
+BACKENDS = ("memory", "columnar", "sqlite", "compact")
+DEFAULT_BACKEND = "memory"
+
+logger = logging.getLogger("cdp.engine")
+
+# İlk erişimde yüklenen / kurulan alanlar, veri setine göre (memory ve compact backend'de
+# işlem ve eventler de ilk ihtiyaçta okunur)
+DATASET_ATTRIBUTES = {
+    "transactions": ("transactions", "tx_keys", "customer_transactions", "customer_transaction_times",
+                     "rollup_channels", "customer_rollups"),
+    "events": ("events", "ev_keys", "customer_events", "customer_event_times"),
+}
+
+# memory_report'ta ölçüm sırası: önce veri setleri, sonra indexler ve önbellekler
+# (ortak nesneler, örn. indexlerdeki kayıtlar, ilk ölçülen yapıya yazılır)
+MEMORY_STRUCTURES = (
+    ("data", ("customers", "transactions", "events")),
+    ("index", ("customer_keys", "tx_keys", "customer_transactions", "customer_transaction_times", "rollup_channels",
+               "customer_rollups", "ev_keys", "customer_events", "customer_event_times", "bitmap_index", "store",
+               "_compiler", "_stats_index", "_planner", "_estimator")),
+    ("cache", ("cache",)),
+)
+
+
+def configured_backend(backend: Optional[str] = None) -> str:
+    """Backend: parametre, yoksa CDP_BACKEND (varsayılan memory)"""
+    return backend or os.getenv("CDP_BACKEND", DEFAULT_BACKEND)
+
 
 @dataclass
 class SegmentDefinition:
@@ -19,53 +81,416 @@ class SegmentDefinition:
     logic: str = "AND"  # AND veya OR
 
 
+class _TimeIndexBuilder:
+    """Kayıt satırlarını okundukça müşteri anahtarına göre toplar; build() zaman sıralı listeleri üretir"""
+
+    def __init__(self, size: int):
+        self.size = size  # müşteri sayısı
+        self.grouped: Dict[int, List[tuple]] = {}
+
+    def add(self, key: int, row: int, timestamp: str):
+        pairs = self.grouped.get(key)
+        if pairs is None:
+            pairs = self.grouped[key] = []
+        pairs.append((parse_timestamp(timestamp), row))
+
+    def build(self, records) -> tuple:
+        """Anahtar -> zamana göre sıralı kayıt listesi + epoch saniyeleri (array)
+
+        Listeler anahtarla indekslenir; son eleman (anahtar -1, müşteri
+        tablosunda olmayan ID) her zaman boştur.
+        """
+        size = self.size + 1
+        index = [()] * size
+        times = [array("q")] * size  # boş dizi paylaşılır, sadece okunur
+        for key, pairs in self.grouped.items():
+            pairs.sort(key=lambda p: p[0])  # stabil: aynı saniyedeki kayıtlar dosya sırasında kalır
+            index[key] = [records[row] for _, row in pairs]
+            times[key] = array("q", [ts for ts, _ in pairs])
+        return index, times
+
+
 class SegmentEngine:
     """CDP Segmentasyon Motoru"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", backend: Optional[str] = None, cache: Optional[SegmentCache] = None,
+                 workers: Optional[int] = None, window_days: Optional[float] = None,
+                 trace_memory: Optional[bool] = None):
+        backend = configured_backend(backend)
+        if backend not in BACKENDS:
+            raise ValueError(f"Bilinmeyen backend: {backend} (desteklenen: {', '.join(BACKENDS)})")
         self.data_dir = Path(data_dir)
+        self.backend = backend
+        self.store = None
+        self.sql_store = None
+        self._sql_compiler = None
+        self._compiler = None
+        self._executor = None
+        self._stats_index = None
+        self._estimator = None
+        self._planner = None
+        self.last_plan = None
+        self.last_profile = None
+        # Varsayılan: süreç genelinde paylaşılan önbellek (anahtar veri versiyonunu içerir)
+        self.cache = cache if cache is not None else shared_cache()
+        # Vektörel değerlendirme için süreç sayısı (1: seri, CDP_WORKERS ile ayarlanır)
+        self.workers = configured_workers(workers)
+        self.data_version = None
+        # Bölümlü veride yüklenen işlem/event geçmişinin başlangıcı (epoch saniyesi, None: tüm geçmiş)
+        self.loaded_since = None
+        if window_days is not None and backend != "sqlite":
+            self.loaded_since = cutoff_epoch(datetime.now(), window_days)
+        # Veri seti -> yüklendiği pencere başlangıcı (None: tüm geçmiş); yüklenmemişse anahtar yok
+        self._loaded_since: Dict[str, Optional[int]] = {}
+        self._row_indexes_built = False
+        self.customer_keys: Optional[CustomerKeys] = None
+        # Veri seti -> okuma özeti (kayıt sayısı, süre, kayıt/s)
+        self.load_stats: Dict[str, LoadStats] = {}
+        # Index / yapı -> kurulum süresi (saniye; bkz. profile_segment)
+        self.index_seconds: Dict[str, float] = {}
+        # Yükleme / index aşamalarının tracemalloc tepe ölçümü (CDP_TRACE_MEMORY ile açılır)
+        self.memory_tracer = MemoryTracer(configured_trace_memory(trace_memory))
         self.customers = []
-        self.transactions = []
-        self.events = []
-        self._load_data()
+        with self.memory_tracer.phase("load_data"):
+            self._load_data()
+    
+    def __getattr__(self, name: str) -> Any:
+        """İşlem/event verisi ve indexleri ilk erişimde yüklenir (bkz. DATASET_ATTRIBUTES)"""
+        for dataset, attributes in DATASET_ATTRIBUTES.items():
+            if name in attributes:
+                with self.memory_tracer.phase(dataset):
+                    if self.backend != "columnar":
+                        self._ingest(dataset)
+                    elif name == dataset:
+                        setattr(self, name, self._load_dataset(dataset))
+                    elif dataset == "transactions":
+                        self._build_transaction_index()
+                    else:
+                        self._build_event_index()
+                return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
     
     def _load_data(self):
-        """Veriyi yükle"""
-        with open(self.data_dir / "customers.json", "r", encoding="utf-8") as f:
-            self.customers = json.load(f)
+        """Veriyi yükle (memory/compact: müşteriler hemen, işlem ve eventler ilk ihtiyaçta)"""
+        # SQLite backend: veri diskte kalır, JSON sadece değiştiğinde yeniden aktarılır
+        if self.backend == "sqlite":
+            with self._timed("sqlite_open"):
+                self.sql_store = SQLiteStore.open(self.data_dir, self._compare)
+            self.data_version = self.sql_store.data_version
+            self.customers = self.sql_store.customers
+            self.transactions = self.sql_store.transactions
+            self.events = self.sql_store.events
+            self.bitmap_index = None
+            self._sql_compiler = SQLCompiler(self.sql_store)
+            return
         
-        with open(self.data_dir / "transactions.json", "r", encoding="utf-8") as f:
-            self.transactions = json.load(f)
+        self.data_version = data_version(source_paths(self.data_dir))
         
-        with open(self.data_dir / "events.json", "r", encoding="utf-8") as f:
-            self.events = json.load(f)
+        # Kolon bazlı backend: kaynak dosyalar değişmediyse JSON okunmadan snapshot'tan açılır
+        if self.backend == "columnar" and self._open_snapshot():
+            return
+        
+        self.customers = list(self._metered("customers", iter_records(dataset_path(self.data_dir, "customers"))))
+        
+        # Kolon bazlı backend: dict listeleri yerine tipli diziler (tablolar birlikte kurulur)
+        if self.backend == "columnar":
+            self.store = ColumnarStore(
+                self.customers, self._load_dataset("transactions"), self._load_dataset("events")
+            )
+            self.customers = self.store.customers
+            self.transactions = self.store.transactions
+            self.events = self.store.events
         
         # Müşteri bazlı indexler oluştur
-        self._build_indexes()
+        with self.memory_tracer.phase("build_indexes"):
+            self._build_indexes()
     
     def _build_indexes(self):
         """Hızlı erişim için indexler oluştur"""
-        # Müşteri ID -> Müşteri
-        self.customer_map = {c["customer_id"]: c for c in self.customers}
-        
-        # Müşteri ID -> İşlemler
-        self.customer_transactions = {}
-        for tx in self.transactions:
-            cid = tx["customer_id"]
-            if cid not in self.customer_transactions:
-                self.customer_transactions[cid] = []
-            self.customer_transactions[cid].append(tx)
-        
-        # Müşteri ID -> Events
-        self.customer_events = {}
-        for ev in self.events:
-            cid = ev["customer_id"]
-            if cid not in self.customer_events:
-                self.customer_events[cid] = []
-            self.customer_events[cid].append(ev)
-    
-    def _evaluate_condition(self, customer: Dict, condition: Dict) -> bool:
-        """Tek bir koşulu değerlendir"""
+        # Düşük kardinaliteli profil alanları: değer -> müşteri bitmap'i
+        with self._timed("bitmap_index"):
+            self.bitmap_index = BitmapIndex.build(self.customers)
+        
+        if self.backend == "columnar":
+            with self._timed("columnar_index"):
+                self.store.build_indexes()
+            self.customer_keys = self.store.customer_keys
+            # Tüm geçmiş yüklendiyse sonraki açılışlar için snapshot
+            if all(since is None for since in self._loaded_since.values()):
+                self.save_snapshot()
+            return
+        self._build_row_indexes()
+    
+    def _open_snapshot(self) -> bool:
+        """Geçerli snapshot varsa depo ve indexleri ondan kur (tüm geçmiş yüklenmiş sayılır)"""
+        with self._timed("snapshot_open"):
+            snapshot = load_snapshot(self.data_dir, self.data_version)
+        if snapshot is None:
+            return False
+        self.store, self.bitmap_index = snapshot
+        self.customers = self.store.customers
+        self.transactions = self.store.transactions
+        self.events = self.store.events
+        self.customer_keys = self.store.customer_keys
+        self.loaded_since = None
+        self._loaded_since = {dataset: None for dataset in DATASET_ATTRIBUTES}
+        return True
+    
+    def save_snapshot(self) -> Optional[Path]:
+        """Kolon deposunu ve indexleri data_dir/snapshot/ altına yaz (yazılamazsa None)"""
+        if self.store is None or self.store.tx_customer is None:
+            raise ValueError(f"Snapshot için kolon deposu gerekli (backend: {self.backend})")
+        if any(since is not None for since in self._loaded_since.values()):
+            raise ValueError("Snapshot tüm geçmişi içermeli; pencereli yüklemede yazılamaz")
+        try:
+            with self._timed("snapshot_write"):
+                return write_snapshot(self.store, self.bitmap_index, self.data_dir, self.data_version)
+        except OSError as e:
+            logger.warning("Snapshot yazılamadı (%s): %s", snapshot_dir(self.data_dir), e)
+            return None
+    
+    def _build_row_indexes(self):
+        """Satır bazlı motorun müşteri anahtarları (işlem/event indexleri ilk ihtiyaçta kurulur)"""
+        self._row_indexes_built = True
+        
+        # customer_id <-> int32 anahtar (müşteri satır numarası); indexler string yerine anahtar tutar
+        if self.store is not None and self.store.customer_keys is not None:
+            self.customer_keys = self.store.customer_keys
+        else:
+            with self._timed("customer_keys"):
+                self.customer_keys = CustomerKeys.from_records(self.customers)
+    
+    @contextmanager
+    def _timed(self, name: str):
+        """Bloğun süresini index_seconds'a yaz (yeniden kurulursa son kurulum)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.index_seconds[name] = time.perf_counter() - started
+    
+    def _metered(self, dataset: str, records: Iterable[Dict]) -> Iterator[Dict]:
+        """Kayıt akışı; bitince okuma süresi ve hızı load_stats'a yazılır"""
+        stats = self.load_stats[dataset] = LoadStats(dataset)
+        return metered(records, stats)
+    
+    def _read_dataset(self, dataset: str) -> Iterator[Dict]:
+        """İşlem veya event kayıt akışı (bölümlü düzende sadece loaded_since sonrasına uzanan dosyalar)"""
+        records, complete = open_table(self.data_dir, dataset, self.loaded_since)
+        self._loaded_since[dataset] = None if complete else self.loaded_since
+        return self._metered(dataset, records)
+    
+    def _load_dataset(self, dataset: str) -> List[Dict]:
+        """İşlem veya event verisini liste olarak oku (columnar backend)"""
+        return list(self._read_dataset(dataset))
+    
+    def _ingest(self, dataset: str):
+        """Veri setini akış halinde oku; müşteri anahtarları ve zaman indexi kayıtlar okunurken kurulur
+        
+        memory ve compact backend'de kullanılır. Dosyanın ham metni ve
+        ayrı bir indexleme geçişi gerekmez; compact backend'de kayıtlar
+        okundukça kolonlara yazılır, dict listesi hiç oluşmaz.
+        """
+        if not self._row_indexes_built:
+            self._build_row_indexes()
+        get_key = self.customer_keys.index.get
+        keys = array("i")
+        index = _TimeIndexBuilder(len(self.customer_keys))
+        
+        def indexed(records: Iterable[Dict]) -> Iterator[Dict]:
+            for row, record in enumerate(records):
+                key = get_key(record["customer_id"], UNKNOWN_KEY)
+                keys.append(key)
+                if key >= 0:  # Müşterisi olmayan kayıtlar hiçbir segmentte değerlendirilmez
+                    index.add(key, row, record["timestamp"])
+                yield record
+        
+        records = indexed(self._read_dataset(dataset))
+        # Kompakt backend: alan başına array'ler, erişim dict benzeri görünümle
+        records = RecordTable.from_records(records) if self.backend == "compact" else list(records)
+        with self._timed(f"{dataset}_index"):
+            by_customer, times = index.build(records)
+        
+        if dataset == "transactions":
+            self.transactions, self.tx_keys = records, keys
+            self.customer_transactions, self.customer_transaction_times = by_customer, times
+            self._build_rollups()
+        else:
+            self.events, self.ev_keys = records, keys
+            self.customer_events, self.customer_event_times = by_customer, times
+    
+    def _build_transaction_index(self):
+        """Anahtar -> zamana göre sıralı işlemler + günlük kümülatif özetler (columnar backend)"""
+        if not self._row_indexes_built:
+            self._build_row_indexes()
+        with self._timed("transactions_index"):
+            self.tx_keys = array("i", self.store.tx_customer.astype(np.intc).tobytes())
+            self.customer_transactions, self.customer_transaction_times = self._build_time_index(
+                self.transactions, self.store.tx_customer
+            )
+        self._build_rollups()
+    
+    def _build_rollups(self):
+        """Müşteri başına günlük kümülatif özetler"""
+        # Tüm işlemler + filtre kanalları
+        with self._timed("daily_rollups"):
+            self.rollup_channels = discover_channels(self.transactions)
+            try:
+                self.customer_rollups = [
+                    DailyRollup.build(txs, times, self.rollup_channels) if txs else None
+                    for txs, times in zip(self.customer_transactions, self.customer_transaction_times)
+                ]
+            except ValueError as exc:
+                # Kuruşa tam inmeyen tutar: özetler kesin olmaz, agregasyonlar işlemlerden hesaplanır
+                logger.warning("Günlük özetler kapatıldı: %s", exc)
+                self.rollup_channels = set()
+                self.customer_rollups = [None] * len(self.customer_transactions)
+    
+    def _build_event_index(self):
+        """Anahtar -> zamana göre sıralı eventler (columnar backend)"""
+        if not self._row_indexes_built:
+            self._build_row_indexes()
+        with self._timed("events_index"):
+            self.ev_keys = array("i", self.store.ev_customer.astype(np.intc).tobytes())
+            self.customer_events, self.customer_event_times = self._build_time_index(self.events, self.store.ev_customer)
+    
+    @classmethod
+    def for_segments(cls, segments: Dict[str, SegmentDefinition], data_dir: str = "data", **kwargs) -> "SegmentEngine":
+        """Sadece segmentlerin en geniş gün penceresindeki işlem/eventleri yükleyen motor"""
+        window = history_window(segments.values())
+        return cls(data_dir, window_days=window, **kwargs)
+    
+    def _ensure_history(self, since: Optional[int]):
+        """Yüklenen geçmiş since'i (None: tüm geçmiş) kapsamıyorsa veriyi genişleterek yeniden yükle"""
+        if self.loaded_since is None or (since is not None and since >= self.loaded_since):
+            return
+        self.loaded_since = since
+        stale = [
+            dataset for dataset, loaded in self._loaded_since.items()
+            if loaded is not None and (since is None or since < loaded)
+        ]
+        if not stale:
+            return
+        
+        if self._executor is not None:
+            self._executor.close()
+            self._executor = None
+        self._compiler = None
+        self._stats_index = None
+        self._planner = None
+        self.store = None
+        
+        # Eksik geçmişli veri setleri ve indexleri bırakılır, ilk erişimde yeniden okunur
+        # (columnar: tablolar birlikte kurulduğundan hepsi yeniden yüklenir)
+        for dataset in (DATASET_ATTRIBUTES if self.backend == "columnar" else stale):
+            self._loaded_since.pop(dataset, None)
+            for name in DATASET_ATTRIBUTES[dataset]:
+                self.__dict__.pop(name, None)
+        if self.backend == "columnar":
+            self._row_indexes_built = False
+            with self.memory_tracer.phase("load_data"):
+                self._load_data()
+    
+    @property
+    def history_complete(self) -> bool:
+        """İşlem geçmişinin tamamı yüklü (veya ilk erişimde yüklenecek) mi; False ise işlem toplamları geçmişi yeniden okutur
+
+        Veri okutmaz: yüklenmemiş işlemler için bölüm manifestine bakılır
+        (bölümsüz düzende tek dosya her zaman tamamen okunur).
+        """
+        if self.loaded_since is None:
+            return True
+        if "transactions" in self._loaded_since:
+            return self._loaded_since["transactions"] is None
+        return reads_complete(self.data_dir, "transactions", self.loaded_since)
+    
+    def is_loaded(self, dataset: str) -> bool:
+        """İşlem/event veri seti belleğe yüklendi mi (tembel yükleme, bkz. DATASET_ATTRIBUTES)"""
+        return dataset in self.__dict__
+    
+    def _history_since(self, segments: List[SegmentDefinition], clock: EvaluationClock) -> Optional[int]:
+        """Segmentlerin bu değerlendirme anında ihtiyaç duyduğu en eski işlem/event zamanı"""
+        window = history_window(segments)
+        return clock.cutoff(window) if window is not None else None
+    
+    @property
+    def compiler(self) -> SegmentCompiler:
+        """Vektörel derleyici (memory/compact backend'de kolon deposu ilk ihtiyaçta, tabloları ilk erişimde kurulur)"""
+        if self._compiler is None:
+            if self.store is None:
+                with self._timed("columnar_store"), self.memory_tracer.phase("columnar_store"):
+                    self.store = ColumnarStore.deferred(self.customers, lambda dataset: getattr(self, dataset))
+                    self.store.build_indexes()
+            self._compiler = SegmentCompiler(self.store, self._compare)
+        return self._compiler
+    
+    @property
+    def executor(self) -> ShardedExecutor:
+        """Paralel çalıştırıcı (workers > 1 iken vektörel yol bunu kullanır)"""
+        if self._executor is None:
+            self._executor = ShardedExecutor(self.compiler.store, self._compare, self.workers)
+        return self._executor
+    
+    def close(self):
+        """Paralel çalıştırıcının süreçlerini ve shared memory bloklarını serbest bırak"""
+        if self._executor is not None:
+            self._executor.close()
+            self._executor = None
+        if self.sql_store is not None:
+            self.sql_store.close()
+        self._stats_index = None
+        self._estimator = None
+    
+    @property
+    def planner(self) -> QueryPlanner:
+        """Satır bazlı motorun koşul sıralayıcısı"""
+        if self._planner is None:
+            if not self._row_indexes_built:
+                self._build_row_indexes()
+            self._planner = QueryPlanner(self)
+        return self._planner
+    
+    def explain_segment(self, segment: SegmentDefinition) -> QueryPlan:
+        """Satır bazlı motorun bu segment için seçeceği koşul sırası"""
+        return self.planner.plan(segment)
+    
+    def compile_segment(self, segment: SegmentDefinition) -> CompiledSegment:
+        """Segment tanımını vektörel maskelere derle"""
+        return self.compiler.compile(segment)
+    
+    def compile_sql(self, segment: SegmentDefinition, as_of: Optional[datetime] = None) -> tuple:
+        """Segment tanımının SQLite sorgusu ve parametreleri (sadece sqlite backend)"""
+        if self._sql_compiler is None:
+            raise ValueError(f"SQL derlemesi sadece sqlite backend'de kullanılabilir (backend: {self.backend})")
+        return self._sql_compiler.compile(segment, EvaluationClock(as_of))
+    
+    def _build_time_index(self, table: ColumnarTable, owners: "np.ndarray") -> tuple:
+        """Anahtar -> zamana göre sıralı satırlar (ColumnarRows) + epoch saniyeleri (columnar backend)
+
+        Kolonlardan kurulur, kayıtlar dict'e çevrilmez. Aynı saniyedeki
+        kayıtlar dosya sırasında kalır (bkz. _TimeIndexBuilder).
+        """
+        size = len(self.customer_keys) + 1
+        index = [()] * size
+        times = [array("q")] * size  # boş dizi paylaşılır, sadece okunur
+        if not len(table):
+            return index, times
+        
+        if table.kinds.get("timestamp") == "timestamp":
+            timestamps = table.columns["timestamp"]
+        else:
+            timestamps = np.array([parse_timestamp(ts) for ts in table.decode_column("timestamp")], dtype=np.int64)
+        order = np.lexsort((timestamps, owners))  # stabil: müşteri, sonra zaman
+        order = order[owners[order] >= 0]  # Müşterisi olmayan kayıtlar hiçbir segmentte değerlendirilmez
+        sorted_times = timestamps[order].astype(np.int64)
+        keys, starts, counts = np.unique(owners[order], return_index=True, return_counts=True)
+        for key, start, count in zip(keys.tolist(), starts.tolist(), counts.tolist()):
+            index[key] = ColumnarRows(table, order[start:start + count])
+            times[key] = array("q", sorted_times[start:start + count].tobytes())
+        return index, times
+    
+    def _evaluate_condition(self, customer: Dict, condition: Dict, clock: Optional[EvaluationClock] = None) -> bool:
+        """Tek bir koşulu değerlendir (clock: çalıştırma boyunca sabit değerlendirme anı)"""
         field = condition["field"]
         operator = condition["operator"]
         value = condition["value"]
@@ -77,139 +502,541 @@ class SegmentEngine:
         
         # Agregasyon alanları (işlem bazlı)
         if field.startswith("tx_"):
-            return self._evaluate_transaction_condition(customer, field, operator, value, condition)
+            return self._evaluate_transaction_condition(customer, field, operator, value, condition, clock)
         
         # Event alanları
         if field.startswith("event_"):
-            return self._evaluate_event_condition(customer, field, operator, value, condition)
+            return self._evaluate_event_condition(customer, field, operator, value, condition, clock)
         
         return False
     
-    def _evaluate_transaction_condition(self, customer: Dict, field: str, operator: str, value: Any, condition: Dict) -> bool:
+    def _evaluate_transaction_condition(self, customer: Dict, field: str, operator: str, value: Any, condition: Dict,
+                                        clock: Optional[EvaluationClock] = None) -> bool:
         """İşlem bazlı koşulları değerlendir"""
-        cid = customer["customer_id"]
-        transactions = self.customer_transactions.get(cid, [])
-        
-        # Zaman filtresi
-        if "days" in condition:
-            cutoff = datetime.now() - timedelta(days=condition["days"])
-            transactions = [
-                tx for tx in transactions 
-                if datetime.strptime(tx["timestamp"], "%Y-%m-%d %H:%M:%S") >= cutoff
-            ]
+        aggregated = self._transaction_aggregate(customer, field, condition, clock)
+        if aggregated is None:
+            return False
+        return self._compare(aggregated, operator, value)
+    
+    def _transaction_aggregate(self, customer: Dict, field: str, condition: Dict, clock: Optional[EvaluationClock] = None) -> Any:
+        """İşlem agregasyonunun müşteri için değeri (None: koşul sağlanamaz)"""
+        if clock is None:
+            clock = EvaluationClock()
+        key = self.customer_keys.key(customer["customer_id"])
+        transactions = self.customer_transactions[key]
+        times = self.customer_transaction_times[key]
         
-        # Ek filtre (örn: sadece premium yakıt)
-        if "filter" in condition:
-            filter_field = condition["filter"]["field"]
-            filter_value = condition["filter"]["value"]
-            transactions = [tx for tx in transactions if tx.get(filter_field) == filter_value]
+        # Sayı/tutar/ortalama: günlük özetten iki dizi okumasıyla
+        if field in ROLLUP_FIELDS:
+            channel = channel_for_filter(condition.get("filter"))
+            if channel in self.rollup_channels:
+                return self._rollup_aggregate(key, field, condition, channel, clock)
         
-        if field == "tx_count":
-            return self._compare(len(transactions), operator, value)
+        # Zaman filtresi: liste sıralı, pencere başı tek bisect ile bulunur
+        if "days" in condition:
+            start = bisect_left(times, clock.cutoff(condition["days"]))
+            transactions = transactions[start:]
+            times = times[start:]
         
-        elif field == "tx_total_amount":
-            total = sum(tx["total_amount"] for tx in transactions)
-            return self._compare(total, operator, value)
+        # Ek filtre (örn: sadece premium yakıt, market_amount > 0)
+        predicates = filter_predicates(condition.get("filter"))
+        if predicates:
+            kept = [(tx, ts) for tx, ts in zip(transactions, times) if self._matches_filter(tx, predicates)]
+            transactions = [tx for tx, _ in kept]
+            times = [ts for _, ts in kept]
         
-        elif field == "tx_avg_amount":
+        if field == "tx_last_days":
             if not transactions:
-                return False
-            avg = sum(tx["total_amount"] for tx in transactions) / len(transactions)
-            return self._compare(avg, operator, value)
+                return 9999  # Hiç işlem yoksa çok eski say
+            return clock.days_since(times[-1])  # sıralı: son eleman en yeni
         
-        elif field == "tx_last_days":
-            if not transactions:
-                return self._compare(9999, operator, value)  # Hiç işlem yoksa çok eski say
-            last_tx = max(transactions, key=lambda x: x["timestamp"])
-            days_since = (datetime.now() - datetime.strptime(last_tx["timestamp"], "%Y-%m-%d %H:%M:%S")).days
-            return self._compare(days_since, operator, value)
+        # tx_count, tx_sum_<kolon>, tx_distinct_<kolon>, ... (bkz. aggregates.py)
+        spec = parse_aggregate(field)
+        return aggregate_records(spec, transactions) if spec is not None else None
+    
+    def _rollup_aggregate(self, key: int, field: str, condition: Dict, channel: Any, clock: EvaluationClock) -> Any:
+        """tx_count / tx_total_amount / tx_avg_amount değerini günlük özetten hesapla"""
+        rollup = self.customer_rollups[key]
+        if rollup is None:
+            count, total = 0, 0
+        else:
+            cutoff = clock.cutoff(condition["days"]) if "days" in condition else None
+            count, total = rollup.window(
+                channel, cutoff, self.customer_transactions[key], self.customer_transaction_times[key]
+            )
         
-        return False
+        # Kuruş -> TL tek bölmeyle: toplam ve ortalama en yakın float'a yuvarlanır
+        if field == "tx_count":
+            return count
+        if field == "tx_total_amount":
+            return total / 100
+        if not count:
+            return None
+        return total / (count * 100)
     
-    def _evaluate_event_condition(self, customer: Dict, field: str, operator: str, value: Any, condition: Dict) -> bool:
+    def _evaluate_event_condition(self, customer: Dict, field: str, operator: str, value: Any, condition: Dict,
+                                  clock: Optional[EvaluationClock] = None) -> bool:
         """Event bazlı koşulları değerlendir"""
-        cid = customer["customer_id"]
-        events = self.customer_events.get(cid, [])
+        aggregated = self._event_aggregate(customer, field, condition, clock)
+        if aggregated is None:
+            return False
+        return self._compare(aggregated, operator, value)
+    
+    def _event_aggregate(self, customer: Dict, field: str, condition: Dict, clock: Optional[EvaluationClock] = None) -> Any:
+        """Event agregasyonunun müşteri için değeri (None: koşul sağlanamaz)"""
+        if clock is None:
+            clock = EvaluationClock()
+        key = self.customer_keys.key(customer["customer_id"])
+        events = self.customer_events[key]
         
-        # Zaman filtresi
+        # Zaman filtresi: liste sıralı, pencere başı tek bisect ile bulunur
         if "days" in condition:
-            cutoff = datetime.now() - timedelta(days=condition["days"])
-            events = [
-                ev for ev in events 
-                if datetime.strptime(ev["timestamp"], "%Y-%m-%d %H:%M:%S") >= cutoff
-            ]
+            times = self.customer_event_times[key]
+            events = events[bisect_left(times, clock.cutoff(condition["days"])):]
         
-        # Event tipi filtresi
+        # Event tipi ve ek filtre (örn. platform in [web, email])
         if "event_type" in condition:
             events = [ev for ev in events if ev["event_type"] == condition["event_type"]]
+        predicates = filter_predicates(condition.get("filter"))
+        if predicates:
+            events = [ev for ev in events if self._matches_filter(ev, predicates)]
+        
+        # event_count, event_distinct_<kolon>, event_last_<kolon>, ...
+        spec = parse_aggregate(field)
+        return aggregate_records(spec, events) if spec is not None else None
+    
+    def _shared_keys(self, condition: Dict) -> tuple:
+        """Segmentler arası paylaşım anahtarları: (koşul, agregasyon)"""
+        field = condition["field"]
+        if field.startswith("tx_"):
+            aggregate_key = ("tx", field, condition.get("days"), canonical_json(filter_predicates(condition.get("filter"))))
+        elif field.startswith("event_"):
+            aggregate_key = ("event", field, condition.get("days"), canonical_json(condition.get("event_type")),
+                             canonical_json(filter_predicates(condition.get("filter"))))
+        else:
+            aggregate_key = None
+        return canonical_json(condition), aggregate_key
+    
+    def _evaluate_shared_condition(self, customer: Dict, condition: Dict, keys: tuple, shared: Dict,
+                                   clock: EvaluationClock) -> bool:
+        """Koşulu değerlendir; aynı müşteri için hesaplanmış koşul/agregasyonları tekrar kullan"""
+        mask_key, aggregate_key = keys
+        if mask_key in shared:
+            return shared[mask_key]
         
-        if field == "event_count":
-            return self._compare(len(events), operator, value)
+        field = condition["field"]
+        if aggregate_key is None or field in customer:
+            result = self._evaluate_condition(customer, condition, clock)
+        else:
+            if aggregate_key not in shared:
+                if field.startswith("tx_"):
+                    shared[aggregate_key] = self._transaction_aggregate(customer, field, condition, clock)
+                else:
+                    shared[aggregate_key] = self._event_aggregate(customer, field, condition, clock)
+            aggregated = shared[aggregate_key]
+            result = aggregated is not None and self._compare(aggregated, condition["operator"], condition["value"])
         
-        return False
+        shared[mask_key] = result
+        return result
+    
+    def _matches_filter(self, record: Dict, predicates: List[Dict]) -> bool:
+        """Kayıt tüm filtre koşullarını sağlıyor mu (olmayan alan None)"""
+        for predicate in predicates:
+            if not self._compare(record.get(predicate["field"]), predicate["operator"], predicate["value"]):
+                return False
+        return True
     
-    def _compare(self, actual: Any, operator: str, expected: Any) -> bool:
-        """Karşılaştırma operatörleri"""
-        if operator == "eq" or operator == "==":
-            return actual == expected
-        elif operator == "ne" or operator == "!=":
-            return actual != expected
-        elif operator == "gt" or operator == ">":
-            return actual > expected
-        elif operator == "gte" or operator == ">=":
-            return actual >= expected
-        elif operator == "lt" or operator == "<":
-            return actual < expected
-        elif operator == "lte" or operator == "<=":
-            return actual <= expected
-        elif operator == "in":
-            return actual in expected
-        elif operator == "contains":
-            return expected in actual if isinstance(actual, str) else False
+    @staticmethod
+    def _compare(actual: Any, operator: str, expected: Any) -> bool:
+        """Karşılaştırma operatörleri (karşılaştırılamayan değerler, örn. None > 0, eşleşmez)"""
+        try:
+            if operator == "eq" or operator == "==":
+                return actual == expected
+            elif operator == "ne" or operator == "!=":
+                return actual != expected
+            elif operator == "gt" or operator == ">":
+                return actual > expected
+            elif operator == "gte" or operator == ">=":
+                return actual >= expected
+            elif operator == "lt" or operator == "<":
+                return actual < expected
+            elif operator == "lte" or operator == "<=":
+                return actual <= expected
+            elif operator == "in":
+                return actual in expected
+            elif operator == "contains":
+                # Metin içinde geçiyor mu / listede var mı (örn. market_items contains "Kahve")
+                return expected in actual if isinstance(actual, (str, list)) else False
+        except TypeError:
+            return False
         return False
     
-    def run_segment(self, segment: SegmentDefinition) -> List[Dict]:
-        """Segment tanımını çalıştır ve eşleşen müşterileri döndür"""
-        results = []
+    def run_segment(self, segment: SegmentDefinition, vectorized: Optional[bool] = None,
+                    as_of: Optional[datetime] = None) -> List[Dict]:
+        """Segment tanımını çalıştır ve eşleşen müşterileri döndür
+
+        vectorized: True -> derlenmiş NumPy maskeleri, False -> satır bazlı
+        değerlendirme. None ise backend'in varsayılanı kullanılır
+        (columnar: vektörel, memory: satır bazlı).
+        as_of: gün pencereleri ve tx_last_days için değerlendirme anı
+        (verilmezse çalıştırma başındaki an; tüm koşullarda aynı).
+        """
+        return self._customers_at(self._segments_rows({segment.name: segment}, vectorized, as_of)[segment.name])
+    
+    def run_segment_keys(self, segment: SegmentDefinition, vectorized: Optional[bool] = None,
+                         as_of: Optional[datetime] = None) -> array:
+        """Eşleşen müşterilerin int32 anahtarları (satır numaraları); kayıtlar customers_by_key ile alınır"""
+        return array("i", self._segments_rows({segment.name: segment}, vectorized, as_of)[segment.name])
+    
+    def customers_by_key(self, keys: array) -> List[Dict]:
+        """Anahtarlardaki müşteri kayıtları"""
+        return self._customers_at(keys)
+    
+    def run_segments(self, segments: Dict[str, SegmentDefinition], vectorized: Optional[bool] = None,
+                     as_of: Optional[datetime] = None) -> Dict[str, List[Dict]]:
+        """Birden çok segmenti tek geçişte çalıştır: anahtar -> eşleşen müşteriler
+
+        Segmentlerdeki ortak agregasyonlar (örn. son 90 gün tx_count, son 30
+        gün event_count) ve aynı koşullar bir kez hesaplanır.
+        """
+        rows = self._segments_rows(segments, vectorized, as_of)
+        return {key: self._customers_at(rows[key]) for key in segments}
+    
+    def profile_segment(self, segment: SegmentDefinition, vectorized: Optional[bool] = None,
+                        as_of: Optional[datetime] = None) -> Tuple[List[Dict], SegmentProfile]:
+        """Segmenti koşul bazlı ölçümle çalıştır -> (eşleşen müşteriler, profil)
+
+        Sonuç önbelleği okunmaz, koşullar her zaman değerlendirilir. Satır
+        bazlı yolda koşullar planlanan sırada ve kısa devreyle ölçülür;
+        vektörel yol tek süreçte çalışır; sqlite backend'de her koşul ayrıca
+        kendi sorgusuyla ölçülür. Profil, veri yükleme (load_stats) ve index
+        kurulum sürelerini (index_seconds) de içerir.
+        """
+        profile = SegmentProfile(segment.name, segment.logic, self.backend)
+        started = time.perf_counter()
+        clock = EvaluationClock(as_of)
+        self._ensure_history(self._history_since([segment], clock))
+        rows = self._evaluate_segments_rows([segment], vectorized, clock, [profile])[0]
+        profile.seconds = time.perf_counter() - started
+        profile.matched = len(rows)
+        profile.load = dict(self.load_stats)
+        profile.index_seconds = dict(self.index_seconds)
+        self.last_profile = profile
+        return self._customers_at(rows), profile
+    
+    def estimate_segment(self, segment: SegmentDefinition, sample_size: int = ESTIMATE_SAMPLE_SIZE,
+                         as_of: Optional[datetime] = None) -> SegmentEstimate:
+        """Sabit rastgele müşteri örnekleminden segment büyüklüğü + %95 güven aralığı
+
+        as_of: gün pencereleri için değerlendirme anı (verilmezse şimdi);
+        tahminde saklanır, refine_estimate aynı anı kullanır.
+        """
+        clock = EvaluationClock(as_of)
+        self._ensure_history(self._history_since([segment], clock))
+        if self._estimator is None:
+            self._estimator = SegmentEstimator(self)
+        return self._estimator.estimate(segment, sample_size, clock)
+    
+    def refine_estimate(self, estimate: SegmentEstimate, factor: int = 2) -> SegmentEstimate:
+        """Örneklemi büyüterek tahmini iyileştir (önceki örneklem tekrar değerlendirilmez, estimate.as_of anında)"""
+        self._ensure_history(self._history_since([estimate.segment], EvaluationClock(estimate.as_of)))
+        if self._estimator is None:
+            self._estimator = SegmentEstimator(self)
+        return self._estimator.refine(estimate, factor)
+    
+    def _segments_rows(self, segments: Dict[str, SegmentDefinition], vectorized: Optional[bool] = None,
+                       as_of: Optional[datetime] = None) -> Dict[str, array]:
+        """Segment anahtarı -> eşleşen müşterilerin int32 anahtarları / satır numaraları (önbellekli)
+
+        as_of verilen sonuçlar tekrarlanabilir olduğundan önbellekte süresiz
+        tutulur; verilmezse zaman penceresine bağlı sonuçlar TTL ile yenilenir.
+        """
+        as_of_key = as_of.isoformat() if as_of is not None else None
+        results = {}
+        pending = {}
+        for key, segment in segments.items():
+            cache_key = ("rows", self.data_version, segment_fingerprint(segment), as_of_key)
+            cached = self.cache.get(cache_key) if self.cache.enabled else None
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending[key] = (segment, cache_key)
         
-        for customer in self.customers:
-            condition_results = [
-                self._evaluate_condition(customer, cond) 
-                for cond in segment.conditions
-            ]
-            
-            if segment.logic == "AND":
-                match = all(condition_results)
-            else:  # OR
-                match = any(condition_results)
-            
-            if match:
-                results.append(customer)
+        if pending:
+            clock = EvaluationClock(as_of)  # Çalıştırma boyunca tek değerlendirme anı
+            self._ensure_history(self._history_since([segment for segment, _ in pending.values()], clock))
+            evaluated = self._evaluate_segments_rows([segment for segment, _ in pending.values()], vectorized, clock)
+            for (key, (segment, cache_key)), matched in zip(pending.items(), evaluated):
+                rows = array("i", matched)
+                expires = as_of is None and is_time_dependent(segment)
+                self.cache.put(cache_key, rows, sys.getsizeof(rows), expires=expires)
+                results[key] = rows
         
         return results
     
-    def get_segment_stats(self, segment_results: List[Dict]) -> Dict:
-        """Segment için istatistikler"""
+    def _evaluate_segments_rows(self, segments: List[SegmentDefinition], vectorized: Optional[bool],
+                                clock: EvaluationClock, profiles: Optional[List[SegmentProfile]] = None) -> List[List[int]]:
+        """Segmentleri tek geçişte çalıştır (önbelleksiz; profiles: segment başına ölçümler)"""
+        # SQLite backend: tüm segmentler tek SQL sorgusunda
+        if self.backend == "sqlite":
+            if profiles is not None:
+                self._profile_sql(segments, clock, profiles)
+            return self._sql_compiler.evaluate_many(segments, clock)
+        
+        results = [None] * len(segments)
+        remaining = []
+        
+        # Sadece bitmap'li profil alanları: satır taramadan bitmap AND/OR
+        for i, segment in enumerate(segments):
+            if profiles is not None:
+                bitmap = self._resolve_bitmap_profiled(segment, profiles[i])
+            else:
+                bitmap = self.bitmap_index.resolve_segment(segment, self._compare)
+            if bitmap is not None:
+                results[i] = bitmap_rows(bitmap, self.bitmap_index.size)
+            else:
+                remaining.append(i)
+        
+        if not remaining:
+            return results
+        
+        if vectorized is None:
+            vectorized = self.backend == "columnar"
+        
+        if vectorized:
+            batch = [segments[i] for i in remaining]
+            if profiles is not None:
+                # Ölçüm tek süreçte: koşul süreleri süreçler arasında toplanamaz
+                batch_profiles = [profiles[i] for i in remaining]
+                for profile in batch_profiles:
+                    profile.method = "vectorized"
+                masks = self.compiler.evaluate_many(batch, clock, batch_profiles)
+                matched = [np.flatnonzero(mask) for mask in masks]
+            elif self.workers > 1:
+                matched = self.executor.evaluate_many(batch, clock.now)
+            else:
+                matched = [np.flatnonzero(mask) for mask in self.compiler.evaluate_many(batch, clock)]
+            for i, rows in zip(remaining, matched):
+                results[i] = rows.tolist()
+            return results
+        
+        # Ucuz ve seçici koşullar önce; sonuç belli olunca kalanlar atlanır
+        plans = []
+        for i in remaining:
+            plan = self.last_plan = self.explain_segment(segments[i])
+            steps = [(cond, self._shared_keys(cond)) for cond in plan.conditions]
+            plans.append((i, plan.logic, steps))
+            results[i] = []
+            if profiles is not None:
+                profiles[i].method = "row"
+                profiles[i].conditions = [ConditionProfile(step.condition, step.position, "row") for step in plan.steps]
+        
+        if profiles is not None:
+            self._evaluate_rows_profiled(plans, profiles, results, clock)
+            return results
+        
+        for row, customer in enumerate(self.customers):
+            shared = {}  # Bu müşteri için hesaplanan koşul ve agregasyonlar
+            for i, logic, steps in plans:
+                if logic == "AND":
+                    match = all(self._evaluate_shared_condition(customer, cond, keys, shared, clock) for cond, keys in steps)
+                else:  # OR
+                    match = any(self._evaluate_shared_condition(customer, cond, keys, shared, clock) for cond, keys in steps)
+                
+                if match:
+                    results[i].append(row)
+        
+        return results
+    
+    def _evaluate_rows_profiled(self, plans: List[tuple], profiles: List[SegmentProfile], results: List[List[int]],
+                                clock: EvaluationClock):
+        """Satır bazlı değerlendirme, koşul başına süre ve sayaçlarla (kısa devre korunur)"""
+        for row, customer in enumerate(self.customers):
+            shared = {}
+            for i, logic, steps in plans:
+                match = logic == "AND"
+                for (cond, keys), measured in zip(steps, profiles[i].conditions):
+                    mask_key, aggregate_key = keys
+                    if mask_key in shared or aggregate_key in shared:
+                        measured.cache_hits += 1
+                    started = time.perf_counter()
+                    passed = bool(self._evaluate_shared_condition(customer, cond, keys, shared, clock))
+                    measured.seconds += time.perf_counter() - started
+                    measured.rows_examined += 1
+                    measured.rows_passed += passed
+                    if passed != (logic == "AND"):  # AND'de ilk False, OR'da ilk True sonucu belirler
+                        match = passed
+                        break
+                
+                if match:
+                    results[i].append(row)
+    
+    def _resolve_bitmap_profiled(self, segment: SegmentDefinition, profile: SegmentProfile) -> Optional[int]:
+        """resolve_segment gibi; koşul başına bitmap süresi ve eşleşen müşteri sayısı"""
+        index = self.bitmap_index
+        if not all(index.can_answer(cond) for cond in segment.conditions):
+            return None
+        
+        profile.method = "bitmap"
+        result = index.all_rows if segment.logic == "AND" else 0
+        for position, cond in enumerate(segment.conditions):
+            started = time.perf_counter()
+            bitmap = index.resolve(cond, self._compare)
+            result = result & bitmap if segment.logic == "AND" else result | bitmap
+            profile.conditions.append(ConditionProfile(
+                cond, position, "bitmap", time.perf_counter() - started,
+                rows_examined=index.size, rows_passed=bin(bitmap).count("1"),
+            ))
+        return result
+    
+    def _profile_sql(self, segments: List[SegmentDefinition], clock: EvaluationClock, profiles: List[SegmentProfile]):
+        """sqlite: her koşulu tek koşullu segment sorgusu olarak ölç (segment sorgusu ayrıca çalışır)"""
+        size = len(self.customers)
+        for segment, profile in zip(segments, profiles):
+            profile.method = "sql"
+            for position, cond in enumerate(segment.conditions):
+                started = time.perf_counter()
+                matched = self._sql_compiler.evaluate_many([SegmentDefinition(segment.name, "", [cond])], clock)[0]
+                profile.conditions.append(ConditionProfile(
+                    cond, position, "sql", time.perf_counter() - started, rows_examined=size, rows_passed=len(matched),
+                ))
+    
+    def _customers_at(self, rows: List[int]) -> List[Dict]:
+        """Satır numaralarındaki müşteri kayıtları"""
+        if self.backend in ("columnar", "sqlite"):
+            return self.customers.rows(rows)
+        return [self.customers[i] for i in rows]
+    
+    def get_segment_stats(self, segment_results: List[Dict], approximate: bool = False,
+                          transactions: bool = True) -> Dict:
+        """Segment için istatistikler (önbellekli)
+
+        approximate: örneklemden büyük segmentlerde tabakalı örneklemle
+        yaklaşık değerler + error_bounds döndürür (maliyet segment
+        büyüklüğünden bağımsız); küçük segmentlerde kesin sonuç verilir.
+        transactions: işlem toplamları (total_transactions, total_revenue)
+        tüm geçmişi kapsar; pencereli yüklenmiş motorda geçmişi yeniden
+        okutur. False ise sadece profil istatistikleri hesaplanır.
+        """
         if not segment_results:
             return {"count": 0}
         
-        customer_ids = {c["customer_id"] for c in segment_results}
+        if approximate and len(segment_results) > APPROX_SAMPLE_SIZE:
+            if not transactions:
+                return approximate_segment_stats(segment_results, len(self.customers), None)
+            self._ensure_history(None)  # İşlem toplamları tüm geçmişi kapsar
+            return approximate_segment_stats(segment_results, len(self.customers), self._customer_totals)
         
-        # İşlem istatistikleri
-        segment_transactions = [
-            tx for tx in self.transactions 
-            if tx["customer_id"] in customer_ids
-        ]
+        digest = hashlib.sha256("\n".join(c["customer_id"] for c in segment_results).encode("utf-8"))
+        key = ("stats", self.data_version, digest.hexdigest(), transactions)
+        if self.cache.enabled:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+        
+        stats = self._compute_segment_stats(segment_results, transactions)
+        self.cache.put(key, stats, deep_sizeof(stats))
+        return copy.deepcopy(stats)
+    
+    def memory_report(self) -> MemoryReport:
+        """Veri setleri, indexler ve önbelleğin derin boyut tahmini (yüklenmemiş veri okunmaz)
+
+        Yapılar MEMORY_STRUCTURES sırasıyla ölçülür; önceki yapılarda sayılan
+        nesneler tekrar sayılmaz (örn. customer_transactions kayıtları değil
+        listeleri ve referansları içerir). peaks: trace_memory açıkken
+        yükleme / index aşamalarının tracemalloc tepe artışları.
+        """
+        report = MemoryReport(self.backend, peaks=dict(self.memory_tracer.peaks))
+        seen = {id(self)}  # Planlayıcı / tahminci motora referans tutar
+        for kind, names in MEMORY_STRUCTURES:
+            for name in names:
+                structure = self.__dict__.get(name)
+                if structure is None:
+                    continue
+                size, mapped = deep_size(structure, seen)
+                report.entries.append(MemoryEntry(name.lstrip("_"), kind, size, mapped))
+        return report
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Sonuç önbelleğinin isabet / kaçırma sayaçları"""
+        return self.cache.stats()
+    
+    @property
+    def stats_index(self) -> Optional[SegmentStatsIndex]:
+        """Müşteri başına işlem toplamları + kodlu profil alanları (numpy yoksa None)"""
+        if self._stats_index is None and HAS_NUMPY and self.backend != "sqlite":
+            if self.store is not None and self.store.tx_customer is not None:
+                self._stats_index = SegmentStatsIndex.from_store(self.store)
+            else:
+                if not self._row_indexes_built:
+                    self._build_row_indexes()
+                self._stats_index = SegmentStatsIndex.from_keys(self.customer_keys, self.tx_keys, self.customers, self.transactions)
+        return self._stats_index
+    
+    def _customer_totals(self, customers: List[Dict]) -> List[tuple]:
+        """Müşteri başına (işlem sayısı, gelir)"""
+        if self.sql_store is not None:
+            return self.sql_store.customer_totals([c["customer_id"] for c in customers])
         
+        index = self.stats_index
+        rows = index.lookup_rows(customers) if index is not None else None
+        if rows is not None:
+            return list(zip(index.tx_counts[rows].tolist(), index.revenue[rows].tolist()))
+        
+        if not self._row_indexes_built:
+            self._build_row_indexes()
+        totals = []
+        for customer in customers:
+            transactions = self.customer_transactions[self.customer_keys.key(customer["customer_id"])]
+            totals.append((len(transactions), sum(tx["total_amount"] for tx in transactions)))
+        return totals
+    
+    def _compute_segment_stats(self, segment_results: List[Dict], transactions: bool = True) -> Dict:
+        """Segment istatistiklerini hesapla"""
+        if not transactions:
+            return self._profile_stats(segment_results)
+        
+        self._ensure_history(None)  # İşlem toplamları tüm geçmişi kapsar
+        index = self.stats_index
+        rows = index.lookup_rows(segment_results) if index is not None else None
+        
+        # İşlem istatistikleri: müşteri başına önceden hesaplanmış toplamlardan
+        if rows is not None:
+            tx_count, revenue = index.transaction_totals(rows)
+            cities = index.breakdown("city", rows)
+            genders = index.breakdown("gender", rows)
+        elif self.sql_store is not None:
+            tx_count, revenue = self.sql_store.transaction_totals({c["customer_id"] for c in segment_results})
+            cities = genders = None
+        else:
+            # Üyelik: anahtar maskesi üzerinden (işlemler müşteri anahtarını tutar)
+            if not self._row_indexes_built:
+                self._build_row_indexes()
+            keys = self.customer_keys
+            member = keys.mask(keys.encode(c["customer_id"] for c in segment_results))
+            segment_transactions = [
+                tx for tx, key in zip(self.transactions, self.tx_keys)
+                if key >= 0 and member[key]
+            ]
+            tx_count = len(segment_transactions)
+            revenue = sum(tx["total_amount"] for tx in segment_transactions)
+            cities = genders = None
+        
+        stats = self._profile_stats(segment_results, cities, genders)
+        stats["total_transactions"] = tx_count
+        stats["total_revenue"] = round(revenue, 2)
+        return stats
+    
+    def _profile_stats(self, segment_results: List[Dict], cities: Optional[Dict] = None,
+                       genders: Optional[Dict] = None) -> Dict:
+        """İşlem verisi gerektirmeyen istatistikler (sayı, oran, şehir, yaş, cinsiyet, app)"""
         return {
             "count": len(segment_results),
             "percentage": round(len(segment_results) / len(self.customers) * 100, 1),
-            "cities": self._count_by_field(segment_results, "city"),
+            "cities": cities if cities is not None else self._count_by_field(segment_results, "city"),
             "avg_age": round(sum(c["age"] for c in segment_results) / len(segment_results), 1),
-            "gender_split": self._count_by_field(segment_results, "gender"),
+            "gender_split": genders if genders is not None else self._count_by_field(segment_results, "gender"),
             "has_app_pct": round(sum(1 for c in segment_results if c["has_app"]) / len(segment_results) * 100, 1),
-            "total_transactions": len(segment_transactions),
-            "total_revenue": round(sum(tx["total_amount"] for tx in segment_transactions), 2),
         }
     
     def _count_by_field(self, data: List[Dict], field: str) -> Dict:
@@ -270,7 +1097,7 @@ PREDEFINED_SEGMENTS = {
         name="Market Alışverişçileri",
         description="Son 30 günde 3+ kez market alışverişi yapan müşteriler",
         conditions=[
-            {"field": "tx_count", "operator": ">=", "value": 3, "days": 30, "filter": {"field": "market_amount", "value": True}},
+            {"field": "tx_count", "operator": ">=", "value": 3, "days": 30, "filter": {"field": "market_amount", "operator": ">", "value": 0}},
         ]
     ),
     
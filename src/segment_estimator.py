@@ -0,0 +1,156 @@
+"""
+CDP Demo - Segment Büyüklüğü Tahmini
+Sabit rastgele müşteri örnekleminden segment büyüklüğü ve güven aralığı
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Any, Optional
+
+from columnar_store import ColumnarStore, HAS_NUMPY
+from segment_compiler import SegmentCompiler
+from time_utils import EvaluationClock
+
+if HAS_NUMPY:
+    import numpy as np
+
+# İlk tahminde değerlendirilen müşteri sayısı; her iyileştirmede katlanır
+ESTIMATE_SAMPLE_SIZE = 1000
+ESTIMATE_CONFIDENCE = 0.95
+ESTIMATE_Z = 1.96
+ESTIMATE_SEED = 42
+
+
+@dataclass
+class SegmentEstimate:
+    """Örneklemden segment büyüklüğü tahmini"""
+    segment: Any
+    count: int  # Tahmini müşteri sayısı
+    lower: int  # Güven aralığı alt sınırı
+    upper: int  # Güven aralığı üst sınırı
+    matched: int  # Örneklemde eşleşen müşteri
+    sample_size: int
+    population: int
+    confidence: float = ESTIMATE_CONFIDENCE
+    as_of: Optional[datetime] = None  # Değerlendirme anı; iyileştirmelerde aynı an kullanılır
+
+    @property
+    def exact(self) -> bool:
+        """Tüm müşteriler değerlendirildi mi (aralık tek nokta)"""
+        return self.sample_size >= self.population
+
+    @property
+    def percentage(self) -> float:
+        return round(self.count / self.population * 100, 1) if self.population else 0.0
+
+    @property
+    def margin(self) -> float:
+        """Güven aralığı yarı genişliği (müşteri oranı olarak)"""
+        return (self.upper - self.lower) / 2 / self.population if self.population else 0.0
+
+
+def wilson_interval(matched: int, sample_size: int, population: int) -> tuple:
+    """Wilson skor aralığı (sonlu evren düzeltmeli) -> (tahmin, alt, üst) müşteri sayısı"""
+    if sample_size >= population:
+        return matched, matched, matched
+
+    z2 = ESTIMATE_Z ** 2
+    share = matched / sample_size
+    center = (share + z2 / (2 * sample_size)) / (1 + z2 / sample_size)
+    half = ESTIMATE_Z / (1 + z2 / sample_size) * math.sqrt(
+        share * (1 - share) / sample_size + z2 / (4 * sample_size ** 2)
+    )
+    half *= math.sqrt((population - sample_size) / (population - 1))
+
+    # Aralık tahmini içerir; örneklemde eşleşen/eşleşmeyen müşteriler kesin bilinir
+    count = round(share * population)
+    lower = max(min(math.floor((center - half) * population), count), matched)
+    upper = min(max(math.ceil((center + half) * population), count), population - (sample_size - matched))
+    return count, lower, upper
+
+
+class SegmentEstimator:
+    """Müşterilerin sabit (seed'li) rastgele sırası üzerinden artımlı tahmin
+
+    Örneklem bu sıranın ilk n müşterisidir; iyileştirme sadece yeni eklenen
+    müşterileri değerlendirir ve önceki eşleşme sayısını kullanır.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.population = len(engine.customers)
+        self.order = list(range(self.population))
+        random.Random(ESTIMATE_SEED).shuffle(self.order)
+
+    def estimate(self, segment, sample_size: int = ESTIMATE_SAMPLE_SIZE,
+                 clock: Optional[EvaluationClock] = None) -> SegmentEstimate:
+        """İlk sample_size müşteriden tahmin (clock: örneklemin değerlendirme anı)"""
+        clock = clock or EvaluationClock()
+        # Sadece bitmap'li profil alanları: örneklemeye gerek yok, sayım kesin
+        index = self.engine.bitmap_index
+        bitmap = index.resolve_segment(segment, self.engine._compare) if index is not None else None
+        if bitmap is not None:
+            count = bin(bitmap).count("1")
+            return SegmentEstimate(segment, count, count, count, count, self.population, self.population,
+                                   as_of=clock.now)
+        return self._extend(segment, 0, 0, sample_size, clock)
+
+    def refine(self, estimate: SegmentEstimate, factor: int = 2) -> SegmentEstimate:
+        """Örneklemi factor katına çıkararak tahmini iyileştir (yeni müşteriler tahminin anında değerlendirilir)"""
+        if estimate.exact:
+            return estimate
+        return self._extend(estimate.segment, estimate.sample_size, estimate.matched,
+                            estimate.sample_size * factor, EvaluationClock(estimate.as_of))
+
+    def _extend(self, segment, start: int, matched: int, sample_size: int, clock: EvaluationClock) -> SegmentEstimate:
+        """order[start:sample_size] müşterilerini değerlendirip tahmini güncelle"""
+        sample_size = min(sample_size, self.population)
+        rows = self.order[start:sample_size]
+        if rows:
+            matched += self._count_matches(segment, rows, clock)
+        count, lower, upper = wilson_interval(matched, sample_size, self.population)
+        return SegmentEstimate(segment, count, lower, upper, matched, sample_size, self.population, as_of=clock.now)
+
+    def _count_matches(self, segment, rows: List[int], clock: EvaluationClock) -> int:
+        """Verilen müşteri satırlarından kaçı segmente uyuyor"""
+        engine = self.engine
+
+        # SQLite backend: sorgu örneklem müşterileriyle sınırlanır
+        if engine.backend == "sqlite":
+            return len(engine._sql_compiler.evaluate_many([segment], clock, rows)[0])
+        
+        # Kolon deposu varsa: örneklem müşterileri için küçük bir depo derle
+        if engine.store is not None and engine.store.tx_customer is not None:
+            sample = self._sample_store(engine.store, rows)
+            mask = SegmentCompiler(sample, engine._compare).compile(segment).evaluate(clock)
+            return int(mask.sum())
+
+        if not engine._row_indexes_built:
+            engine._build_row_indexes()
+        customers = engine.customers
+        test = all if segment.logic == "AND" else any
+        return sum(
+            1 for row in rows
+            if test(engine._evaluate_condition(customers[row], cond, clock) for cond in segment.conditions)
+        )
+
+    @staticmethod
+    def _sample_store(store: ColumnarStore, rows: List[int]) -> ColumnarStore:
+        """Örneklem müşterileri ve onların işlem/eventlerinden oluşan depo"""
+        rows = np.sort(np.asarray(rows, dtype=np.int64))
+        remap = np.full(len(store.customers) + 1, -1, dtype=np.int32)  # son eleman: bilinmeyen müşteri (-1)
+        remap[rows] = np.arange(len(rows), dtype=np.int32)
+
+        tx_codes = remap[store.tx_customer]
+        ev_codes = remap[store.ev_customer]
+        tx_rows = np.flatnonzero(tx_codes >= 0)
+        ev_rows = np.flatnonzero(ev_codes >= 0)
+        return ColumnarStore.from_tables(
+            store.customers.take(rows),
+            store.transactions.take(tx_rows),
+            store.events.take(ev_rows),
+            tx_codes[tx_rows],
+            ev_codes[ev_rows],
+        )
@@ -0,0 +1,66 @@
+"""
+CDP Demo - Segment Profili
+Segment çalıştırmasının koşul bazlı ölçümleri (süre, incelenen/geçen müşteri, paylaşım isabetleri)
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+from record_stream import LoadStats
+
+
+@dataclass
+class ConditionProfile:
+    """Bir koşulun ölçümü"""
+    condition: Dict[str, Any]
+    position: int  # Segment tanımındaki sırası
+    method: str  # row, vectorized, bitmap, sql
+    seconds: float = 0.0
+    rows_examined: int = 0  # Koşulun değerlendirildiği müşteri
+    rows_passed: int = 0  # Koşulu sağlayan müşteri
+    cache_hits: int = 0  # Çalıştırma içinde hesaplanmış koşul/agregasyondan gelen sonuç
+
+    @property
+    def pass_rate(self) -> float:
+        return self.rows_passed / self.rows_examined if self.rows_examined else 0.0
+
+    def label(self) -> str:
+        cond = self.condition
+        days = f" (son {cond['days']} gün)" if cond.get("days") else ""
+        return f"{cond['field']} {cond['operator']} {cond['value']}{days}"
+
+
+@dataclass
+class SegmentProfile:
+    """Segment çalıştırmasının profili: koşul ölçümleri + veri yükleme / index süreleri"""
+    segment_name: str
+    logic: str
+    backend: str
+    method: str = ""  # Segmentin değerlendirildiği yol (bitmap, vectorized, row, sql)
+    seconds: float = 0.0  # Toplam süre (gerekirse geçmişin yüklenmesi dahil)
+    matched: int = 0
+    conditions: List[ConditionProfile] = field(default_factory=list)
+    load: Dict[str, LoadStats] = field(default_factory=dict)  # Veri seti -> okuma özeti
+    index_seconds: Dict[str, float] = field(default_factory=dict)  # Index -> kurulum süresi
+
+    @property
+    def slowest(self) -> Optional[ConditionProfile]:
+        """En uzun süren koşul"""
+        return max(self.conditions, key=lambda c: c.seconds, default=None)
+
+    def describe(self) -> str:
+        """Profili okunabilir metin olarak döndür"""
+        lines = [
+            f"Profil: {self.segment_name} ({self.logic}, {self.backend}/{self.method}) "
+            f"{self.seconds * 1000:.1f} ms, {self.matched:,} müşteri"
+        ]
+        for i, cond in enumerate(self.conditions, 1):
+            lines.append(
+                f"  {i}. [{cond.position + 1}] {cond.label()} | {cond.seconds * 1000:.1f} ms "
+                f"incelenen={cond.rows_examined:,} geçen={cond.rows_passed:,} paylaşım={cond.cache_hits:,} ({cond.method})"
+            )
+        for stats in self.load.values():
+            lines.append(f"  yükleme: {stats.describe()}")
+        for name, seconds in self.index_seconds.items():
+            lines.append(f"  index: {name} {seconds * 1000:.1f} ms")
+        return "\n".join(lines)
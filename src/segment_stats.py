@@ -0,0 +1,246 @@
+"""
+CDP Demo - Segment İstatistik Indexi
+Müşteri başına önceden hesaplanmış işlem sayısı/gelir ve sözlük kodlu profil alanları
+"""
+
+import math
+import random
+from array import array
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from columnar_store import ColumnarStore, CategoricalColumn, HAS_NUMPY
+from customer_keys import CustomerKeys
+
+if HAS_NUMPY:
+    import numpy as np
+
+# Segment istatistiklerinde dağılımı verilen profil alanları
+BREAKDOWN_FIELDS = ("city", "gender")
+
+# Yaklaşık mod: örneklem büyüklüğü, tabaka sayısı, güven düzeyi
+APPROX_SAMPLE_SIZE = 2000
+APPROX_STRATA = 20
+APPROX_CONFIDENCE = 0.95
+APPROX_Z = 1.96
+APPROX_SEED = 42
+
+
+class RunningStats:
+    """Akan veri üzerinde ortalama ve varyans (Welford)"""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        """Örneklem varyansı"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+
+def stratified_sample(size: int, sample_size: int = APPROX_SAMPLE_SIZE, strata: int = APPROX_STRATA,
+                      seed: int = APPROX_SEED) -> List[Tuple[int, List[int]]]:
+    """Sırayı eşit tabakalara böl, her tabakadan orantılı rastgele örnek al -> [(tabaka boyutu, pozisyonlar)]"""
+    rng = random.Random(seed)
+    strata = max(min(strata, sample_size // 2, size), 1)
+    bounds = [size * h // strata for h in range(strata + 1)]
+    sample = []
+    for lo, hi in zip(bounds, bounds[1:]):
+        take = min(max(round(sample_size * (hi - lo) / size), 2), hi - lo)
+        sample.append((hi - lo, sorted(rng.sample(range(lo, hi), take))))
+    return sample
+
+
+def stratified_mean(strata: List[Tuple[int, RunningStats]], total: int) -> Tuple[float, float]:
+    """Tabakalı ortalama ve güven aralığı yarı genişliği (sonlu evren düzeltmeli)"""
+    mean = 0.0
+    variance = 0.0
+    for size, stats in strata:
+        weight = size / total
+        mean += weight * stats.mean
+        if stats.count:
+            variance += weight ** 2 * stats.variance / stats.count * (1 - stats.count / size)
+    return mean, APPROX_Z * math.sqrt(variance)
+
+
+class SegmentStatsIndex:
+    """Müşteri satırı -> işlem sayısı, gelir ve kategorik profil kodları
+
+    Segment istatistiği işlem tablosunu taramadan, segment büyüklüğü kadar
+    iş ile hesaplanır.
+    """
+
+    def __init__(self, rows: Dict[str, int], tx_counts: "np.ndarray", revenue: "np.ndarray",
+                 breakdowns: Dict[str, CategoricalColumn]):
+        self.rows = rows
+        self.tx_counts = tx_counts
+        self.revenue = revenue
+        self.breakdowns = breakdowns
+
+    @classmethod
+    def from_keys(cls, keys: CustomerKeys, tx_keys: array, customers: List[Dict],
+                  transactions: List[Dict]) -> "SegmentStatsIndex":
+        """Müşteri anahtarları ve dict listelerinden index oluştur (memory backend)"""
+        owners = np.frombuffer(tx_keys, dtype=np.intc).astype(np.int64)
+        amounts = np.array([tx["total_amount"] for tx in transactions], dtype=np.float64)
+
+        breakdowns = {}
+        for field in BREAKDOWN_FIELDS:
+            try:
+                breakdowns[field] = CategoricalColumn.encode([c.get(field) for c in customers])
+            except TypeError:
+                continue  # Hash'lenemeyen değerler: dağılım dict'lerden hesaplanır
+
+        return cls(keys.index, *cls._totals(owners, amounts, len(customers)), breakdowns)
+
+    @classmethod
+    def from_store(cls, store: ColumnarStore) -> "SegmentStatsIndex":
+        """Kolon deposundan index oluştur (kategorik kolonlar kopyalanmaz)"""
+        customers = store.customers
+        amounts = store.transactions.columns["total_amount"] if "total_amount" in store.transactions else None
+        if amounts is None:
+            amounts = np.zeros(len(store.transactions), dtype=np.float64)
+
+        breakdowns = {}
+        for field in BREAKDOWN_FIELDS:
+            if field not in customers:
+                breakdowns[field] = CategoricalColumn.encode([None] * len(customers))
+            elif customers.kinds[field] == "categorical":
+                breakdowns[field] = customers.columns[field]
+            elif customers.kinds[field] != "object":
+                breakdowns[field] = CategoricalColumn.encode(customers.decode_column(field))
+
+        return cls(store.customer_index, *cls._totals(store.tx_customer, amounts, len(customers)), breakdowns)
+
+    @staticmethod
+    def _totals(owners: "np.ndarray", amounts: "np.ndarray", size: int) -> tuple:
+        """Müşteri başına işlem sayısı ve gelir (müşteri içi toplama dosya sırasında)"""
+        known = owners >= 0
+        counts = np.bincount(owners[known], minlength=size)
+        revenue = np.bincount(owners[known], weights=amounts[known], minlength=size)
+        return counts, revenue
+
+    def lookup_rows(self, segment_results: List[Dict]) -> Optional["np.ndarray"]:
+        """Segment kayıtlarının satır numaraları (index dışı müşteri varsa None)"""
+        rows = self.rows
+        try:
+            return np.array([rows[c["customer_id"]] for c in segment_results], dtype=np.int64)
+        except KeyError:
+            return None
+
+    def transaction_totals(self, rows: "np.ndarray") -> tuple:
+        """Segmentin toplam işlem sayısı ve geliri (her müşteri bir kez)"""
+        unique = np.unique(rows)
+        count = int(self.tx_counts[unique].sum())
+        return count, float(self.revenue[unique].sum()) if count else 0
+
+    def breakdown(self, field: str, rows: "np.ndarray") -> Optional[Dict[Any, int]]:
+        """Alan bazında sayım; çoktan aza, eşitlikte segmentte ilk görülen değer önce"""
+        column = self.breakdowns.get(field)
+        if column is None:
+            return None
+        codes = column.codes[rows].astype(np.int64)
+        counts = np.bincount(codes, minlength=len(column.categories))
+        present, first_seen = np.unique(codes, return_index=True)
+        order = sorted(zip(present.tolist(), first_seen.tolist()), key=lambda p: (-counts[p[0]], p[1]))
+        categories = column.categories
+        return {categories[code]: int(counts[code]) for code, _ in order}
+
+
+def _proportion(hits: int, count: int) -> RunningStats:
+    """0/1 gözlemlerinden (hits / count) RunningStats"""
+    stats = RunningStats()
+    stats.count = count
+    stats.mean = hits / count if count else 0.0
+    stats.m2 = count * stats.mean * (1 - stats.mean)
+    return stats
+
+
+def approximate_segment_stats(segment_results: List[Dict], total_customers: int,
+                              customer_totals: Optional[Callable[[List[Dict]], List[Tuple[int, float]]]],
+                              sample_size: int = APPROX_SAMPLE_SIZE) -> Dict:
+    """Tabakalı örneklemden yaklaşık segment istatistikleri ve %95 hata payları
+
+    Maliyet segment büyüklüğünden bağımsızdır: sadece örneklenen müşteriler
+    okunur. Sayım ve toplamlar ortalama x segment büyüklüğü olarak tahmin
+    edilir; şehir/cinsiyet dağılımında sadece örneklemde görülen değerler yer alır.
+    customer_totals None ise işlem toplamları (total_transactions, total_revenue) hesaplanmaz.
+    """
+    size = len(segment_results)
+    strata = stratified_sample(size, sample_size)
+    sampled = [segment_results[i] for _, positions in strata for i in positions]
+    totals = iter(customer_totals(sampled)) if customer_totals is not None else None
+
+    names = ("avg_age", "has_app", "transactions", "revenue") if totals is not None else ("avg_age", "has_app")
+    metrics = {name: [] for name in names}
+    breakdown_hits = {field: [] for field in BREAKDOWN_FIELDS}
+    members = iter(sampled)
+    for stratum_size, positions in strata:
+        running = {name: RunningStats() for name in metrics}
+        hits = {field: {} for field in BREAKDOWN_FIELDS}
+        for _ in positions:
+            customer = next(members)
+            running["avg_age"].add(customer["age"])
+            running["has_app"].add(1.0 if customer["has_app"] else 0.0)
+            if totals is not None:
+                tx_count, revenue = next(totals)
+                running["transactions"].add(tx_count)
+                running["revenue"].add(revenue)
+            for field in BREAKDOWN_FIELDS:
+                value = customer.get(field)
+                hits[field][value] = hits[field].get(value, 0) + 1
+        for name, stats in running.items():
+            metrics[name].append((stratum_size, stats))
+        for field in BREAKDOWN_FIELDS:
+            breakdown_hits[field].append((stratum_size, len(positions), hits[field]))
+
+    estimates = {name: stratified_mean(strata_stats, size) for name, strata_stats in metrics.items()}
+
+    breakdowns = {}
+    breakdown_bounds = {}
+    for field, per_stratum in breakdown_hits.items():
+        values = list(dict.fromkeys(v for _, _, hits in per_stratum for v in hits))
+        shares = {
+            value: stratified_mean([(n, _proportion(hits.get(value, 0), k)) for n, k, hits in per_stratum], size)
+            for value in values
+        }
+        ordered = sorted(values, key=lambda v: shares[v][0], reverse=True)
+        breakdowns[field] = {v: round(shares[v][0] * size) for v in ordered}
+        breakdown_bounds[field] = {v: round(shares[v][1] * size) for v in ordered}
+
+    avg_age, age_margin = estimates["avg_age"]
+    app_share, app_margin = estimates["has_app"]
+    stats = {
+        "count": size,
+        "percentage": round(size / total_customers * 100, 1),
+        "cities": breakdowns["city"],
+        "avg_age": round(avg_age, 1),
+        "gender_split": breakdowns["gender"],
+        "has_app_pct": round(app_share * 100, 1),
+        "approximate": True,
+        "sample_size": len(sampled),
+        "confidence": APPROX_CONFIDENCE,
+        "error_bounds": {
+            "avg_age": round(age_margin, 2),
+            "has_app_pct": round(app_margin * 100, 2),
+            "cities": breakdown_bounds["city"],
+            "gender_split": breakdown_bounds["gender"],
+        },
+    }
+    if totals is not None:
+        tx_mean, tx_margin = estimates["transactions"]
+        revenue_mean, revenue_margin = estimates["revenue"]
+        stats["total_transactions"] = round(tx_mean * size)
+        stats["total_revenue"] = round(revenue_mean * size, 2)
+        stats["error_bounds"]["total_transactions"] = round(tx_margin * size)
+        stats["error_bounds"]["total_revenue"] = round(revenue_margin * size, 2)
+    return stats
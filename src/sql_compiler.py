@@ -0,0 +1,344 @@
+"""
+CDP Demo - SQL Derleyici
+Segment koşullarını SQLite üzerinde tek sorguya (gruplu agregasyonlar) çevirir
+"""
+
+import json
+from dataclasses import replace
+from typing import List, Dict, Any, Optional, Tuple
+
+from aggregates import AggregateField, parse_aggregate, filter_predicates
+from segment_compiler import canonical_json
+from sqlite_store import SQLiteStore, TIMESTAMP_COLUMN, quote
+from time_utils import EvaluationClock, US_PER_SECOND, US_PER_DAY
+
+# Motor operatörü -> SQL operatörü (eşitlikte NULL güvenli IS)
+SQL_OPERATORS = {
+    "eq": "IS", "==": "IS",
+    "ne": "IS NOT", "!=": "IS NOT",
+    "gt": ">", ">": ">",
+    "gte": ">=", ">=": ">=",
+    "lt": "<", "<": "<",
+    "lte": "<=", "<=": "<=",
+}
+
+# Agregasyon işlemi -> SQL (num: sadece sayısal değerler, bkz. aggregates.NUMERIC_OPERATIONS)
+# sum/avg: değerlerin hepsi tam kuruşsa kuruş toplamından, değilse sırayla float toplamı (bkz. exact_sum)
+_ALL_KURUS = "COUNT({num}) = SUM(ROUND({num} * 100) / 100.0 = {num})"
+SQL_AGGREGATES = {
+    "count": "COUNT(*)",
+    "sum": f"CASE WHEN {_ALL_KURUS} THEN SUM(ROUND({{num}} * 100)) / 100.0 ELSE SUM({{num}}) END",
+    "avg": f"CASE WHEN {_ALL_KURUS} THEN SUM(ROUND({{num}} * 100)) / (COUNT({{num}}) * 100.0) ELSE AVG({{num}}) END",
+    "min": "MIN({num})",
+    "max": "MAX({num})",
+    "distinct": "COUNT(DISTINCT {column})",
+}
+
+# Boş kümede 0 olan agregasyonlar (diğerleri NULL: koşul sağlanamaz)
+ZERO_WHEN_EMPTY = ("count", "sum", "distinct")
+
+# SQLite bir sorguda en fazla 64 tablo birleştirir: customers + alt sorgular
+MAX_JOINS = 63
+
+
+def _is_scalar(value: Any) -> bool:
+    """SQLite parametresi olarak Python ile aynı sonucu veren değer"""
+    if isinstance(value, (bool, str)):
+        return True
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    if isinstance(value, float):
+        return value == value  # NaN değil
+    return False
+
+
+class _QueryBuilder:
+    """Tek sorgunun parametreleri, agregasyon join'leri ve koşul ifadeleri"""
+
+    def __init__(self, store: SQLiteStore, clock: EvaluationClock, scoped: bool):
+        self.store = store
+        self.clock = clock
+        self.scoped = scoped
+        self.params: Dict[str, Any] = {}
+        self._param_names: Dict[tuple, str] = {}
+        self.joins: Dict[tuple, _Join] = {}  # (tablo, gün, filtre[, first/last, kolon]) -> alt sorgu
+        self._conditions: Dict[str, str] = {}
+
+    def param(self, value: Any) -> str:
+        """Adlandırılmış parametre (aynı değer tekrar kullanılır)"""
+        key = (type(value), value)
+        name = self._param_names.get(key)
+        if name is None:
+            name = self._param_names[key] = f"p{len(self.params)}"
+            self.params[name] = value
+        return ":" + name
+
+    def segment(self, segment) -> str:
+        """Segmentin eşleşme ifadesi (0/1)"""
+        parts = [self.condition(cond) for cond in segment.conditions]
+        if not parts:
+            return "1" if segment.logic == "AND" else "0"
+        joiner = " AND " if segment.logic == "AND" else " OR "
+        return "(" + joiner.join(parts) + ")"
+
+    def condition(self, condition: Dict) -> str:
+        """Koşulun eşleşme ifadesi; NULL sonuçlar eşleşmez sayılır"""
+        key = canonical_json(condition)
+        expression = self._conditions.get(key)
+        if expression is None:
+            expression = self._conditions[key] = f"COALESCE({self._condition(condition)}, 0)"
+        return expression
+
+    def _condition(self, condition: Dict) -> str:
+        field = condition["field"]
+        operator = condition["operator"]
+        value = condition["value"]
+        customers = self.store.customers
+
+        # Profil alanları
+        if field in customers:
+            return self.compare(f"c.{quote(field)}", customers.kinds[field], operator, value)
+
+        if field == "tx_last_days":
+            # (now - son işlem).days: aşağı yuvarlanan tamsayı bölme; işlem yoksa 9999
+            join = self._join("transactions", condition)
+            age = join.column(f"{self.param(self.clock.now_us)} - MAX({quote(TIMESTAMP_COLUMN)}) * {US_PER_SECOND}")
+            aggregate = (
+                f"COALESCE(CASE WHEN {age} >= 0 THEN {age} / {US_PER_DAY} "
+                f"ELSE -(({US_PER_DAY - 1} - {age}) / {US_PER_DAY}) END, 9999)"
+            )
+            return self.compare_aggregate(aggregate, operator, value)
+
+        spec = parse_aggregate(field)
+        if spec is None:
+            return "0"
+        return self._aggregate_condition(spec, condition, operator, value)
+
+    def _aggregate_condition(self, spec: AggregateField, condition: Dict, operator: str, value: Any) -> str:
+        """count/sum/avg/min/max/distinct: gruplu alt sorgu kolonu; first/last: pencerenin ilk/son kaydı"""
+        table = getattr(self.store, spec.table)
+        operation = spec.operation
+        column = quote(spec.column) if spec.column in table else "NULL"  # Alan yok: değer yok
+
+        if operation in ("first", "last"):
+            join = self._edge_join(spec.table, condition, operation, column)
+            kind = table.kinds.get(spec.column, "value")
+            value_column = f"{join.alias}.v"
+            # Kayıt yok veya değeri None: koşul sağlanamaz
+            return f"CASE WHEN {value_column} IS NULL THEN 0 ELSE {self.compare(value_column, kind, operator, value)} END"
+
+        numeric = f"CASE WHEN typeof({column}) IN ('integer', 'real') THEN {column} END"
+        aggregate = self._join(spec.table, condition).column(
+            SQL_AGGREGATES[operation].format(num=numeric, column=column)
+        )
+        if operation in ZERO_WHEN_EMPTY:
+            aggregate = f"COALESCE({aggregate}, 0)"
+        return self.compare_aggregate(aggregate, operator, value)
+
+    def compare(self, column: str, kind: str, operator: str, expected: Any) -> str:
+        """Kolon değeri ile karşılaştırma; SQL'e çevrilemeyenler cdp_compare ile"""
+        if kind != "json":
+            sql_operator = SQL_OPERATORS.get(operator)
+            if sql_operator is not None and _is_scalar(expected):
+                expression = f"{column} {sql_operator} {self.param(expected)}"
+                if sql_operator in ("IS", "IS NOT"):
+                    return expression
+                # Python'da karşılaştırılamayan tipler (metin > sayı, None > 0) eşleşmez
+                types = "'text'" if isinstance(expected, str) else "'integer', 'real'"
+                return f"(typeof({column}) IN ({types}) AND {expression})"
+            if operator == "in" and isinstance(expected, (list, tuple)) \
+                    and all(_is_scalar(v) for v in expected):
+                if not expected:
+                    return "0"
+                return f"{column} IN ({', '.join(self.param(v) for v in expected)})"
+            if operator == "contains":
+                if kind == "bool":
+                    return "0"
+                if isinstance(expected, str):
+                    return f"(typeof({column}) = 'text' AND instr({column}, {self.param(expected)}) > 0)"
+        return (
+            f"cdp_compare({column}, {self.param(kind)}, {self.param(operator)}, "
+            f"{self.param(json.dumps(expected, ensure_ascii=False))})"
+        )
+
+    def compare_aggregate(self, aggregate: str, operator: str, expected: Any) -> str:
+        """Agregasyon karşılaştırması (NULL: koşul sağlanamaz)"""
+        return f"CASE WHEN {aggregate} IS NULL THEN 0 ELSE {self.compare(aggregate, 'value', operator, expected)} END"
+
+    def _filter(self, table, field: str, operator: str, value: Any) -> str:
+        """record.get(field) <operatör> value filtresi (olmayan alan None)"""
+        if field not in table:
+            return "1" if self.store.compare(None, operator, value) else "0"
+        return self.compare(quote(field), table.kinds[field], operator, value)
+
+    def _scope(self) -> str:
+        return "customer_id IN (SELECT customer_id FROM scope)"
+
+    def _where(self, table_name: str, condition: Dict) -> List[str]:
+        """Pencere + filtre (filter, eventte ayrıca event_type) koşulları"""
+        where = []
+        table = self.store.transactions if table_name == "transactions" else self.store.events
+        if "days" in condition:
+            where.append(f"{quote(TIMESTAMP_COLUMN)} >= {self.param(self.clock.cutoff(condition['days']))}")
+        if table_name == "events" and "event_type" in condition:
+            where.append(self._filter(table, "event_type", "==", condition["event_type"]))
+        for predicate in filter_predicates(condition.get("filter")):
+            where.append(self._filter(table, predicate["field"], predicate["operator"], predicate["value"]))
+        if self.scoped:
+            where.append(self._scope())
+        return where
+
+    def _scope_key(self, table_name: str, condition: Dict) -> tuple:
+        if table_name == "transactions":
+            return ("tx", condition.get("days"), canonical_json(filter_predicates(condition.get("filter"))))
+        return ("event", condition.get("days"), canonical_json(condition.get("event_type")),
+                canonical_json(filter_predicates(condition.get("filter"))))
+
+    def _join(self, table_name: str, condition: Dict) -> "_Join":
+        """(gün, filtre) başına bir GROUP BY customer_id alt sorgusu; agregasyonlar kolon olarak eklenir"""
+        key = self._scope_key(table_name, condition)
+        if key not in self.joins:
+            alias = f"{table_name[0]}{len(self.joins)}"
+            self.joins[key] = _Join(alias, table_name, self._where(table_name, condition))
+        return self.joins[key]
+
+    def _edge_join(self, table_name: str, condition: Dict, operation: str, column: str) -> "_Join":
+        """Müşterinin penceredeki ilk/son kaydının kolon değeri (zaman, sonra dosya sırası)"""
+        key = self._scope_key(table_name, condition) + (operation, column)
+        if key not in self.joins:
+            alias = f"{table_name[0]}{len(self.joins)}"
+            direction = "ASC" if operation == "first" else "DESC"
+            self.joins[key] = _Join(alias, table_name, self._where(table_name, condition),
+                                    edge=(column, direction))
+        return self.joins[key]
+
+
+class _Join:
+    """Müşteri başına tek satır üreten LEFT JOIN alt sorgusu"""
+
+    def __init__(self, alias: str, table: str, where: List[str], edge: Optional[Tuple[str, str]] = None):
+        self.alias = alias
+        self.table = table
+        self.where = " AND ".join(where) or "1"
+        self.edge = edge
+        self.columns: Dict[str, str] = {}  # SQL agregasyonu -> kolon adı
+
+    def column(self, aggregate: str) -> str:
+        """Agregasyonu alt sorguya ekle (aynısı tekrar kullanılır) -> alias.kolon"""
+        if aggregate not in self.columns:
+            self.columns[aggregate] = f"a{len(self.columns)}"
+        return f"{self.alias}.{self.columns[aggregate]}"
+
+    def sql(self) -> str:
+        if self.edge is not None:
+            column, direction = self.edge
+            subquery = (
+                f"SELECT customer_id, v FROM (SELECT customer_id, {column} AS v, ROW_NUMBER() OVER ("
+                f"PARTITION BY customer_id ORDER BY {quote(TIMESTAMP_COLUMN)} {direction}, rowid {direction}) AS rn "
+                f"FROM {self.table} WHERE {self.where}) WHERE rn = 1"
+            )
+        else:
+            columns = "".join(f", {aggregate} AS {name}" for aggregate, name in self.columns.items())
+            subquery = f"SELECT customer_id{columns} FROM {self.table} WHERE {self.where} GROUP BY customer_id"
+        return f"LEFT JOIN ({subquery}) {self.alias} ON {self.alias}.customer_id = c.customer_id"
+
+
+class SQLCompiler:
+    """Segmentleri SQLite sorgusuna derler
+
+    Her (gün penceresi, filtre) için tek bir GROUP BY customer_id alt
+    sorgusu kurulur ve segmentler arasında paylaşılır; profil koşulları
+    doğrudan müşteri kolonları üzerinde değerlendirilir. Birden çok segment
+    tek sorguda, segment başına bir eşleşme kolonu olarak çalışır.
+    """
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    def compile_many(self, segments: List[Any], clock: Optional[EvaluationClock] = None,
+                     rows: Optional[List[int]] = None) -> Tuple[str, Dict[str, Any]]:
+        """SELECT satır, m0, m1, ... sorgusu ve parametreleri (rows: sadece bu müşteri satırları)"""
+        builder = _QueryBuilder(self.store, clock or EvaluationClock(), scoped=rows is not None)
+        matches = [builder.segment(segment) for segment in segments]
+
+        sql = ""
+        where = ""
+        if rows is not None:
+            rows_param = builder.param(json.dumps([row + 1 for row in rows]))
+            sql = f"WITH scope AS (SELECT rowid AS row_id, customer_id FROM customers WHERE rowid IN (SELECT value FROM json_each({rows_param}))) "
+            where = " WHERE c.rowid IN (SELECT row_id FROM scope)"
+
+        columns = ", ".join(f"{match} AS m{i}" for i, match in enumerate(matches))
+        joins = " ".join(join.sql() for join in builder.joins.values())
+        inner = f"SELECT c.rowid - 1 AS row_number, {columns} FROM customers c {joins}{where}"
+        any_match = " OR ".join(f"m{i}" for i in range(len(matches))) or "0"
+        sql += f"SELECT * FROM ({inner}) WHERE {any_match} ORDER BY row_number"
+        return sql, builder.params
+
+    def compile(self, segment, clock: Optional[EvaluationClock] = None) -> Tuple[str, Dict[str, Any]]:
+        """Tek segmentin sorgusu"""
+        return self.compile_many([segment], clock)
+
+    def evaluate_many(self, segments: List[Any], clock: Optional[EvaluationClock] = None,
+                      rows: Optional[List[int]] = None) -> List[List[int]]:
+        """Segment başına eşleşen müşteri satır numaraları (join sınırına kadar tek sorgu)"""
+        clock = clock or EvaluationClock()
+        results = [[] for _ in segments]
+        for batch in self._batches(segments, clock):
+            if len(batch) == 1:
+                parts = self._condition_parts(segments[batch[0]].conditions, clock)
+                if len(parts) > 1:
+                    results[batch[0]] = self._evaluate_parts(segments[batch[0]], parts, clock, rows)
+                    continue
+            sql, params = self.compile_many([segments[i] for i in batch], clock, rows)
+            for record in self.store.execute(sql, params):
+                row = record[0]
+                for i, match in zip(batch, record[1:]):
+                    if match:
+                        results[i].append(row)
+        return results
+
+    def _batches(self, segments: List[Any], clock: EvaluationClock) -> List[List[int]]:
+        """Segment sıraları; farklı pencere/filtre sayısı MAX_JOINS'i aşarsa birden çok sorguya bölünür"""
+        batches = []
+        builder = None
+        for i, segment in enumerate(segments):
+            if builder is not None:
+                builder.segment(segment)
+                if len(builder.joins) <= MAX_JOINS:
+                    batches[-1].append(i)
+                    continue
+            builder = _QueryBuilder(self.store, clock, scoped=False)
+            builder.segment(segment)
+            batches.append([i])
+        return batches
+
+    def _condition_parts(self, conditions: List[Dict], clock: EvaluationClock) -> List[List[Dict]]:
+        """Koşul grupları; tek segmentin farklı pencere/filtre sayısı MAX_JOINS'i aşarsa bölünür"""
+        parts = []
+        builder = None
+        for condition in conditions:
+            if builder is not None:
+                builder.condition(condition)
+                if len(builder.joins) <= MAX_JOINS:
+                    parts[-1].append(condition)
+                    continue
+            builder = _QueryBuilder(self.store, clock, scoped=False)
+            builder.condition(condition)
+            parts.append([condition])
+        return parts
+
+    def _evaluate_parts(self, segment, parts: List[List[Dict]], clock: EvaluationClock,
+                        rows: Optional[List[int]]) -> List[int]:
+        """Tek sorguya sığmayan segment: her koşul grubu ayrı sorgu, sonuçlar AND/OR ile birleşir"""
+        matched = None
+        for part in parts:
+            sql, params = self.compile_many([replace(segment, conditions=part)], clock, rows)
+            part_rows = {record[0] for record in self.store.execute(sql, params)}
+            if matched is None:
+                matched = part_rows
+            elif segment.logic == "AND":
+                matched &= part_rows
+            else:
+                matched |= part_rows
+        return sorted(matched)
@@ -0,0 +1,310 @@
+"""
+CDP Demo - SQLite Deposu
+data/*.json(l) verisini SQLite veritabanına aktarır; tablolar diskten okunur
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import List, Dict, Any, Callable, Iterable, Optional, Union
+
+from customer_keys import duplicate_id_error
+from record_stream import dataset_path, iter_records
+from segment_cache import data_version
+from time_utils import parse_timestamp
+
+SQLITE_FILENAME = "cdp.sqlite"
+TABLES = ("customers", "transactions", "events")
+
+# Zaman damgasının epoch saniyesi olarak tutulduğu ek kolon
+TIMESTAMP_COLUMN = "_ts"
+
+# Tablo başına indexler (kolon grupları)
+INDEXES = {
+    "customers": [("customer_id",)],
+    "transactions": [("customer_id", TIMESTAMP_COLUMN), (TIMESTAMP_COLUMN,)],
+    "events": [("customer_id", TIMESTAMP_COLUMN), ("event_type", TIMESTAMP_COLUMN), (TIMESTAMP_COLUMN,)],
+}
+
+# Tekil olması gereken kolonlar (UNIQUE index; tekrarlanan müşteri ID'si aktarımı durdurur)
+UNIQUE_INDEXES = {"customers": ("customer_id",)}
+
+# Kaydı olmayan tablonun kolonları (sorgular müşteri ve zaman kolonunu kullanır)
+EMPTY_TABLE_COLUMNS = {
+    "customers": ("customer_id",),
+    "transactions": ("customer_id", "timestamp"),
+    "events": ("customer_id", "timestamp", "event_type"),
+}
+
+# Bu kadar satırda bir toplu insert
+IMPORT_BATCH = 10_000
+
+
+def quote(name: str) -> str:
+    """SQL tanımlayıcısı olarak kolon/tablo adı"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _column_kind(types: set) -> str:
+    """Kolonda görülen değer tiplerinden tür: bool (0/1 saklanır), json (liste/dict) veya value (olduğu gibi)"""
+    types = types - {type(None)}
+    if types == {bool}:
+        return "bool"
+    if types & {list, dict, tuple}:
+        return "json"
+    return "value"
+
+
+def encode_value(value: Any, kind: str) -> Any:
+    """Python değeri -> SQLite değeri"""
+    if value is None:
+        return None
+    if kind == "json":
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def decode_value(value: Any, kind: str) -> Any:
+    """SQLite değeri -> Python değeri"""
+    if value is None:
+        return None
+    if kind == "bool":
+        return bool(value)
+    if kind == "json":
+        return json.loads(value)
+    return value
+
+
+def import_json(data_dir: str = "data", db_path: Optional[str] = None) -> Path:
+    """data_dir altındaki customers/transactions/events JSON (veya JSON Lines) dosyalarını SQLite'a aktar"""
+    data_dir = Path(data_dir)
+    db_path = Path(db_path) if db_path else data_dir / SQLITE_FILENAME
+    version = data_version(dataset_path(data_dir, table) for table in TABLES)
+
+    # Yarım kalan aktarım mevcut veritabanını bozmasın: geçici dosyaya yaz, sonra taşı
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("CREATE TABLE _meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE _columns (table_name TEXT, name TEXT, kind TEXT, position INTEGER)")
+
+    try:
+        for table in TABLES:
+            _import_table(conn, table, dataset_path(data_dir, table))
+
+        conn.execute("INSERT INTO _meta VALUES ('data_version', ?)", (version,))
+        conn.commit()
+        conn.execute("ANALYZE")
+    except Exception:
+        conn.close()
+        tmp_path.unlink()
+        raise
+    conn.close()
+
+    tmp_path.replace(db_path)
+    return db_path
+
+
+def _scan_columns(path: Path) -> Dict[str, set]:
+    """İlk geçiş: kolon adı -> görülen değer tipleri (sıra: ilk kayıt + sonradan görülen alanlar)"""
+    types: Dict[str, set] = {}
+    for record in iter_records(path):
+        for name, value in record.items():
+            seen = types.get(name)
+            if seen is None:
+                seen = types[name] = set()
+            seen.add(type(value))
+    return types
+
+
+def _import_table(conn: sqlite3.Connection, table: str, path: Path):
+    """Kayıtları tabloya akış halinde yaz: ilk geçişte kolon türleri, ikinci geçişte IMPORT_BATCH'lik insert'ler
+
+    Tablo hiçbir zaman tamamen belleğe alınmaz (JSON dizisi dosyaları
+    okunurken json.load yine tüm diziyi çözer; JSON Lines satır satır okunur).
+    """
+    types = _scan_columns(path)
+    if not types:
+        # Boş tablo: sorguların kullandığı kolonlar yine de olsun
+        types = {name: set() for name in EMPTY_TABLE_COLUMNS[table]}
+    names = list(types)
+    kinds = {name: _column_kind(types[name]) for name in names}
+    has_timestamp = "timestamp" in kinds and kinds["timestamp"] == "value"
+
+    columns = [quote(name) for name in names]
+    if has_timestamp:
+        columns.append(quote(TIMESTAMP_COLUMN) + " INTEGER")
+    conn.execute(f"CREATE TABLE {quote(table)} ({', '.join(columns)})")
+    conn.executemany(
+        "INSERT INTO _columns VALUES (?, ?, ?, ?)",
+        [(table, name, kinds[name], i) for i, name in enumerate(names)],
+    )
+
+    placeholders = ", ".join("?" for _ in range(len(names) + has_timestamp))
+    insert = f"INSERT INTO {quote(table)} VALUES ({placeholders})"
+    batch = []
+    for record in iter_records(path):
+        row = [encode_value(record.get(name), kinds[name]) for name in names]
+        if has_timestamp:
+            ts = record.get("timestamp")
+            row.append(parse_timestamp(ts) if isinstance(ts, str) else None)
+        batch.append(row)
+        if len(batch) >= IMPORT_BATCH:
+            conn.executemany(insert, batch)
+            batch = []
+    if batch:
+        conn.executemany(insert, batch)
+
+    for i, group in enumerate(INDEXES.get(table, [])):
+        if all(column in kinds or column == TIMESTAMP_COLUMN and has_timestamp for column in group):
+            unique = "UNIQUE " if UNIQUE_INDEXES.get(table) == group else ""
+            try:
+                conn.execute(
+                    f"CREATE {unique}INDEX {quote(f'idx_{table}_{i}')} ON {quote(table)} ({', '.join(map(quote, group))})"
+                )
+            except sqlite3.IntegrityError:
+                columns = ", ".join(map(quote, group))
+                duplicate = conn.execute(
+                    f"SELECT {columns} FROM {quote(table)} GROUP BY {columns} HAVING COUNT(*) > 1 LIMIT 1"
+                ).fetchone()
+                raise duplicate_id_error(duplicate[0])
+
+
+class SQLiteTable:
+    """SQLite tablosu üzerinde salt okunur, liste benzeri görünüm; satırlar dict olarak üretilir
+
+    Satır i, rowid = i + 1'dir (aktarım sırası = dosya sırası).
+    """
+
+    def __init__(self, conn: sqlite3.Connection, name: str, kinds: Dict[str, str]):
+        self.conn = conn
+        self.name = name
+        self.kinds = kinds
+        self._length: Optional[int] = None
+        self._select = ", ".join(quote(column) for column in kinds)
+
+    def __len__(self) -> int:
+        if self._length is None:
+            self._length = self.conn.execute(f"SELECT COUNT(*) FROM {quote(self.name)}").fetchone()[0]
+        return self._length
+
+    def __iter__(self):
+        cursor = self.conn.execute(f"SELECT {self._select} FROM {quote(self.name)} ORDER BY rowid")
+        for row in cursor:
+            yield self._decode(row)
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.rows([index])[0]
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.kinds
+
+    def rows(self, indices: Iterable[int]) -> List[Dict]:
+        """Verilen satırları (istenen sırada) dict olarak üret"""
+        indices = list(indices)
+        cursor = self.conn.execute(
+            f"SELECT rowid, {self._select} FROM {quote(self.name)} "
+            f"WHERE rowid IN (SELECT value FROM json_each(?))",
+            (json.dumps([i + 1 for i in indices]),),
+        )
+        by_rowid = {row[0]: self._decode(row[1:]) for row in cursor}
+        return [dict(by_rowid[i + 1]) for i in indices]
+
+    def _decode(self, row: tuple) -> Dict:
+        return {name: decode_value(value, kind) for (name, kind), value in zip(self.kinds.items(), row)}
+
+
+class SQLiteStore:
+    """SQLite veritabanı bağlantısı + tablo görünümleri
+
+    compare: motorun karşılaştırma fonksiyonu; SQL'e doğrudan çevrilemeyen
+    koşullar cdp_compare(değer, tür, operatör, beklenen_json) fonksiyonuyla
+    Python'da değerlendirilir.
+    """
+
+    def __init__(self, db_path: Path, compare: Callable[[Any, str, Any], bool]):
+        self.path = Path(db_path)
+        # Streamlit scriptleri farklı thread'lerde çalıştırabilir (bağlantı salt okunur kullanılır)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.compare = compare
+        self.conn.create_function("cdp_compare", 4, self._sql_compare, deterministic=True)
+
+        row = self.conn.execute("SELECT value FROM _meta WHERE key = 'data_version'").fetchone()
+        self.data_version = row[0] if row else None
+
+        kinds = {table: {} for table in TABLES}
+        for table, name, kind in self.conn.execute(
+            "SELECT table_name, name, kind FROM _columns ORDER BY table_name, position"
+        ):
+            kinds[table][name] = kind
+        self.customers = SQLiteTable(self.conn, "customers", kinds["customers"])
+        self.transactions = SQLiteTable(self.conn, "transactions", kinds["transactions"])
+        self.events = SQLiteTable(self.conn, "events", kinds["events"])
+
+    @classmethod
+    def open(cls, data_dir: str, compare: Callable[[Any, str, Any], bool]) -> "SQLiteStore":
+        """data_dir/cdp.sqlite'ı aç; yoksa veya JSON dosyaları değişmişse yeniden aktar"""
+        data_dir = Path(data_dir)
+        db_path = data_dir / SQLITE_FILENAME
+        json_paths = [dataset_path(data_dir, table) for table in TABLES]
+
+        if all(path.exists() for path in json_paths):
+            if not db_path.exists() or cls._stored_version(db_path) != data_version(json_paths):
+                import_json(data_dir, db_path)
+        elif not db_path.exists():
+            raise FileNotFoundError(f"Veri bulunamadı: {data_dir}")
+
+        return cls(db_path, compare)
+
+    @staticmethod
+    def _stored_version(db_path: Path) -> Optional[str]:
+        try:
+            with sqlite3.connect(db_path) as conn:
+                row = conn.execute("SELECT value FROM _meta WHERE key = 'data_version'").fetchone()
+        except sqlite3.DatabaseError:
+            return None
+        return row[0] if row else None
+
+    def _sql_compare(self, actual: Any, kind: str, operator: str, expected: str) -> bool:
+        return bool(self.compare(decode_value(actual, kind), operator, json.loads(expected)))
+
+    def execute(self, sql: str, params: Union[Dict[str, Any], Iterable[Any]] = ()) -> sqlite3.Cursor:
+        return self.conn.execute(sql, params if isinstance(params, dict) else list(params))
+
+    def transaction_totals(self, customer_ids: Iterable[str]) -> tuple:
+        """Müşterilerin toplam işlem sayısı ve geliri"""
+        count, revenue = self.conn.execute(
+            "SELECT COUNT(*), SUM(total_amount) FROM transactions "
+            "WHERE customer_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(customer_ids)),),
+        ).fetchone()
+        return count, revenue if count else 0
+
+    def customer_totals(self, customer_ids: List[str]) -> List[tuple]:
+        """Müşteri başına (işlem sayısı, gelir), verilen sırada"""
+        totals = dict.fromkeys(customer_ids, (0, 0))
+        cursor = self.conn.execute(
+            "SELECT customer_id, COUNT(*), SUM(total_amount) FROM transactions "
+            "WHERE customer_id IN (SELECT value FROM json_each(?)) GROUP BY customer_id",
+            (json.dumps(list(totals)),),
+        )
+        for cid, count, revenue in cursor:
+            totals[cid] = (count, revenue)
+        return [totals[cid] for cid in customer_ids]
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "data"
+    path = import_json(source)
+    print(f"✅ SQLite veritabanı oluşturuldu: {path}")
@@ -0,0 +1,54 @@
+"""
+CDP Demo - Zaman Yardımcıları
+'YYYY-MM-DD HH:MM:SS' zaman damgaları ile epoch saniyeleri arasında dönüşüm
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+EPOCH = datetime(1970, 1, 1)
+US_PER_SECOND = 1_000_000
+US_PER_DAY = 86_400 * US_PER_SECOND
+
+
+def to_epoch_us(value: datetime) -> int:
+    """Naive datetime -> epoch mikrosaniyesi (zaman dilimi dönüşümü yok, kayıpsız)"""
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * US_PER_SECOND + delta.microseconds
+
+
+def parse_timestamp(value: str) -> int:
+    """'YYYY-MM-DD HH:MM:SS' -> epoch saniyesi"""
+    return to_epoch_us(datetime.fromisoformat(value)) // US_PER_SECOND
+
+
+def cutoff_epoch(now: datetime, days: float) -> int:
+    """Son N gün penceresinin başlangıcı; ts >= cutoff karşılaştırması için yukarı yuvarlanır"""
+    return -(-to_epoch_us(now - timedelta(days=days)) // US_PER_SECOND)
+
+
+def days_since_epoch(now: datetime, timestamp: int) -> int:
+    """(now - timestamp).days ile aynı sonuç"""
+    return (to_epoch_us(now) - timestamp * US_PER_SECOND) // US_PER_DAY
+
+
+class EvaluationClock:
+    """Bir çalıştırma boyunca sabit değerlendirme anı; pencere başlangıçları gün değeri başına bir kez hesaplanır"""
+
+    __slots__ = ("now", "now_us", "_cutoffs")
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now or datetime.now()
+        self.now_us = to_epoch_us(self.now)
+        self._cutoffs = {}
+
+    def cutoff(self, days: float) -> int:
+        """cutoff_epoch(now, days), önbellekli"""
+        cutoff = self._cutoffs.get(days)
+        if cutoff is None:
+            cutoff = self._cutoffs[days] = cutoff_epoch(self.now, days)
+        return cutoff
+
+    def days_since(self, timestamp: int) -> int:
+        """days_since_epoch(now, timestamp)"""
+        return (self.now_us - timestamp * US_PER_SECOND) // US_PER_DAY
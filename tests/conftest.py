@@ -0,0 +1,104 @@
+"""
+CDP Demo - Test Ortak Yardımcıları
+src/ path ayarı ve geçici veri klasörü oluşturan fixture'lar
+"""
+
+import random
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# src klasörünü path'e ekle
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from generate_mock_data import generate_customers, generate_transactions, generate_digital_events, save_data
+
+MOCK_SEED = 7
+MOCK_CUSTOMERS = 400
+MOCK_DAYS = 120
+
+
+def make_customer(customer_id: str, **fields) -> dict:
+    """Elle kurulan senaryolar için müşteri kaydı"""
+    customer = {
+        "customer_id": customer_id,
+        "city": "İstanbul",
+        "age": 35,
+        "gender": "F",
+        "segment": "regular",
+        "has_app": False,
+        "email_opted_in": True,
+    }
+    customer.update(fields)
+    return customer
+
+
+def make_transaction(customer_id: str, timestamp: str, total_amount: float, **fields) -> dict:
+    """Elle kurulan senaryolar için işlem kaydı"""
+    transaction = {
+        "transaction_id": f"TX{customer_id}{timestamp}",
+        "customer_id": customer_id,
+        "timestamp": timestamp,
+        "fuel_type": "Benzin",
+        "fuel_liters": 40,
+        "is_premium_fuel": False,
+        "market_items": [],
+        "market_amount": 0,
+        "total_amount": total_amount,
+        "payment_method": "card",
+    }
+    transaction.update(fields)
+    return transaction
+
+
+def make_event(customer_id: str, timestamp: str, event_type: str = "app_open", **fields) -> dict:
+    """Elle kurulan senaryolar için event kaydı"""
+    event = {
+        "event_id": f"EV{customer_id}{timestamp}",
+        "customer_id": customer_id,
+        "timestamp": timestamp,
+        "event_type": event_type,
+        "platform": "app",
+        "device": "mobile",
+    }
+    event.update(fields)
+    return event
+
+
+@pytest.fixture
+def write_dataset(tmp_path):
+    """(customers, transactions, events, data_format) -> veri klasörü"""
+    def write(customers, transactions, events=(), data_format="json", name="data"):
+        directory = tmp_path / name
+        save_data(customers, sorted(transactions, key=lambda x: x["timestamp"]),
+                  sorted(events, key=lambda x: x["timestamp"]), str(directory), data_format)
+        return directory
+    return write
+
+
+@pytest.fixture(scope="session")
+def mock_source(tmp_path_factory):
+    """Seed'li mock veri (oturumda bir kez) -> (klasör, değerlendirme anı)"""
+    state = random.getstate()
+    random.seed(MOCK_SEED)
+    try:
+        customers = generate_customers(MOCK_CUSTOMERS)
+        transactions = generate_transactions(customers, days=MOCK_DAYS)
+        events = generate_digital_events(customers, days=MOCK_DAYS)
+    finally:
+        random.setstate(state)
+    directory = tmp_path_factory.mktemp("mock") / "data"
+    save_data(customers, transactions, events, str(directory))
+    return directory, datetime.now().replace(microsecond=0)
+
+
+@pytest.fixture
+def mock_data(mock_source, tmp_path):
+    """Testin kendi kopyası (sqlite / snapshot dosyaları testler arasında paylaşılmaz) -> (klasör, an)"""
+    source, as_of = mock_source
+    directory = tmp_path / "mock"
+    shutil.copytree(source, directory)
+    return directory, as_of
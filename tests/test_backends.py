@@ -0,0 +1,310 @@
+"""
+CDP Demo - Backend Eşdeğerlik Testleri
+Her backend ve değerlendirme yolu, kayıt listeleri üzerinde düz bir referans değerlendirmeyle aynı üyeleri döndürmeli
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from aggregates import parse_aggregate, filter_predicates, aggregate_records
+from record_stream import dataset_path, iter_records
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, SegmentDefinition, PREDEFINED_SEGMENTS
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# (backend, workers, vectorized); profil koşullu segmentler her yolda bitmap'ten çözülür
+PATHS = {
+    "memory-row": ("memory", 1, False),
+    "memory-vectorized": ("memory", 1, True),
+    "compact-row": ("compact", 1, False),
+    "compact-vectorized": ("compact", 1, True),
+    "columnar-row": ("columnar", 1, False),
+    "columnar-vectorized": ("columnar", 1, True),
+    "sqlite": ("sqlite", 1, None),
+    "parallel": ("memory", 2, True),
+}
+
+# Bitmap index'ten (satır taramadan) çözülen profil segmentleri
+PROFILE_SEGMENTS = {
+    "city_or_app": SegmentDefinition(
+        name="Şehir veya App",
+        description="",
+        conditions=[
+            {"field": "city", "operator": "in", "value": ["Ankara", "İzmir"]},
+            {"field": "has_app", "operator": "==", "value": True},
+        ],
+        logic="OR",
+    ),
+    "premium_opted_in": SegmentDefinition(
+        name="Premium Email",
+        description="",
+        conditions=[
+            {"field": "segment", "operator": "==", "value": "premium"},
+            {"field": "email_opted_in", "operator": "!=", "value": False},
+        ],
+    ),
+}
+
+# tx_<işlem>_<kolon> / event_<işlem>_<kolon> agregasyonları (pencereli ve penceresiz)
+AGGREGATE_SEGMENTS = {
+    "fuel_liters": SegmentDefinition(
+        name="Litre",
+        description="",
+        conditions=[{"field": "tx_sum_fuel_liters", "operator": ">=", "value": 800, "days": 60}],
+    ),
+    "avg_liters": SegmentDefinition(
+        name="Ortalama Litre",
+        description="",
+        conditions=[{"field": "tx_avg_fuel_liters", "operator": ">", "value": 41}],
+    ),
+    "min_total": SegmentDefinition(
+        name="En Küçük Tutar",
+        description="",
+        conditions=[{"field": "tx_min_total_amount", "operator": "<", "value": 1500, "days": 30}],
+    ),
+    "max_market": SegmentDefinition(
+        name="En Büyük Market",
+        description="",
+        conditions=[{"field": "tx_max_market_amount", "operator": ">=", "value": 200}],
+    ),
+    "stations": SegmentDefinition(
+        name="İstasyon Çeşitliliği",
+        description="",
+        conditions=[{"field": "tx_distinct_station_id", "operator": ">=", "value": 15, "days": 90}],
+    ),
+    "first_or_last_fuel": SegmentDefinition(
+        name="İlk / Son Yakıt",
+        description="",
+        conditions=[
+            {"field": "tx_first_fuel_type", "operator": "==", "value": "Premium 97"},
+            {"field": "tx_last_fuel_type", "operator": "==", "value": "Eurodizel"},
+        ],
+        logic="OR",
+    ),
+    "event_variety": SegmentDefinition(
+        name="Event Çeşitliliği",
+        description="",
+        conditions=[
+            {"field": "event_count", "operator": ">=", "value": 10, "days": 45},
+            {"field": "event_distinct_event_type", "operator": ">=", "value": 5},
+        ],
+    ),
+    "app_opens": SegmentDefinition(
+        name="App Açılışı",
+        description="",
+        conditions=[{"field": "event_count", "operator": ">=", "value": 3, "days": 30, "event_type": "app_open"}],
+    ),
+    "last_event": SegmentDefinition(
+        name="Son Event",
+        description="",
+        conditions=[{
+            "field": "event_last_event_type", "operator": "in",
+            "value": ["app_open", "app_loyalty_check", "page_view_homepage"],
+        }],
+    ),
+    "loyalty_points": SegmentDefinition(
+        name="Sadakat Puanı",
+        description="",
+        conditions=[{"field": "tx_sum_loyalty_points_earned", "operator": ">", "value": 100}],
+    ),
+}
+
+# Operatörlü kayıt filtreleri (tek koşul, liste, contains, in, kayıtta olmayan alan)
+FILTER_SEGMENTS = {
+    "premium_fuel": SegmentDefinition(
+        name="Premium Yakıt",
+        description="",
+        conditions=[{
+            "field": "tx_count", "operator": ">=", "value": 5, "days": 60,
+            "filter": {"field": "is_premium_fuel", "value": True},
+        }],
+    ),
+    "market_by_card": SegmentDefinition(
+        name="Kartla Market",
+        description="",
+        conditions=[{
+            "field": "tx_sum_market_amount", "operator": ">=", "value": 300, "days": 90,
+            "filter": [
+                {"field": "market_amount", "operator": ">", "value": 0},
+                {"field": "payment_method", "operator": "!=", "value": "cash"},
+            ],
+        }],
+    ),
+    "latte": SegmentDefinition(
+        name="Latte",
+        description="",
+        conditions=[{
+            "field": "tx_count", "operator": ">=", "value": 2,
+            "filter": {"field": "market_items", "operator": "contains", "value": "Latte"},
+        }],
+    ),
+    "diesel_liters": SegmentDefinition(
+        name="Dizel Litre",
+        description="",
+        conditions=[{
+            "field": "tx_avg_fuel_liters", "operator": ">=", "value": 42,
+            "filter": {"field": "fuel_type", "operator": "in", "value": ["Eurodizel", "Premium Dizel"]},
+        }],
+    ),
+    "recent_small": SegmentDefinition(
+        name="Yakın Küçük İşlem",
+        description="",
+        conditions=[{
+            "field": "tx_last_days", "operator": "<=", "value": 10,
+            "filter": {"field": "total_amount", "operator": "<", "value": 1200},
+        }],
+    ),
+    "missing_field": SegmentDefinition(
+        name="Kuponsuz",
+        description="",
+        conditions=[
+            {"field": "tx_count", "operator": ">=", "value": 1, "filter": {"field": "coupon", "value": None}},
+            {"field": "tx_count", "operator": ">=", "value": 30},
+        ],
+    ),
+    "web_events": SegmentDefinition(
+        name="Web Eventleri",
+        description="",
+        conditions=[{
+            "field": "event_distinct_event_type", "operator": ">=", "value": 3, "days": 60,
+            "filter": {"field": "platform", "operator": "in", "value": ["web", "email"]},
+        }],
+    ),
+    "campaign_views": SegmentDefinition(
+        name="Kampanya Görüntüleme",
+        description="",
+        conditions=[{
+            "field": "event_count", "operator": ">=", "value": 2, "event_type": "page_view_campaigns",
+            "filter": {"field": "platform", "operator": "!=", "value": "push"},
+        }],
+    ),
+    "loyalty_points": SegmentDefinition(
+        name="Puan Kazananlar",
+        description="",
+        conditions=[{
+            "field": "tx_max_loyalty_points_earned", "operator": "<=", "value": 25,
+            "filter": {"field": "loyalty_points_earned", "operator": ">=", "value": 1},
+        }],
+    ),
+}
+
+SEGMENT_SETS = {"predefined": PREDEFINED_SEGMENTS, "aggregates": AGGREGATE_SEGMENTS, "filters": FILTER_SEGMENTS}
+
+
+def load_dataset(data_dir):
+    """Müşteriler ve müşteri başına zamana göre sıralı işlem/eventler (aynı saniyede dosya sırası)"""
+    customers = list(iter_records(dataset_path(data_dir, "customers")))
+    history = {}
+    for table in ("transactions", "events"):
+        grouped = {}
+        for record in iter_records(dataset_path(data_dir, table)):
+            grouped.setdefault(record["customer_id"], []).append(record)
+        for records in grouped.values():
+            records.sort(key=lambda r: r["timestamp"])
+        history[table] = grouped
+    return customers, history
+
+
+def reference_value(customer, history, condition, as_of):
+    """Koşul alanının değeri: indexsiz, önbelleksiz, kayıt listeleri üzerinde"""
+    field = condition["field"]
+    spec = parse_aggregate(field)
+    if spec is None and field != "tx_last_days":
+        return customer.get(field)
+
+    table = spec.table if spec is not None else "transactions"
+    records = history[table].get(customer["customer_id"], [])
+    times = [datetime.strptime(r["timestamp"], TIMESTAMP_FORMAT) for r in records]
+    if "days" in condition:
+        cutoff = as_of - timedelta(days=condition["days"])
+        records = [r for r, t in zip(records, times) if t >= cutoff]
+    if table == "events" and "event_type" in condition:
+        records = [r for r in records if r.get("event_type") == condition["event_type"]]
+    predicates = filter_predicates(condition.get("filter"))
+    records = [
+        r for r in records
+        if all(SegmentEngine._compare(r.get(p["field"]), p["operator"], p["value"]) for p in predicates)
+    ]
+
+    if spec is None:
+        if not records:
+            return 9999
+        return (as_of - datetime.strptime(records[-1]["timestamp"], TIMESTAMP_FORMAT)).days
+    return aggregate_records(spec, records)
+
+
+def reference_members(dataset, segment, as_of):
+    """Segmente giren müşteri ID'leri (dosya sırasında)"""
+    customers, history = dataset
+    combine = all if segment.logic == "AND" else any
+    return [
+        customer["customer_id"] for customer in customers
+        if combine(
+            SegmentEngine._compare(reference_value(customer, history, c, as_of), c["operator"], c["value"])
+            for c in segment.conditions
+        )
+    ]
+
+
+def member_ids(results):
+    return [c["customer_id"] for c in results]
+
+
+@pytest.fixture
+def dataset(mock_data):
+    data_dir, as_of = mock_data
+    return data_dir, as_of, load_dataset(data_dir)
+
+
+def run_path(data_dir, path, segments, as_of):
+    backend, workers, vectorized = PATHS[path]
+    engine = SegmentEngine(str(data_dir), backend=backend, workers=workers, cache=SegmentCache(0))
+    try:
+        results = engine.run_segments(segments, vectorized=vectorized, as_of=as_of)
+    finally:
+        engine.close()
+    return {key: member_ids(members) for key, members in results.items()}
+
+
+def assert_matches_reference(dataset, path, segments):
+    data_dir, as_of, records = dataset
+    expected = {key: reference_members(records, segment, as_of) for key, segment in segments.items()}
+    assert run_path(data_dir, path, segments, as_of) == expected
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_predefined_segments(dataset, path):
+    assert_matches_reference(dataset, path, PREDEFINED_SEGMENTS)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_aggregate_segments(dataset, path):
+    assert_matches_reference(dataset, path, AGGREGATE_SEGMENTS)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_filter_segments(dataset, path):
+    assert_matches_reference(dataset, path, FILTER_SEGMENTS)
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_profile_segments(dataset, path):
+    assert_matches_reference(dataset, path, PROFILE_SEGMENTS)
+
+
+def test_profile_segments_resolve_from_bitmaps(mock_data):
+    data_dir, _ = mock_data
+    engine = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    for segment in PROFILE_SEGMENTS.values():
+        assert engine.bitmap_index.resolve_segment(segment, engine._compare) is not None
+
+
+@pytest.mark.parametrize("name", SEGMENT_SETS)
+def test_reference_segments_are_not_trivial(dataset, name):
+    # Boş veya herkesi kapsayan segment backend farklarını yakalamaz
+    _, as_of, records = dataset
+    for segment in SEGMENT_SETS[name].values():
+        members = reference_members(records, segment, as_of)
+        assert 0 < len(members) < len(records[0]), segment.name
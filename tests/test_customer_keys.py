@@ -0,0 +1,40 @@
+"""
+CDP Demo - Müşteri Anahtarı Testleri
+customer_id eşlemesi ve tekrarlanan ID'lerin yüklemede reddedilmesi
+"""
+
+import pytest
+
+from conftest import make_customer, make_transaction, make_event
+from customer_keys import CustomerKeys, UNKNOWN_KEY
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, BACKENDS
+from sqlite_store import SQLITE_FILENAME
+
+
+def test_keys_are_row_numbers():
+    keys = CustomerKeys(["C1", "C2", "C3"])
+    assert keys.key("C2") == 1
+    assert keys.key("C9") == UNKNOWN_KEY
+    assert list(keys.encode(["C3", "C9", "C1"])) == [2, UNKNOWN_KEY, 0]
+    assert keys.decode([1, 0]) == ["C2", "C1"]
+    assert list(keys.mask([2, UNKNOWN_KEY])) == [0, 0, 1]
+
+
+def test_duplicate_ids_are_rejected():
+    with pytest.raises(ValueError, match="C2"):
+        CustomerKeys(["C1", "C2", "C3", "C2"])
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_engine_rejects_duplicate_customer_ids(write_dataset, backend):
+    customers = [make_customer("C1"), make_customer("C2"), make_customer("C1", city="Ankara")]
+    data_dir = write_dataset(
+        customers,
+        [make_transaction("C1", "2026-10-01 10:00:00", 100.0)],
+        [make_event("C2", "2026-10-02 10:00:00")],
+    )
+    with pytest.raises(ValueError, match="C1"):
+        SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    assert not (data_dir / SQLITE_FILENAME).exists()
+    assert not (data_dir / (SQLITE_FILENAME + ".tmp")).exists()
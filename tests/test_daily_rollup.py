@@ -0,0 +1,77 @@
+"""
+CDP Demo - Günlük Özet Testleri
+Kümülatif özetlerden hesaplanan pencere toplamlarının kesinliği
+"""
+
+from array import array
+from datetime import datetime
+
+import pytest
+
+from conftest import make_customer, make_transaction, make_event
+from daily_rollup import DailyRollup, ALL_CHANNEL, to_kurus
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
+from time_utils import parse_timestamp
+
+AS_OF = datetime(2026, 10, 17, 12, 0)
+
+# Kümülatif float toplamların farkı 4999.999999999999 verir; kesin toplam 5000
+BOUNDARY_TRANSACTIONS = [
+    make_transaction("C1", "2026-01-01 10:00:00", 2173.13),
+    make_transaction("C1", "2026-10-01 10:00:00", 1226.53),
+    make_transaction("C1", "2026-10-02 10:00:00", 3773.47),
+]
+
+
+def test_to_kurus():
+    assert to_kurus(2173.13) == 217313
+    assert to_kurus(1280) == 128000
+    with pytest.raises(ValueError):
+        to_kurus(0.001)
+
+
+def test_window_total_is_exact():
+    times = array("q", [parse_timestamp(tx["timestamp"]) for tx in BOUNDARY_TRANSACTIONS])
+    rollup = DailyRollup.build(BOUNDARY_TRANSACTIONS, times, {ALL_CHANNEL})
+    cutoff = parse_timestamp("2026-07-19 12:00:00")
+    assert rollup.window(ALL_CHANNEL, cutoff, BOUNDARY_TRANSACTIONS, times) == (2, 500000)
+    assert rollup.window(ALL_CHANNEL, None, BOUNDARY_TRANSACTIONS, times) == (3, 717313)
+
+
+@pytest.mark.parametrize("backend", ["memory", "compact", "columnar", "sqlite"])
+def test_high_value_boundary(write_dataset, backend):
+    data_dir = write_dataset([make_customer("C1")], BOUNDARY_TRANSACTIONS, [make_event("C1", "2026-10-10 09:00:00")])
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    segment = PREDEFINED_SEGMENTS["high_value_customers"]
+    paths = (False, True) if backend != "sqlite" else (None,)
+    for vectorized in paths:
+        members = engine.run_segment(segment, vectorized=vectorized, as_of=AS_OF)
+        assert [c["customer_id"] for c in members] == ["C1"], vectorized
+
+
+def test_inexact_amounts_fall_back_to_transactions(write_dataset):
+    transactions = BOUNDARY_TRANSACTIONS + [make_transaction("C1", "2026-10-03 10:00:00", 0.0005)]
+    engine = SegmentEngine(str(write_dataset([make_customer("C1")], transactions)), cache=SegmentCache(0))
+    segment = PREDEFINED_SEGMENTS["high_value_customers"]
+    assert engine.run_segment(segment, vectorized=False, as_of=AS_OF)
+    assert engine.rollup_channels == set()
+
+
+@pytest.mark.parametrize("backend", ["memory", "compact", "columnar", "sqlite"])
+def test_market_channel_skips_non_numeric_amounts(write_dataset, backend):
+    market = [make_transaction("C1", f"2026-10-1{day} 10:00:00", 100.0, market_amount=50) for day in range(3)]
+    odd = [
+        make_transaction("C2", "2026-10-10 10:00:00", 100.0, market_amount=None),
+        make_transaction("C2", "2026-10-11 10:00:00", 100.0, market_amount="50"),
+        make_transaction("C2", "2026-10-12 10:00:00", 100.0, market_amount=50),
+    ]
+    data_dir = write_dataset([make_customer("C1"), make_customer("C2")], market + odd)
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    segment = PREDEFINED_SEGMENTS["market_shoppers"]
+    paths = (False, True) if backend != "sqlite" else (None,)
+    for vectorized in paths:
+        members = engine.run_segment(segment, vectorized=vectorized, as_of=AS_OF)
+        assert [c["customer_id"] for c in members] == ["C1"], vectorized
+    if backend != "sqlite":
+        assert engine.rollup_channels  # Özetler kuruldu, işlem taramasına düşülmedi
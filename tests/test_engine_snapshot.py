@@ -0,0 +1,74 @@
+"""
+CDP Demo - Snapshot Testleri
+Columnar backend ikinci açılışta JSON okumadan snapshot'tan açılmalı ve aynı sonuçları vermeli
+"""
+
+import os
+
+import pytest
+
+from engine_snapshot import snapshot_dir, load_manifest
+from partitioned_store import partition_data
+from record_stream import dataset_path
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
+
+
+def member_ids(results):
+    return [c["customer_id"] for c in results]
+
+
+def run_all(engine, as_of, vectorized=None):
+    results = engine.run_segments(PREDEFINED_SEGMENTS, vectorized=vectorized, as_of=as_of)
+    return {key: member_ids(members) for key, members in results.items()}
+
+
+def columnar_engine(data_dir):
+    return SegmentEngine(str(data_dir), backend="columnar", cache=SegmentCache(0))
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_reopen_from_snapshot(mock_data, vectorized):
+    data_dir, as_of = mock_data
+    built = columnar_engine(data_dir)
+    assert "customers" in built.load_stats
+    assert load_manifest(data_dir)["source_version"] == built.data_version
+
+    reopened = columnar_engine(data_dir)
+    assert reopened.load_stats == {}  # JSON okunmadı
+    assert reopened.memory_report().mapped_bytes > 0
+    assert run_all(reopened, as_of, vectorized) == run_all(built, as_of, vectorized)
+
+    segment = PREDEFINED_SEGMENTS["high_value_customers"]
+    assert reopened.get_segment_stats(reopened.run_segment(segment, as_of=as_of)) \
+        == built.get_segment_stats(built.run_segment(segment, as_of=as_of))
+
+
+def test_changed_source_rewrites_snapshot(mock_data):
+    data_dir, as_of = mock_data
+    expected = run_all(columnar_engine(data_dir), as_of)
+    version = load_manifest(data_dir)["source_version"]
+
+    path = dataset_path(data_dir, "transactions")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    engine = columnar_engine(data_dir)
+    assert "transactions" in engine.load_stats  # Eski snapshot yok sayıldı
+    assert load_manifest(data_dir)["source_version"] == engine.data_version != version
+    assert run_all(engine, as_of) == expected
+
+
+def test_windowed_load_does_not_write_snapshot(mock_data):
+    data_dir, as_of = mock_data
+    partition_data(str(data_dir), "day")
+    windowed = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, str(data_dir), backend="columnar",
+                                          cache=SegmentCache(0))
+    assert not windowed.history_complete
+    assert not snapshot_dir(data_dir).exists()  # Eksik geçmiş snapshot'a yazılmaz
+
+    # İşlem toplamları tüm geçmişi yükletir; snapshot o zaman yazılır
+    windowed.get_segment_stats(windowed.run_segment(PREDEFINED_SEGMENTS["churn_risk"], as_of=as_of))
+    assert windowed.history_complete
+    assert load_manifest(data_dir)["source_version"] == windowed.data_version
+    assert run_all(columnar_engine(data_dir), as_of) == run_all(windowed, as_of)
@@ -0,0 +1,42 @@
+"""
+CDP Demo - Tembel Yükleme Testleri
+Segment sadece ihtiyaç duyduğu veri setini yüklemeli (profil segmenti işlem/event okumaz)
+"""
+
+import pytest
+
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS, DATASET_ATTRIBUTES
+
+BACKENDS = ["memory", "compact", "columnar"]
+
+
+def loaded_attributes(engine, dataset):
+    """Yüklenmiş alanlar (columnar: tablolar depoyla birlikte kurulur, sadece indexler tembel)"""
+    names = DATASET_ATTRIBUTES[dataset][1:] if engine.backend == "columnar" else DATASET_ATTRIBUTES[dataset]
+    return [name for name in names if name in engine.__dict__]
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_profile_segment_loads_no_history(mock_data, backend, vectorized):
+    data_dir, as_of = mock_data
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    assert engine.run_segment(PREDEFINED_SEGMENTS["istanbul_premium"], vectorized=vectorized, as_of=as_of)
+    assert engine.get_segment_stats(engine.run_segment(PREDEFINED_SEGMENTS["istanbul_premium"], as_of=as_of),
+                                     transactions=False)["count"] > 0
+    for dataset in DATASET_ATTRIBUTES:
+        assert loaded_attributes(engine, dataset) == [], dataset
+        assert engine.is_loaded(dataset) == (backend == "columnar")
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_transaction_segment_loads_only_transactions(mock_data, backend, vectorized):
+    data_dir, as_of = mock_data
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    assert engine.run_segment(PREDEFINED_SEGMENTS["high_value_customers"], vectorized=vectorized, as_of=as_of)
+    assert engine.is_loaded("transactions")
+    assert loaded_attributes(engine, "events") == []
+    if backend != "columnar":
+        assert not engine.is_loaded("events") and "events" not in engine.load_stats
@@ -0,0 +1,97 @@
+"""
+CDP Demo - Bellek Raporu Testleri
+Derin boyut ortak nesneleri ve görünümleri bir kez saymalı; iç içe aşama tepeleri dış aşamaya yansımalı
+"""
+
+import sys
+import tracemalloc
+
+import numpy as np
+
+from memory_report import MemoryTracer, deep_size
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
+
+MB = 1024 * 1024
+
+
+class Slotted:
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def test_shared_objects_are_counted_once():
+    text = "x" * 10_000
+    pair = [text, text]
+    assert deep_size(pair) == (sys.getsizeof(pair) + sys.getsizeof(text), 0)
+
+    # Aynı seen ile sırayla ölçülen yapılarda ortak nesne ilk ölçülene yazılır
+    seen = set()
+    assert deep_size(text, seen) == (sys.getsizeof(text), 0)
+    holder = {"text": text}
+    assert deep_size(holder, seen)[0] == sys.getsizeof(holder) + sys.getsizeof("text")
+
+    slotted = Slotted(text)
+    assert deep_size(slotted)[0] == sys.getsizeof(slotted) + sys.getsizeof(text)
+
+
+def test_numpy_views_count_the_base_once():
+    base = np.zeros(10_000)
+    view = base[10:20]
+    arrays = [base, view]
+    assert deep_size(view) == (base.nbytes, 0)  # Görünüm ana diziyi bellekte tutar
+    assert deep_size(arrays) == (sys.getsizeof(arrays) + base.nbytes, 0)
+
+    text = "y" * 1_000
+    objects = np.empty(2, dtype=object)
+    objects[:] = [text, text]
+    assert deep_size(objects) == (objects.nbytes + sys.getsizeof(text), 0)
+
+
+def test_memory_mapped_arrays_are_not_heap(tmp_path):
+    path = tmp_path / "values.npy"
+    np.save(path, np.arange(50_000, dtype=np.int64))
+    mapped = np.load(path, mmap_mode="r")
+    assert deep_size(mapped) == (0, mapped.nbytes)
+    assert deep_size(mapped[:1000]) == (0, 1000 * 8)
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = MemoryTracer(enabled=False)
+    with tracer.phase("load"):
+        data = bytearray(MB)
+    assert tracer.peaks == {}
+    assert len(data) == MB
+
+
+def test_nested_phase_peaks():
+    assert not tracemalloc.is_tracing()
+    tracer = MemoryTracer(enabled=True)
+    with tracer.phase("outer"):
+        kept = bytearray(MB)
+        with tracer.phase("inner"):
+            temporary = bytearray(2 * MB)
+            del temporary
+        after = bytearray(MB // 2)
+    assert len(kept) + len(after) > 0
+
+    inner, outer = tracer.peaks["inner"], tracer.peaks["outer"]
+    assert 2 * MB <= inner < 3 * MB
+    assert outer >= inner + MB  # Dış aşama iç aşamanın tepesini ve öncesini kapsar
+    assert not tracemalloc.is_tracing()  # Tracer'ın başlattığı izleme en dış aşamayla biter
+
+
+def test_columnar_row_index_keeps_no_dicts(mock_data):
+    data_dir, as_of = mock_data
+    columnar = SegmentEngine(str(data_dir), backend="columnar", cache=SegmentCache(0))
+    memory = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    segment = PREDEFINED_SEGMENTS["premium_fuel_lovers"]
+    assert columnar.run_segment(segment, vectorized=False, as_of=as_of) == memory.run_segment(segment, as_of=as_of)
+
+    for key, (rows, times) in enumerate(zip(columnar.customer_transactions, columnar.customer_transaction_times)):
+        assert not isinstance(rows, list) or not rows
+        assert list(rows) == list(memory.customer_transactions[key]), key
+        assert list(times) == list(memory.customer_transaction_times[key]), key
+    assert list(columnar.tx_keys) == list(memory.tx_keys)
@@ -0,0 +1,129 @@
+"""
+CDP Demo - Bölüm Budama Testleri
+for_segments sadece segment penceresini okumalı; sonuçlar ve istatistikler tam yüklemeyle aynı kalmalı
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from partitioned_store import partition_data, history_window
+from segment_cache import SegmentCache
+import segment_engine
+from segment_engine import SegmentEngine, SegmentDefinition, PREDEFINED_SEGMENTS
+
+
+def member_ids(results):
+    return [c["customer_id"] for c in results]
+
+
+@pytest.fixture
+def partitioned(mock_data):
+    data_dir, as_of = mock_data
+    partition_data(str(data_dir), "day")
+    return data_dir, as_of
+
+
+def test_predefined_segments_have_a_window():
+    # churn_risk (tx_last_days > 60) 61 günle sınırlanır; tüm geçmiş gerekmez
+    assert history_window([PREDEFINED_SEGMENTS["churn_risk"]]) == 61
+    assert history_window(PREDEFINED_SEGMENTS.values()) == 90
+
+
+@pytest.mark.parametrize("condition, window", [
+    ({"field": "tx_last_days", "operator": "<=", "value": 14}, 15),
+    ({"field": "tx_last_days", "operator": "in", "value": [3, 7]}, 8),
+    ({"field": "tx_last_days", "operator": "==", "value": 9999}, None),
+    ({"field": "tx_last_days", "operator": "contains", "value": 5}, None),
+    ({"field": "tx_last_fuel_type", "operator": "==", "value": "Benzin"}, None),
+])
+def test_history_window_of_condition(condition, window):
+    segment = SegmentDefinition(name="t", description="", conditions=[condition])
+    assert history_window([segment]) == window
+
+
+@pytest.mark.parametrize("backend, workers", [("memory", 1), ("memory", 2), ("compact", 1), ("columnar", 1)])
+def test_windowed_engine_matches_full_load(partitioned, backend, workers):
+    data_dir, _ = partitioned
+    windowed = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, str(data_dir), backend=backend,
+                                          workers=workers, cache=SegmentCache(0))
+    full = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    try:
+        loaded = len(windowed.transactions)
+        assert loaded < len(full.transactions)
+        expected = full.run_segments(PREDEFINED_SEGMENTS)
+        actual = windowed.run_segments(PREDEFINED_SEGMENTS)
+        assert {k: member_ids(v) for k, v in actual.items()} == {k: member_ids(v) for k, v in expected.items()}
+        assert len(windowed.transactions) == loaded
+        assert not windowed.history_complete
+    finally:
+        windowed.close()
+        full.close()
+
+
+def test_earlier_as_of_widens_history(partitioned):
+    data_dir, as_of = partitioned
+    segment = PREDEFINED_SEGMENTS["churn_risk"]
+    earlier = as_of - timedelta(days=40)
+    windowed = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, str(data_dir), cache=SegmentCache(0))
+    full = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    assert member_ids(windowed.run_segment(segment, as_of=earlier)) == member_ids(full.run_segment(segment, as_of=earlier))
+
+
+@pytest.mark.parametrize("approximate", [False, True])
+def test_profile_stats_keep_the_window(partitioned, monkeypatch, approximate):
+    data_dir, _ = partitioned
+    if approximate:
+        monkeypatch.setattr(segment_engine, "APPROX_SAMPLE_SIZE", 20)  # Örneklem yolu küçük veride de çalışsın
+    windowed = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, str(data_dir), cache=SegmentCache(0))
+    full = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    segment = PREDEFINED_SEGMENTS["premium_fuel_lovers"]
+    results = windowed.run_segment(segment)
+    loaded = len(windowed.transactions)
+
+    stats = windowed.get_segment_stats(results, approximate=approximate, transactions=False)
+    assert "total_revenue" not in stats and "total_transactions" not in stats
+    assert len(windowed.transactions) == loaded and not windowed.history_complete
+    if approximate:
+        assert stats["approximate"] and "total_revenue" not in stats["error_bounds"]
+    else:
+        expected = full.get_segment_stats(full.run_segment(segment))
+        assert stats == {k: v for k, v in expected.items() if k not in ("total_transactions", "total_revenue")}
+
+    # İşlem toplamları tüm geçmişi okutur ve tam yüklemeyle aynıdır
+    stats = windowed.get_segment_stats(results, approximate=approximate)
+    assert windowed.history_complete
+    if approximate:
+        assert "total_revenue" in stats["error_bounds"]
+    else:
+        assert stats == full.get_segment_stats(full.run_segment(segment))
+
+
+def test_history_complete_does_not_load(mock_data):
+    data_dir, _ = mock_data
+    # Bölümsüz düzen: tek dosya her zaman tamamen okunur
+    engine = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, str(data_dir), cache=SegmentCache(0))
+    assert engine.history_complete
+    assert not engine.is_loaded("transactions") and not engine.is_loaded("events")
+
+    partition_data(str(data_dir), "day")
+    windowed = SegmentEngine.for_segments(PREDEFINED_SEGMENTS, str(data_dir), cache=SegmentCache(0))
+    assert not windowed.history_complete
+    assert not windowed.is_loaded("transactions")
+    # Penceresi tüm bölümleri kapsayan motor tam geçmiş okur
+    assert SegmentEngine(str(data_dir), window_days=10_000, cache=SegmentCache(0)).history_complete
+
+
+def test_event_history_does_not_decide_revenue(partitioned):
+    data_dir, _ = partitioned
+    segment = SegmentDefinition(
+        name="App",
+        description="",
+        conditions=[{"field": "event_count", "operator": ">=", "value": 1, "days": 7}],
+    )
+    engine = SegmentEngine.for_segments({"app": segment}, str(data_dir), cache=SegmentCache(0))
+    engine.run_segment(segment)
+    assert engine.is_loaded("events") and not engine.is_loaded("transactions")
+    assert not engine.history_complete
+    engine.get_segment_stats(engine.run_segment(segment))
+    assert engine.history_complete
@@ -0,0 +1,51 @@
+"""
+CDP Demo - Sorgu Planlayıcı Testleri
+Koşullar maliyet/seçiciliğe göre sıralanmalı; sonuç belli olunca kalan koşullar değerlendirilmemeli
+"""
+
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, SegmentDefinition
+
+# Günlük özetten cevaplanan, neredeyse herkesi geçiren işlem koşulu + ucuz, seçici profil koşulu (tanımda sonda)
+BROAD_TX = {"field": "tx_count", "operator": ">=", "value": 1, "days": 120}
+CITY = {"field": "city", "operator": "==", "value": "İstanbul"}
+
+
+def segment(logic):
+    return SegmentDefinition(name=f"Plan {logic}", description="", conditions=[BROAD_TX, CITY], logic=logic)
+
+
+def plan_lines(engine, logic):
+    return engine.explain_segment(segment(logic)).describe().splitlines()[1:]
+
+
+def test_and_puts_the_cheap_selective_condition_first(mock_data):
+    data_dir, as_of = mock_data
+    engine = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    plan = engine.explain_segment(segment("AND"))
+    assert [step.position for step in plan.steps] == [1, 0]
+    assert plan.steps[0].source == "bitmap"
+    lines = plan_lines(engine, "AND")
+    assert lines[0].startswith("  1. [2] city == İstanbul")
+    assert lines[1].startswith("  2. [1] tx_count >= 1")
+
+    # Kısa devre: işlem koşulu sadece şehir koşulunu geçenlerde değerlendirilir
+    results, profile = engine.profile_segment(segment("AND"), vectorized=False, as_of=as_of)
+    city, broad = profile.conditions
+    assert city.rows_examined == len(engine.customers)
+    assert broad.rows_examined == city.rows_passed < len(engine.customers)
+    assert len(results) == broad.rows_passed
+
+
+def test_or_puts_the_likely_match_first(mock_data):
+    data_dir, as_of = mock_data
+    engine = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    plan = engine.explain_segment(segment("OR"))
+    assert [step.position for step in plan.steps] == [0, 1]
+    assert plan.steps[0].source == "sample" and plan.steps[0].selectivity > plan.steps[1].selectivity
+
+    # Kısa devre: şehir koşulu sadece işlem koşulunu geçemeyenlerde değerlendirilir
+    results, profile = engine.profile_segment(segment("OR"), vectorized=False, as_of=as_of)
+    broad, city = profile.conditions
+    assert city.rows_examined == broad.rows_examined - broad.rows_passed
+    assert len(results) == broad.rows_passed + city.rows_passed
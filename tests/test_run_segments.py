@@ -0,0 +1,106 @@
+"""
+CDP Demo - Toplu Çalıştırma Testleri
+run_segments, segment başına run_segment ve vektörel derleyici aynı üyeleri döndürmeli
+"""
+
+from datetime import datetime
+
+import pytest
+
+from conftest import make_customer, make_transaction, make_event
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, SegmentDefinition
+from time_utils import EvaluationClock
+
+AS_OF = datetime(2026, 10, 17, 12, 0)
+
+CUSTOMERS = [make_customer(f"C{i}") for i in range(6)]
+
+# Sıralı float toplamı eşik değerin bir ulp altında/üstünde kalan pencereler
+TRANSACTIONS = [
+    make_transaction("C1", "2026-01-01 10:00:00", 2173.13),
+    make_transaction("C1", "2026-10-01 10:00:00", 1226.53),
+    make_transaction("C1", "2026-10-02 10:00:00", 3773.47),
+    make_transaction("C2", "2026-10-03 10:00:00", 0.1),
+    make_transaction("C2", "2026-10-04 10:00:00", 0.2),
+    make_transaction("C3", "2026-10-05 10:00:00", 1000.1, is_premium_fuel=True),
+    make_transaction("C3", "2026-10-06 10:00:00", 1000.2, is_premium_fuel=True),
+    make_transaction("C3", "2026-10-07 10:00:00", 999.7, is_premium_fuel=True),
+    make_transaction("C4", "2026-10-08 10:00:00", 1.1, market_amount=1.1),
+    make_transaction("C4", "2026-10-09 10:00:00", 2.2, market_amount=2.2),
+    make_transaction("C5", "2026-10-16 23:59:59", 4999.99),
+]
+
+EVENTS = [make_event("C1", "2026-10-10 09:00:00")]
+
+
+def segment(name, conditions, logic="AND"):
+    return SegmentDefinition(name, name, conditions, logic)
+
+
+SEGMENTS = {
+    "sum_5000": segment("sum_5000", [{"field": "tx_total_amount", "operator": ">=", "value": 5000, "days": 90}]),
+    "sum_03": segment("sum_03", [
+        {"field": "tx_count", "operator": ">=", "value": 1, "days": 90},
+        {"field": "tx_total_amount", "operator": "<=", "value": 0.3, "days": 90},
+    ]),
+    "avg_2500": segment("avg_2500", [{"field": "tx_avg_amount", "operator": ">=", "value": 2500, "days": 90}]),
+    "avg_165": segment("avg_165", [{"field": "tx_avg_amount", "operator": "<=", "value": 1.65, "days": 90}]),
+    "generic_sum": segment("generic_sum", [{"field": "tx_sum_total_amount", "operator": ">=", "value": 5000, "days": 90}]),
+    "generic_avg": segment("generic_avg", [{"field": "tx_avg_total_amount", "operator": "<=", "value": 1.65, "days": 90}]),
+    "market_sum": segment("market_sum", [
+        {"field": "tx_sum_market_amount", "operator": "==", "value": 3.3},
+        {"field": "tx_total_amount", "operator": "==", "value": 3.3, "days": 30,
+         "filter": {"field": "market_amount", "operator": ">", "value": 0}},
+    ]),
+    "premium_sum": segment("premium_sum", [
+        {"field": "tx_total_amount", "operator": "==", "value": 3000, "days": 30,
+         "filter": {"field": "is_premium_fuel", "value": True}},
+    ]),
+    "near_or": segment("near_or", [
+        {"field": "tx_total_amount", "operator": ">=", "value": 5000, "days": 90},
+        {"field": "tx_avg_amount", "operator": "<=", "value": 0.15, "days": 30},
+    ], "OR"),
+}
+
+EXPECTED = {
+    "sum_5000": ["C1"],
+    "sum_03": ["C2"],
+    "avg_2500": ["C1", "C5"],
+    "avg_165": ["C2", "C4"],
+    "generic_sum": ["C1"],
+    "generic_avg": ["C2", "C4"],
+    "market_sum": ["C4"],
+    "premium_sum": ["C3"],
+    "near_or": ["C1", "C2"],
+}
+
+
+def ids(customers):
+    return [c["customer_id"] for c in customers]
+
+
+@pytest.fixture
+def data_dir(write_dataset):
+    return write_dataset(CUSTOMERS, TRANSACTIONS, EVENTS)
+
+
+@pytest.mark.parametrize("backend,vectorized", [
+    ("memory", False), ("memory", True), ("compact", False), ("columnar", False), ("columnar", True), ("sqlite", None),
+])
+def test_batch_matches_single_segment_runs(data_dir, backend, vectorized):
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    batch = engine.run_segments(SEGMENTS, vectorized=vectorized, as_of=AS_OF)
+    for key, definition in SEGMENTS.items():
+        single = engine.run_segment(definition, vectorized=vectorized, as_of=AS_OF)
+        assert ids(batch[key]) == ids(single) == EXPECTED[key], key
+
+
+@pytest.mark.parametrize("backend", ["memory", "columnar"])
+def test_compiler_matches_row_path(data_dir, backend):
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    clock = EvaluationClock(AS_OF)
+    for key, definition in SEGMENTS.items():
+        rows = engine.compile_segment(definition).member_rows(clock).tolist()
+        row_path = engine.run_segment(definition, vectorized=False, as_of=AS_OF)
+        assert ids(engine.customers_by_key(rows)) == ids(row_path) == EXPECTED[key], key
@@ -0,0 +1,77 @@
+"""
+CDP Demo - Sonuç Önbelleği Testleri
+Önbellek tekrar eden çalıştırmaları cevaplamalı; veri dosyaları değişince eski sonuç dönmemeli
+"""
+
+import json
+import os
+
+import pytest
+
+from record_stream import dataset_path
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
+
+SEGMENT = PREDEFINED_SEGMENTS["istanbul_premium"]
+
+
+def member_ids(results):
+    return [c["customer_id"] for c in results]
+
+
+def move_to_segment(data_dir) -> str:
+    """Segment dışındaki ilk müşteriyi İstanbul premium yap (mtime ileri alınır) -> müşteri ID'si"""
+    path = dataset_path(data_dir, "customers")
+    with open(path, encoding="utf-8") as f:
+        customers = json.load(f)
+    customer = next(c for c in customers if c["city"] != "İstanbul")
+    customer.update(city="İstanbul", segment="premium")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(customers, f, ensure_ascii=False, indent=2)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    return customer["customer_id"]
+
+
+@pytest.mark.parametrize("backend", ["memory", "columnar", "sqlite"])
+def test_changed_data_is_not_served_from_cache(mock_data, backend):
+    data_dir, as_of = mock_data
+    cache = SegmentCache()
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=cache)
+    before = member_ids(engine.run_segment(SEGMENT, as_of=as_of))
+    stats = engine.get_segment_stats(engine.run_segment(SEGMENT, as_of=as_of))
+    assert cache.hits == 1  # İkinci çalıştırma önbellekten
+    engine.close()
+
+    moved = move_to_segment(data_dir)
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=cache)
+    after = member_ids(engine.run_segment(SEGMENT, as_of=as_of))
+    assert moved not in before and moved in after
+    assert len(after) == len(before) + 1
+    assert engine.get_segment_stats(engine.run_segment(SEGMENT, as_of=as_of))["count"] == stats["count"] + 1
+    engine.close()
+
+
+def test_unchanged_data_shares_results_across_engines(mock_data):
+    data_dir, as_of = mock_data
+    cache = SegmentCache()
+    first = member_ids(SegmentEngine(str(data_dir), cache=cache).run_segments(PREDEFINED_SEGMENTS, as_of=as_of)["churn_risk"])
+    hits = cache.hits
+    second = SegmentEngine(str(data_dir), cache=cache).run_segments(PREDEFINED_SEGMENTS, as_of=as_of)
+    assert cache.hits == hits + len(PREDEFINED_SEGMENTS)
+    assert member_ids(second["churn_risk"]) == first
+
+
+def test_time_dependent_results_expire(mock_data):
+    data_dir, _ = mock_data
+    cache = SegmentCache(ttl_seconds=0)
+    engine = SegmentEngine(str(data_dir), cache=cache)
+    windowed = PREDEFINED_SEGMENTS["churn_risk"]
+
+    engine.run_segment(windowed)
+    engine.run_segment(SEGMENT)
+    hits = cache.hits
+    engine.run_segment(windowed)  # as_of yok: pencereli sonuç süresi dolunca yeniden hesaplanır
+    assert cache.hits == hits
+    engine.run_segment(SEGMENT)  # Profil segmenti zamandan bağımsız: süresiz
+    assert cache.hits == hits + 1
@@ -0,0 +1,42 @@
+"""
+CDP Demo - Segment Tahmini Testleri
+Örneklem iyileştirmeleri tahminin değerlendirme anında kalmalı
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
+
+TIME_SEGMENTS = ["premium_fuel_lovers", "high_value_customers", "churn_risk", "market_shoppers"]
+
+
+@pytest.mark.parametrize("backend", ["memory", "columnar", "sqlite"])
+@pytest.mark.parametrize("key", TIME_SEGMENTS)
+def test_refined_estimate_converges_to_exact_count(mock_data, backend, key):
+    data_dir, as_of = mock_data
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    segment = PREDEFINED_SEGMENTS[key]
+
+    estimate = engine.estimate_segment(segment, sample_size=50, as_of=as_of)
+    assert estimate.as_of == as_of
+    while not estimate.exact:
+        estimate = engine.refine_estimate(estimate)
+        assert estimate.as_of == as_of
+    assert estimate.matched == len(engine.run_segment(segment, as_of=as_of))
+
+
+def test_refine_keeps_the_pinned_moment(mock_data):
+    data_dir, as_of = mock_data
+    engine = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    segment = PREDEFINED_SEGMENTS["churn_risk"]
+    earlier = as_of - timedelta(days=45)
+
+    estimate = engine.estimate_segment(segment, sample_size=100, as_of=earlier)
+    while not estimate.exact:
+        estimate = engine.refine_estimate(estimate)
+    assert estimate.as_of == earlier
+    assert estimate.matched == len(engine.run_segment(segment, as_of=earlier))
+    assert estimate.matched != len(engine.run_segment(segment, as_of=as_of))
@@ -0,0 +1,45 @@
+"""
+CDP Demo - Segment Profili Testleri
+Koşul sayaçları kısa devreyi ve çalıştırma içi paylaşımı doğru göstermeli
+"""
+
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, SegmentDefinition
+
+# Aynı agregasyon (son 30 gün tx_count) iki koşulda: ikinci koşul hesaplanmış değeri kullanır
+ACTIVE = {"field": "tx_count", "operator": ">=", "value": 2, "days": 30}
+NOT_HEAVY = {"field": "tx_count", "operator": "<=", "value": 8, "days": 30}
+PREMIUM = {"field": "segment", "operator": "==", "value": "premium"}
+
+
+def profile(mock_data, *conditions):
+    data_dir, as_of = mock_data
+    engine = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    segment = SegmentDefinition(name="Profil", description="", conditions=list(conditions))
+    results, measured = engine.profile_segment(segment, vectorized=False, as_of=as_of)
+    return engine, results, measured
+
+
+def test_second_condition_sees_only_first_condition_passes(mock_data):
+    engine, results, measured = profile(mock_data, ACTIVE, PREMIUM)
+    first, second = measured.conditions
+    assert first.rows_examined == len(engine.customers)
+    assert 0 < first.rows_passed < first.rows_examined
+    assert second.rows_examined == first.rows_passed
+    assert measured.matched == len(results) == second.rows_passed
+    assert first.cache_hits == second.cache_hits == 0
+
+    lines = measured.describe().splitlines()
+    assert lines[0].startswith("Profil: Profil (AND, memory/row)")
+    assert f"incelenen={first.rows_examined:,} geçen={first.rows_passed:,}" in lines[1]
+    assert f"incelenen={second.rows_examined:,} geçen={second.rows_passed:,}" in lines[2]
+
+
+def test_shared_aggregate_counts_cache_hits(mock_data):
+    _, results, measured = profile(mock_data, ACTIVE, NOT_HEAVY)
+    first, second = measured.conditions
+    assert first.cache_hits == 0
+    assert second.rows_examined == first.rows_passed > 0
+    assert second.cache_hits == second.rows_examined  # Agregasyon her müşteride ilk koşuldan geldi
+    assert len(results) == second.rows_passed
+    assert f"paylaşım={second.cache_hits:,}" in measured.describe().splitlines()[2]
@@ -0,0 +1,59 @@
+"""
+CDP Demo - Segment İstatistik Testleri
+Index'ten hesaplanan istatistikler, kayıtlar üzerinde düz bir toplamayla aynı olmalı
+"""
+
+import pytest
+
+from record_stream import dataset_path, iter_records
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
+
+
+def count_by_field(customers, field):
+    """Alan bazında sayım; çoktan aza, eşitlikte segmentte ilk görülen değer önce"""
+    counts = {}
+    for customer in customers:
+        value = customer.get(field)
+        counts[value] = counts.get(value, 0) + 1
+    return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
+
+def reference_stats(data_dir, member_ids):
+    """Segment istatistikleri: indexsiz, önbelleksiz, kayıt listeleri üzerinde"""
+    customers = list(iter_records(dataset_path(data_dir, "customers")))
+    by_id = {c["customer_id"]: c for c in customers}
+    members = [by_id[customer_id] for customer_id in member_ids]
+    member_set = set(member_ids)
+    transactions = [tx for tx in iter_records(dataset_path(data_dir, "transactions")) if tx["customer_id"] in member_set]
+    return {
+        "count": len(members),
+        "percentage": round(len(members) / len(customers) * 100, 1),
+        "cities": count_by_field(members, "city"),
+        "avg_age": round(sum(c["age"] for c in members) / len(members), 1),
+        "gender_split": count_by_field(members, "gender"),
+        "has_app_pct": round(sum(1 for c in members if c["has_app"]) / len(members) * 100, 1),
+        "total_transactions": len(transactions),
+        "total_revenue": round(sum(tx["total_amount"] for tx in transactions), 2),
+    }
+
+
+@pytest.mark.parametrize("backend", ["memory", "compact", "columnar", "sqlite"])
+def test_stats_match_plain_aggregation(mock_data, backend):
+    data_dir, as_of = mock_data
+    engine = SegmentEngine(str(data_dir), backend=backend, cache=SegmentCache(0))
+    try:
+        for key, segment in PREDEFINED_SEGMENTS.items():
+            results = engine.run_segment(segment, as_of=as_of)
+            if not results:
+                continue
+            stats = engine.get_segment_stats(results)
+            expected = reference_stats(data_dir, [c["customer_id"] for c in results])
+
+            # Gelir toplama sırası farklı: kuruş yuvarlamasında en fazla bir kuruş fark
+            assert stats.pop("total_revenue") == pytest.approx(expected.pop("total_revenue"), abs=0.01), key
+            assert stats == expected, key
+            for field in ("cities", "gender_split"):
+                assert list(stats[field]) == list(expected[field]), (key, field)
+    finally:
+        engine.close()
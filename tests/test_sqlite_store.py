@@ -0,0 +1,76 @@
+"""
+CDP Demo - SQLite Deposu Testleri
+Akış halinde aktarım ve join sınırını aşan segmentler
+"""
+
+import sqlite3
+
+import pytest
+
+import sqlite_store
+from conftest import make_customer, make_transaction, make_event
+from record_stream import write_jsonl
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, SegmentDefinition
+from sql_compiler import MAX_JOINS
+from sqlite_store import import_json, SQLITE_FILENAME
+
+
+def test_import_in_batches(write_dataset, monkeypatch):
+    customers = [make_customer(f"C{i}") for i in range(7)]
+    transactions = [
+        make_transaction(f"C{i % 7}", f"2026-10-{1 + i % 20:02d} 10:00:{i % 60:02d}", 10.0 + i,
+                         market_items=["Kahve"] if i % 3 == 0 else [])
+        for i in range(25)
+    ]
+    data_dir = write_dataset(customers, transactions, [], data_format="jsonl")
+    transactions[5]["coupon"] = "X1"  # Sonradan görülen kolon
+    write_jsonl(sorted(transactions, key=lambda x: x["timestamp"]), data_dir / "transactions.jsonl")
+
+    monkeypatch.setattr(sqlite_store, "IMPORT_BATCH", 4)
+    path = import_json(str(data_dir))
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 25
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM transactions WHERE coupon = 'X1'").fetchone()[0] == 1
+        kinds = dict(conn.execute(
+            "SELECT name, kind FROM _columns WHERE table_name = 'transactions' ORDER BY position"
+        ))
+    assert kinds["market_items"] == "json"
+    assert kinds["is_premium_fuel"] == "bool"
+    assert list(kinds)[-1] == "coupon"
+
+
+def test_empty_tables_can_be_queried(write_dataset):
+    data_dir = write_dataset([make_customer("C1")], [], [])
+    engine = SegmentEngine(str(data_dir), backend="sqlite", cache=SegmentCache(0))
+    segment = SegmentDefinition("s", "", [
+        {"field": "tx_count", "operator": "==", "value": 0, "days": 30},
+        {"field": "event_count", "operator": "==", "value": 0, "event_type": "app_open"},
+    ])
+    assert [c["customer_id"] for c in engine.run_segment(segment)] == ["C1"]
+    assert (data_dir / SQLITE_FILENAME).exists()
+
+
+@pytest.mark.parametrize("logic", ["AND", "OR"])
+def test_segment_over_join_limit_is_split(write_dataset, logic):
+    customers = [make_customer(f"C{i}") for i in range(4)]
+    transactions = [
+        make_transaction(f"C{i}", f"2026-10-{1 + day:02d} 10:00:00", 100.0 * (i + 1))
+        for i in range(4) for day in range(0, 4 * (i + 1), 2)
+    ]
+    data_dir = write_dataset(customers, transactions, [make_event("C0", "2026-10-01 09:00:00")])
+    # Her koşul farklı gün penceresi: koşul başına bir join
+    conditions = [
+        {"field": "tx_count", "operator": ">=", "value": 1 if logic == "AND" else 99, "days": 30 + day}
+        for day in range(MAX_JOINS + 10)
+    ]
+    conditions.append({"field": "tx_total_amount", "operator": ">=", "value": 1000, "days": 200})
+    segment = SegmentDefinition("wide", "", conditions, logic)
+
+    sqlite_engine = SegmentEngine(str(data_dir), backend="sqlite", cache=SegmentCache(0))
+    row_engine = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    expected = [c["customer_id"] for c in row_engine.run_segment(segment, vectorized=False)]
+    assert expected
+    assert [c["customer_id"] for c in sqlite_engine.run_segment(segment)] == expected
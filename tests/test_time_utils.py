@@ -0,0 +1,80 @@
+"""
+CDP Demo - Değerlendirme Anı Testleri
+Sabit as_of duvar saatinden bağımsız, tekrarlanabilir sonuç vermeli; pencere başlangıçları gün başına bir kez hesaplanmalı
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import time_utils
+from segment_cache import SegmentCache
+from segment_engine import SegmentEngine, PREDEFINED_SEGMENTS
+from time_utils import EvaluationClock, cutoff_epoch, days_since_epoch, parse_timestamp
+
+AS_OF = datetime(2026, 10, 17, 12, 0)
+
+
+class ShiftedWallClock(datetime):
+    """datetime.now() bir yıl ileride"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2027, 10, 17, 12, 0)
+
+
+def member_ids(results):
+    return {key: [c["customer_id"] for c in members] for key, members in results.items()}
+
+
+def test_cutoffs_are_memoized_per_days(monkeypatch):
+    calls = []
+
+    def counting_cutoff(now, days):
+        calls.append(days)
+        return cutoff_epoch(now, days)
+
+    monkeypatch.setattr(time_utils, "cutoff_epoch", counting_cutoff)
+    clock = EvaluationClock(AS_OF)
+    assert clock.cutoff(90) == clock.cutoff(90) == cutoff_epoch(AS_OF, 90)
+    assert clock.cutoff(30) == cutoff_epoch(AS_OF, 30)
+    clock.cutoff(30)
+    assert calls == [90, 30]
+
+
+def test_clock_reads_wall_clock_once(monkeypatch):
+    clock = EvaluationClock()
+    now = clock.now
+    monkeypatch.setattr(time_utils, "datetime", ShiftedWallClock)
+    assert clock.now == now  # Çalıştırma ortasında saat ilerlese de değerlendirme anı sabit
+    assert EvaluationClock().now == datetime(2027, 10, 17, 12, 0)
+    assert EvaluationClock(AS_OF).now == AS_OF
+
+    timestamp = parse_timestamp("2026-09-17 12:00:01")
+    assert EvaluationClock(AS_OF).days_since(timestamp) == days_since_epoch(AS_OF, timestamp) == 29
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_pinned_as_of_is_repeatable(mock_data, monkeypatch, vectorized):
+    data_dir, as_of = mock_data
+    uncached = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    first = member_ids(uncached.run_segments(PREDEFINED_SEGMENTS, vectorized=vectorized, as_of=as_of))
+
+    monkeypatch.setattr(time_utils, "datetime", ShiftedWallClock)
+    assert member_ids(uncached.run_segments(PREDEFINED_SEGMENTS, vectorized=vectorized, as_of=as_of)) == first
+
+    # Kaydırılmış an: pencereli segmentler değişir, aynı ana sabitlenmiş yeni motorla aynı sonuç
+    shifted_as_of = as_of + timedelta(days=30)
+    shifted = member_ids(uncached.run_segments(PREDEFINED_SEGMENTS, vectorized=vectorized, as_of=shifted_as_of))
+    assert shifted != first
+    fresh = SegmentEngine(str(data_dir), cache=SegmentCache(0))
+    assert member_ids(fresh.run_segments(PREDEFINED_SEGMENTS, vectorized=vectorized, as_of=shifted_as_of)) == shifted
+
+    # Önbellek as_of başına ayrı sonuç tutar
+    cache = SegmentCache()
+    cached = SegmentEngine(str(data_dir), cache=cache)
+    segment = PREDEFINED_SEGMENTS["churn_risk"]
+    runs = [cached.run_segment(segment, vectorized=vectorized, as_of=at) for at in (as_of, as_of, shifted_as_of)]
+    assert cache.hits == 1
+    assert [c["customer_id"] for c in runs[0]] == [c["customer_id"] for c in runs[1]] == first["churn_risk"]
+    assert [c["customer_id"] for c in runs[2]] == shifted["churn_risk"] != first["churn_risk"]